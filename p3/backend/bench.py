@@ -0,0 +1,143 @@
+"""Headless benchmark runner for WorldEngine.
+
+    python3 backend/bench.py --agents 1000 --ticks 200 --size 256
+    python3 backend/bench.py --suite --save bench.json
+    python3 backend/bench.py --suite --compare bench.json
+
+Ticks run back to back (no scheduler throttling). Each tick is also
+turned into a delta and JSON-encoded, like the server does.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from simulation import WorldEngine
+from systems.metrics import Metrics
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# (agents, map side, ticks): maps grow with the population so density stays playable
+SUITE = [
+    (10, 64, 500),
+    (100, 128, 300),
+    (1000, 256, 100),
+    (10000, 1024, 30),
+]
+PHASES = ("decide", "perform", "memes", "state", "serialize")
+
+
+def peak_memory_mb():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(num_agents, ticks, width, height, seed=0, columnar=False):
+    t0 = time.perf_counter()
+    world = WorldEngine(width=width, height=height, num_agents=num_agents, seed=seed, columnar=columnar)
+    world.get_delta() # Spawn burst is part of setup, not of the steady state
+    setup = time.perf_counter() - t0
+
+    metrics = world.metrics = Metrics()
+    frame_bytes = 0
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(ticks):
+        world.update()
+        t1 = clock()
+        delta = world.get_delta()
+        t2 = clock()
+        frame_bytes += len(json.dumps(delta))
+        metrics.observe("tick_phase_seconds", "state", t2 - t1)
+        metrics.observe("tick_phase_seconds", "serialize", clock() - t2)
+    elapsed = clock() - start
+
+    return {
+        "agents": num_agents,
+        "size": f"{width}x{height}",
+        "ticks": ticks,
+        "seed": seed,
+        "columnar": columnar,
+        "setup_s": round(setup, 4),
+        "ticks_per_sec": round(ticks / elapsed, 2) if elapsed else None,
+        "ms_per_tick": {k: round(metrics.total("tick_phase_seconds", k) * 1000 / ticks, 3) for k in PHASES},
+        "frame_bytes": frame_bytes // ticks,
+        "alive": sum(1 for a in world.agents if not a.is_dead),
+        "peak_mb": peak_memory_mb(),
+    }
+
+
+def run_suite(seed=0, columnar=False):
+    # One process per case so peak memory isn't shared between cases
+    results = []
+    for agents, side, ticks in SUITE:
+        cmd = [sys.executable, os.path.abspath(__file__), "--agents", str(agents),
+               "--size", str(side), "--ticks", str(ticks), "--seed", str(seed), "--json"]
+        if columnar: cmd.append("--columnar")
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out))
+        print_result(results[-1])
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns the cases whose ticks/sec fell more than `tolerance` below the baseline."""
+    previous = {r["agents"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get(r["agents"])
+        if old and old["ticks_per_sec"] and r["ticks_per_sec"] < old["ticks_per_sec"] * (1 - tolerance):
+            regressions.append((r["agents"], old["ticks_per_sec"], r["ticks_per_sec"]))
+    return regressions
+
+
+def print_result(r):
+    phases = "  ".join(f"{k}={v:.2f}ms" for k, v in r["ms_per_tick"].items())
+    peak = f"{r['peak_mb']:.0f}MB" if r["peak_mb"] is not None else "n/a"
+    print(f"{r['agents']:>6} agents {r['size']:>9}  {r['ticks_per_sec']:>9.1f} ticks/s  "
+          f"{phases}  frame={r['frame_bytes']}B  peak={peak}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--size", type=int, default=None, help="map side (default: 64, or larger for big populations)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--columnar", action="store_true", help="use the NumPy agent store")
+    parser.add_argument("--suite", action="store_true", help="sweep agent counts " + ", ".join(str(a) for a, _, _ in SUITE))
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ticks/sec drop vs baseline")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        results = run_suite(args.seed, args.columnar)
+    else:
+        side = args.size or max(64, int((args.agents * 16) ** 0.5))
+        results = [run_benchmark(args.agents, args.ticks, side, side, args.seed, args.columnar)]
+        if args.json: print(json.dumps(results[0]))
+        else: print_result(results[0])
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for agents, old, new in regressions:
+            print(f"REGRESSION {agents} agents: {old} -> {new} ticks/s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import asyncio
+import inspect
+import itertools
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLIENT_QUEUE_SIZE = 16 # Frames buffered per client before it is resynced
+SEND_TIMEOUT = 5.0 # Seconds a single send may take before the client is dropped
+
+
+class ClientConnection:
+    """One viewer: a bounded outbound queue drained by its own sender task.
+
+    Frames are deltas, so dropping one would corrupt the client's view. On
+    overflow the backlog is discarded instead and the next send is a fresh
+    keyframe (coalesce-to-latest). Clients that sent a viewport get a
+    `view` id and receive that view's frames instead of the full ones.
+    """
+
+    def __init__(self, websocket, max_queue=CLIENT_QUEUE_SIZE):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.needs_keyframe = True # First frame is always a keyframe
+        self.dropped = 0
+        self.view = None # Area-of-interest subscription id, once the client sent a viewport
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def push(self, frame: str):
+        if self.needs_keyframe: return # Backlog will be replaced by a keyframe anyway
+        if len(self.queue) >= self.max_queue:
+            self.dropped += len(self.queue)
+            self.resync()
+            return
+        self.queue.append(frame)
+        self.wakeup.set()
+
+    def resync(self):
+        self.queue.clear()
+        self.needs_keyframe = True
+        self.wakeup.set()
+
+
+class ConnectionManager:
+    def __init__(self, keyframe_source, max_queue=CLIENT_QUEUE_SIZE, on_disconnect=None):
+        # keyframe_source(view) -> pre-encoded keyframe of the current world state, cut to
+        # `view` unless it is None (may be async)
+        self.keyframe_source = keyframe_source
+        self.max_queue = max_queue
+        self.on_disconnect = on_disconnect # on_disconnect(view) for clients that had a view
+        self.clients: dict = {} # {websocket: ClientConnection}
+        self.bytes_sent = 0 # Encoded frames written to sockets, for /metrics
+        self._view_ids = itertools.count(1)
+
+    @property
+    def active_connections(self):
+        return list(self.clients)
+
+    async def connect(self, websocket):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue)
+        self.clients[websocket] = client
+        client.task = asyncio.create_task(self._sender(client))
+        client.wakeup.set()
+
+    def disconnect(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        if client and client.view is not None and self.on_disconnect:
+            self.on_disconnect(client.view)
+
+    def view(self, websocket):
+        """The client's view id, assigned on first use."""
+        client = self.clients[websocket]
+        if client.view is None: client.view = next(self._view_ids)
+        return client.view
+
+    def request_keyframe(self, websocket):
+        client = self.clients.get(websocket)
+        if client: client.resync()
+
+    def broadcast(self, message: str, views=None):
+        """Queues one pre-encoded frame for every client; never waits on a socket.
+
+        `views` ({view id: frame}) overrides the frame for subscribed clients.
+        """
+        for client in self.clients.values():
+            if views and client.view in views: client.push(views[client.view])
+            else: client.push(message)
+
+    async def _sender(self, client):
+        try:
+            while True:
+                await client.wakeup.wait()
+                client.wakeup.clear()
+                while client.needs_keyframe or client.queue:
+                    if client.needs_keyframe:
+                        client.needs_keyframe = False
+                        frame = self.keyframe_source(client.view)
+                        if inspect.isawaitable(frame): frame = await frame
+                    else:
+                        frame = client.queue.popleft()
+                    await asyncio.wait_for(client.websocket.send_text(frame), SEND_TIMEOUT)
+                    self.bytes_sent += len(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to client: {e}")
+            self.disconnect(client.websocket)
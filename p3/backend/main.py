@@ -1,74 +1,76 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import HTMLResponse, Response
 import uvicorn
 import asyncio
 import logging
-from simulation import WorldEngine
+import os
+from typing import Optional
+from systems.interest import Viewport
+from connections import ConnectionManager
+from rooms import WorldRegistry, RoomError
+from systems.metrics import render as render_metrics
 import json
 from contextlib import asynccontextmanager
-import traceback
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Simulation
-try:
-    world = WorldEngine(num_agents=10)
-    logger.info("World Initialized Successfully")
-except Exception as e:
-    logger.error(f"World Init Failed: {e}")
-    traceback.print_exc()
+SNAPSHOT_PATH = os.environ.get("BOTMOO_SNAPSHOT", "world.snapshot") # Default room's autosave; resumed on startup
+RECORD_DIR = os.environ.get("BOTMOO_RECORD") # Event log + periodic snapshots for replay.py; off if unset
+ROOMS_DIR = os.environ.get("BOTMOO_ROOMS", "rooms") # Snapshots of the other rooms
+ROOM_HOSTS = int(os.environ.get("BOTMOO_ROOM_HOSTS", 0)) or None # Host processes; one per core if unset
+DEFAULT_ROOM = "default" # Served at /ws and /map; never suspended
+PROFILE = os.environ.get("BOTMOO_METRICS", "1") != "0" # Tick phase timings and counters for /metrics
 
 SIMULATION_TICK_RATE = 0.5 # 0.5s per tick = fluid movement
+REAP_EVERY = 10.0 # Seconds between sweeps for idle rooms
 
-# --- Background Task ---
+registry = None # WorldRegistry; its host processes start with the app, not on import
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+def make_manager(room_id):
+    async def encode_keyframe(view):
+        # Waits for the room's current tick off the event loop; full keyframes are cached per tick
+        return await asyncio.to_thread(registry.keyframe, room_id, view)
+    return ConnectionManager(encode_keyframe, on_disconnect=lambda view: registry.unsubscribe(room_id, view))
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting: {e}")
-                self.disconnect(connection)
-
-manager = ConnectionManager()
-
-async def run_simulation():
-    logger.info("Starting Simulation Loop...")
+async def reap_idle_rooms():
     while True:
-        try:
-            world.update()
-            state = world.get_state()
-            json_state = json.dumps(state)
-            await manager.broadcast(json_state)
-        except Exception as e:
-            logger.error(f"Simulation Loop Error: {e}")
-            traceback.print_exc()
-        
-        await asyncio.sleep(SIMULATION_TICK_RATE)
+        await asyncio.sleep(REAP_EVERY)
+        await asyncio.to_thread(registry.reap)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    task = asyncio.create_task(run_simulation())
+    # Startup: ticks run in the host processes, deltas come back through the loop
+    global registry
+    loop = asyncio.get_running_loop()
+    registry = WorldRegistry(ROOMS_DIR, ROOM_HOSTS, SIMULATION_TICK_RATE, make_manager=make_manager, profile=PROFILE,
+                             on_frame=lambda room, frame, views: loop.call_soon_threadsafe(room.manager.broadcast, frame, views))
+    try:
+        await asyncio.to_thread(registry.create, DEFAULT_ROOM, always_on=True, snapshot_path=SNAPSHOT_PATH,
+                                record_dir=RECORD_DIR, num_agents=10)
+        logger.info("World Initialized Successfully")
+    except RoomError as e:
+        logger.error(f"World Init Failed: {e}")
+    reaper = asyncio.create_task(reap_idle_rooms())
     yield
-    # Shutdown
-    task.cancel()
+    # Shutdown: every live room is snapshotted
+    reaper.cancel()
+    await asyncio.to_thread(registry.close)
 
 app = FastAPI(lifespan=lifespan)
 
+async def call_room(fn, *args, **kwargs):
+    # Registry calls block on a host process; unknown rooms are 404s, bad requests 400s
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No world {args[0]!r}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RoomError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 # --- Routes ---
 
 @app.get("/", response_class=HTMLResponse)
@@ -77,21 +79,111 @@ async def root():
         return f.read()
 
 @app.get("/map")
-async def get_map():
-    return world.get_map()
+@app.get("/map/{world_id}")
+async def get_map(world_id: str = DEFAULT_ROOM, format: str = "binary"):
+    # Terrain never changes after generation; the binary map is cached per room
+    if format == "json":
+        return await call_room(registry.map, world_id)
+    return Response(content=await call_room(registry.map_bytes, world_id), media_type="application/octet-stream")
 
 @app.get("/debug/state")
-async def get_state():
-    return world.get_state()
+async def get_state(world: str = DEFAULT_ROOM):
+    return await call_room(registry.state, world)
+
+@app.post("/sim/rate")
+async def set_tick_rate(ticks_per_second: float, world: str = DEFAULT_ROOM):
+    if ticks_per_second <= 0:
+        raise HTTPException(status_code=400, detail="ticks_per_second must be positive")
+    await call_room(registry.set_rate, world, 1.0 / ticks_per_second)
+    return {"ticks_per_second": ticks_per_second}
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text format, one `world` label per loaded room
+    sources = [({"world": room_id}, samples) for room_id, samples in await asyncio.to_thread(registry.metrics)]
+    for room in list(registry.rooms.values()):
+        sources.append(({"world": room.id}, [("connections", None, len(room.manager.clients)),
+                                             ("broadcast_bytes", None, room.manager.bytes_sent)]))
+    return Response(content=render_metrics(sources), media_type="text/plain; version=0.0.4")
+
+@app.get("/worlds")
+async def list_worlds():
+    return [room.to_dict() for room in list(registry.rooms.values())]
+
+@app.post("/worlds/{world_id}")
+async def create_world(world_id: str, width: int = 64, height: int = 64, agents: int = 10,
+                       seed: Optional[int] = None, always_on: bool = False):
+    if not (8 <= width <= 1024 and 8 <= height <= 1024) or agents < 0:
+        raise HTTPException(status_code=400, detail="width/height must be 8..1024, agents >= 0")
+    room = await call_room(registry.create, world_id, always_on=always_on,
+                           width=width, height=height, num_agents=agents, seed=seed)
+    return room.to_dict()
+
+@app.post("/worlds/{world_id}/pause")
+async def pause_world(world_id: str):
+    await call_room(registry.pause, world_id)
+    return registry.get(world_id).to_dict()
+
+@app.post("/worlds/{world_id}/resume")
+async def resume_world(world_id: str):
+    await call_room(registry.resume, world_id)
+    return registry.get(world_id).to_dict()
+
+@app.post("/worlds/{world_id}/suspend")
+async def suspend_world(world_id: str):
+    await call_room(registry.suspend, world_id)
+    return registry.get(world_id).to_dict()
+
+@app.delete("/worlds/{world_id}")
+async def delete_world(world_id: str):
+    if world_id == DEFAULT_ROOM:
+        raise HTTPException(status_code=400, detail="The default world can't be deleted")
+    await call_room(registry.destroy, world_id)
+    return {"deleted": world_id}
+
+def parse_message(message: str) -> dict:
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+@app.websocket("/ws/{world_id}")
+async def websocket_endpoint(websocket: WebSocket, world_id: str = DEFAULT_ROOM):
+    try:
+        room = await asyncio.to_thread(registry.attach, world_id) # Wakes a suspended room
+    except (KeyError, RoomError) as e:
+        logger.warning(f"Refused viewer for world {world_id!r}: {e}")
+        await websocket.close(code=4404)
+        return
+    manager = room.manager
+    await manager.connect(websocket) # Its sender task opens with a keyframe
     try:
         while True:
-            await websocket.receive_text()
+            message = parse_message(await websocket.receive_text())
+            kind = message.get("type")
+            # Client lost track of the delta stream (gap, reload...): resync it
+            if kind == "keyframe":
+                manager.request_keyframe(websocket)
+            # Camera moved: only stream what's around it from now on
+            elif kind == "viewport":
+                try:
+                    viewport = Viewport.from_message(message, room.width, room.height)
+                except ValueError as e:
+                    logger.warning(str(e))
+                    continue
+                view = manager.view(websocket)
+                try:
+                    await asyncio.to_thread(registry.subscribe, world_id, view, viewport)
+                except RoomError as e:
+                    logger.warning(f"Viewport for {world_id!r} dropped: {e}")
+                    continue
+                if websocket not in manager.clients: registry.unsubscribe(world_id, view) # Dropped meanwhile
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+    finally:
+        registry.detach(world_id)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,153 @@
+"""Recording and replay of a world run.
+
+    python3 backend/replay.py recording/ --seek 100000
+    python3 backend/replay.py recording/ --events death --since 5000 --until 6000
+    python3 backend/replay.py recording/ --verify 2000
+
+A recording directory holds `events.log` (systems/eventlog.py) and a
+snapshot every `snapshot_every` ticks. The simulation is deterministic, so
+seeking loads the nearest snapshot at or before the target tick and
+re-simulates at most `snapshot_every` ticks from there; the log is what
+analytics read, and what a replay is checked against.
+"""
+import argparse
+import bisect
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+
+from simulation import WorldEngine, ACTIONS, JOBS, RECIPE_CODES
+from systems.eventlog import (EventLog, read_events, EVENT_SPAWN, EVENT_ACTION, EVENT_DEATH,
+                              EVENT_CRAFT, EVENT_MEME)
+
+SNAPSHOT_EVERY = 1000
+EVENTS_FILE = "events.log"
+EVENT_KINDS = {"spawn": EVENT_SPAWN, "action": EVENT_ACTION, "death": EVENT_DEATH,
+               "craft": EVENT_CRAFT, "meme": EVENT_MEME}
+_SNAPSHOT_NAME = re.compile(r"^tick-(\d+)\.snapshot$")
+
+
+def snapshot_name(tick):
+    return f"tick-{tick:09d}.snapshot"
+
+
+class Recorder:
+    """Logs a world's events into `directory` and snapshots it every `snapshot_every` ticks.
+
+    Call after_tick() after each world.update(). Resuming a world older than
+    the log's tail drops the events it is about to regenerate.
+    """
+
+    def __init__(self, world, directory, snapshot_every=SNAPSHOT_EVERY):
+        os.makedirs(directory, exist_ok=True)
+        self.world = world
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.log = EventLog(os.path.join(directory, EVENTS_FILE))
+        self.log.truncate(world.tick_count)
+        world.event_log = self.log
+        self.snapshot()
+
+    def snapshot(self):
+        self.log.flush() # Snapshots never run ahead of the durable log
+        self.world.save(os.path.join(self.directory, snapshot_name(self.world.tick_count)))
+
+    def after_tick(self):
+        if self.world.tick_count % self.snapshot_every == 0: self.snapshot()
+
+    def close(self):
+        self.world.event_log = None
+        self.log.close()
+
+
+class ReplayEngine:
+    """Reconstructs a recorded world at any tick."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.log_path = os.path.join(directory, EVENTS_FILE)
+        ticks = []
+        for name in os.listdir(directory):
+            match = _SNAPSHOT_NAME.match(name)
+            if match: ticks.append(int(match.group(1)))
+        if not ticks: raise FileNotFoundError(f"No snapshots in {directory}")
+        self.snapshot_ticks = sorted(ticks)
+
+    def nearest_snapshot(self, tick):
+        i = bisect.bisect_right(self.snapshot_ticks, tick)
+        if not i: raise ValueError(f"Tick {tick} is before the first snapshot ({self.snapshot_ticks[0]})")
+        return self.snapshot_ticks[i - 1]
+
+    def seek(self, tick):
+        """The world as it was right after `tick`."""
+        world = WorldEngine.load(os.path.join(self.directory, snapshot_name(self.nearest_snapshot(tick))))
+        while world.tick_count < tick:
+            world.update()
+        return world
+
+    def events(self, since=None, until=None, kind=None):
+        return read_events(self.log_path, since, until, kind)
+
+    def verify(self, since, until):
+        """Re-simulates since..until and compares against the log.
+
+        Returns the first tick whose events differ, or None if the replay matches.
+        """
+        world = WorldEngine.load(os.path.join(self.directory, snapshot_name(self.nearest_snapshot(since))))
+        start = world.tick_count
+        with tempfile.TemporaryDirectory() as tmp:
+            log = EventLog(os.path.join(tmp, EVENTS_FILE))
+            world.event_log = log
+            while world.tick_count < until:
+                world.update()
+            log.close()
+            replayed = read_events(log.path, start + 1, until)
+        recorded = self.events(start + 1, until)
+        if len(replayed) == len(recorded) and np.array_equal(replayed, recorded): return None
+        n = min(len(replayed), len(recorded))
+        differs = np.flatnonzero(replayed[:n] != recorded[:n])
+        if len(differs): return int(min(replayed["tick"][differs[0]], recorded["tick"][differs[0]]))
+        longer = replayed if len(replayed) > n else recorded
+        return int(longer["tick"][n])
+
+
+def describe(row):
+    tick, kind, a, b, c = row
+    if kind == EVENT_SPAWN: return f"{tick}: spawn #{a} ({JOBS[b]})"
+    if kind == EVENT_ACTION: return f"{tick}: #{a} {ACTIONS[b]}" + (f" -> #{c}" if c else "")
+    if kind == EVENT_DEATH: return f"{tick}: death #{a}" + (f" by #{b}" if b else "")
+    if kind == EVENT_CRAFT: return f"{tick}: #{a} crafted {list(RECIPE_CODES)[b]}"
+    if kind == EVENT_MEME: return f"{tick}: #{a} -> #{b} meme {c}"
+    return f"{tick}: unknown event {kind}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="recording directory (see Recorder)")
+    parser.add_argument("--seek", type=int, help="rebuild the world at this tick and summarize it")
+    parser.add_argument("--events", choices=sorted(EVENT_KINDS), help="print logged events of this kind")
+    parser.add_argument("--since", type=int)
+    parser.add_argument("--until", type=int)
+    parser.add_argument("--verify", type=int, metavar="TICK", help="re-simulate up to TICK and compare with the log")
+    args = parser.parse_args(argv)
+
+    engine = ReplayEngine(args.directory)
+    if args.seek is not None:
+        world = engine.seek(args.seek)
+        alive = sum(1 for a in world.agents if not a.is_dead)
+        print(f"tick {world.tick_count}: {alive} agents alive, {len(world.corpses)} corpses, {len(world.memes)} memes")
+    if args.events:
+        for row in engine.events(args.since, args.until, EVENT_KINDS[args.events]).tolist():
+            print(describe(row))
+    if args.verify is not None:
+        tick = engine.verify(args.since if args.since is not None else engine.snapshot_ticks[0], args.verify)
+        print("replay matches the log" if tick is None else f"replay diverges at tick {tick}")
+        return 0 if tick is None else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""Many independent worlds ("rooms") per server, ticked by a pool of host processes.
+
+Each host process runs the fixed-timestep schedulers of the rooms placed on
+it and pipes their encoded frames back. The WorldRegistry, in the server
+process, places rooms on the least busy host, fans frames out to each
+room's viewers and suspends rooms nobody is watching to a snapshot (unless
+they are always-on); the next viewer resumes them on whichever host is
+free.
+"""
+import concurrent.futures
+import itertools
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import traceback
+
+from simulation import WorldEngine
+from scheduler import SimulationScheduler
+from systems.snapshot import SnapshotError
+from systems.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+IDLE_SUSPEND_AFTER = 60.0 # Seconds without viewers before a room is suspended
+ROOM_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+RUNNING = "running"
+PAUSED = "paused"
+SUSPENDED = "suspended"
+
+
+class RoomHost:
+    """The worlds of one host process, driven by run() or by hand in tests.
+
+    `send(message)` ships frames ("frame", room_id, frame, views) and replies
+    to the server.
+    """
+
+    def __init__(self, send):
+        self.send = send
+        self.rooms = {} # {room_id: SimulationScheduler}
+        self.paused = set()
+        self.recorders = {}
+
+    def open(self, room_id, snapshot_path, params, tick_rate, record_dir=None, profile=False):
+        """Starts a room from its snapshot if there is one, else from `params`. Returns (width, height, tick).
+
+        An unreadable snapshot is renamed to `<path>.corrupt` before the room
+        starts afresh. With `profile`, the world gets a Metrics for metrics() to report.
+        """
+        world = None
+        if os.path.exists(snapshot_path):
+            try:
+                world = WorldEngine.load(snapshot_path)
+                logger.info(f"Resumed {room_id} from {snapshot_path} at tick {world.tick_count}")
+            except SnapshotError as e:
+                # Moved aside first: the new world autosaves to the same path
+                os.replace(snapshot_path, f"{snapshot_path}.corrupt")
+                logger.error(f"Could not resume {room_id} from {snapshot_path} (kept as .corrupt), starting a new world: {e}")
+        if world is None:
+            world = WorldEngine(**params)
+        if profile: world.metrics = Metrics()
+        recorder = None
+        if record_dir:
+            from replay import Recorder # Only rooms that record pay for the import
+            recorder = self.recorders[room_id] = Recorder(world, record_dir)
+        self.rooms[room_id] = SimulationScheduler(
+            world, tick_rate, on_frame=lambda frame, views: self.send(("frame", room_id, frame, views)),
+            autosave_path=snapshot_path, recorder=recorder)
+        return world.width, world.height, world.tick_count
+
+    def close(self, room_id, save=True):
+        """Drops a room, snapshotting it first if `save`. Returns the tick it stopped at."""
+        scheduler = self.rooms[room_id]
+        if save and not scheduler.save(): raise OSError(f"Could not snapshot {room_id}")
+        del self.rooms[room_id]
+        self.paused.discard(room_id)
+        recorder = self.recorders.pop(room_id, None)
+        if recorder: recorder.close()
+        return scheduler.world.tick_count
+
+    def pause(self, room_id):
+        self.paused.add(room_id)
+
+    def resume(self, room_id):
+        self.paused.discard(room_id)
+        self.rooms[room_id].accumulator = 0.0 # Don't catch up on the paused time
+
+    def set_rate(self, room_id, tick_rate):
+        self.rooms[room_id].set_tick_rate(tick_rate)
+
+    def keyframe(self, room_id, view=None):
+        return self.rooms[room_id].keyframe(view)
+
+    def subscribe(self, room_id, view, viewport):
+        self.rooms[room_id].subscribe(view, viewport)
+
+    def unsubscribe(self, room_id, view):
+        room = self.rooms.get(room_id)
+        if room: room.unsubscribe(view)
+
+    def map_bytes(self, room_id):
+        return self.rooms[room_id].world.get_map_bytes()
+
+    def map(self, room_id):
+        return self.rooms[room_id].world.get_map()
+
+    def state(self, room_id):
+        return self.rooms[room_id].read(lambda w: w.get_state())
+
+    def metrics(self, room_id):
+        """The room's Metrics.samples() with its gauges refreshed; [] if it isn't profiled."""
+        scheduler = self.rooms[room_id]
+        def collect(world):
+            metrics = world.metrics
+            if metrics is None: return []
+            metrics.set("agents", sum(1 for a in world.agents if not a.is_dead))
+            metrics.set("dormant", len(world.dormant_index))
+            metrics.set("corpses", len(world.corpses))
+            return metrics.samples()
+        return scheduler.read(collect)
+
+    def advance(self, elapsed):
+        """Runs the ticks due in every running room. Returns seconds until the next one is due."""
+        wait = 1.0
+        for room_id, scheduler in self.rooms.items():
+            if room_id in self.paused: continue
+            scheduler.advance(elapsed)
+            wait = min(wait, scheduler.tick_rate - scheduler.accumulator)
+        return max(0.0, wait)
+
+    def handle(self, request):
+        request_id, command, args = request
+        try:
+            self.send(("reply", request_id, True, getattr(self, command)(*args)))
+        except Exception as e:
+            logger.error(f"Room host: {command} failed: {e}")
+            self.send(("reply", request_id, False, f"{type(e).__name__}: {e}"))
+
+    def run(self, conn):
+        last = time.perf_counter()
+        wait = 0.0
+        while True:
+            if conn.poll(wait):
+                request = conn.recv()
+                if request is None: break
+                self.handle(request)
+            now = time.perf_counter()
+            wait = self.advance(now - last)
+            last = now
+        for room_id in list(self.rooms):
+            try: self.close(room_id)
+            except OSError as e: logger.error(str(e))
+
+
+def _host_main(conn):
+    logging.basicConfig(level=logging.INFO)
+    try:
+        RoomHost(conn.send).run(conn)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        traceback.print_exc()
+
+
+class RoomError(Exception):
+    """A host failed to carry out a request."""
+
+
+class _HostProxy:
+    # Server-side end of one host process: requests out, replies and frames in.
+    # on_exit(proxy) runs on the reader thread once the process is gone.
+    def __init__(self, ctx, on_frame, on_exit=None):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_host_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.on_frame = on_frame
+        self.on_exit = on_exit
+        self.alive = True
+        self.pending = {}
+        self.ids = itertools.count()
+        self.send_lock = threading.Lock()
+        self.rooms = set() # Running or paused here
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def call(self, command, *args):
+        """Sends a request; returns a concurrent Future for its reply."""
+        future = concurrent.futures.Future()
+        with self.send_lock:
+            if not self.alive:
+                future.set_exception(RoomError("Room host exited"))
+                return future
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+            try:
+                self.conn.send((request_id, command, args))
+            except (BrokenPipeError, OSError) as e:
+                del self.pending[request_id]
+                future.set_exception(RoomError(f"Room host unreachable: {e}"))
+        return future
+
+    def _read(self):
+        try:
+            while True:
+                message = self.conn.recv()
+                if message[0] == "frame":
+                    self.on_frame(*message[1:])
+                    continue
+                _, request_id, ok, payload = message
+                future = self.pending.pop(request_id)
+                if ok: future.set_result(payload)
+                else: future.set_exception(RoomError(payload))
+        except (EOFError, OSError):
+            with self.send_lock: # No call() can slip in between
+                self.alive = False
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                if not future.done(): future.set_exception(RoomError("Room host exited"))
+            if self.on_exit: self.on_exit(self)
+
+    def stop(self, timeout=10.0):
+        self.on_exit = None # Expected exit
+        with self.send_lock:
+            try: self.conn.send(None)
+            except (BrokenPipeError, OSError): pass
+        self.process.join(timeout)
+        if self.process.is_alive(): self.process.terminate()
+        self.reader.join(1.0)
+
+
+class Room:
+    """Server-side bookkeeping for one world."""
+
+    def __init__(self, room_id, params, snapshot_path, always_on=False, record_dir=None, manager=None):
+        self.id = room_id
+        self.params = params
+        self.snapshot_path = snapshot_path
+        self.always_on = always_on
+        self.record_dir = record_dir
+        self.state = SUSPENDED
+        self.paused = False # Stays paused across a suspend
+        self.host = None
+        self.width = params.get("width")
+        self.height = params.get("height")
+        self.tick = 0
+        self.manager = manager # The server's ConnectionManager for this room
+        self.viewers = 0
+        self.idle_since = time.monotonic()
+        self.map_bytes = None # Terrain never changes; fetched once
+
+    def to_dict(self):
+        return {"id": self.id, "state": self.state, "always_on": self.always_on, "viewers": self.viewers,
+                "width": self.width, "height": self.height, "tick": self.tick}
+
+
+class WorldRegistry:
+    """Creates, pauses, suspends and destroys rooms across a pool of host processes.
+
+    Methods block until the host has answered; call them from a worker
+    thread (asyncio.to_thread) when on the event loop. Frames are handed to
+    `on_frame(room, frame, views)` on a reader thread; `make_manager(room_id)`,
+    if given, builds each room's Room.manager. With `profile`, every room's
+    world is instrumented (see metrics()). A host process that dies is
+    replaced; its rooms become SUSPENDED and restart from their snapshots
+    on the next attach() or resume() (always-on rooms on the next reap()).
+    """
+
+    def __init__(self, rooms_dir, hosts=None, tick_rate=0.5, idle_after=IDLE_SUSPEND_AFTER,
+                 on_frame=None, make_manager=None, profile=False):
+        self.rooms_dir = rooms_dir
+        self.profile = profile
+        self.tick_rate = tick_rate
+        self.idle_after = idle_after
+        self.on_frame = on_frame
+        self.make_manager = make_manager
+        self.rooms = {}
+        self.lock = threading.RLock()
+        os.makedirs(rooms_dir, exist_ok=True)
+        # spawn: the server has threads running, which fork would copy half-way
+        self._ctx = multiprocessing.get_context("spawn")
+        self.hosts = [self._new_host() for _ in range(hosts or os.cpu_count() or 1)]
+
+    def _new_host(self):
+        return _HostProxy(self._ctx, self._frame, self._host_exited)
+
+    def _host_exited(self, host):
+        with self.lock:
+            if host not in self.hosts: return
+            self.hosts[self.hosts.index(host)] = self._new_host()
+            for room in self.rooms.values():
+                if room.host is host:
+                    room.host = None
+                    room.state = SUSPENDED
+                    logger.error(f"Room host died; suspended room {room.id} at its last snapshot")
+
+    def _frame(self, room_id, frame, views):
+        room = self.rooms.get(room_id)
+        if room is None: return
+        room.tick += 1
+        if self.on_frame: self.on_frame(room, frame, views)
+
+    def get(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is None: raise KeyError(room_id)
+        return room
+
+    def _call(self, room, command, *args):
+        host = room.host
+        if host is None: raise RoomError(f"Room {room.id!r} is suspended")
+        return host.call(command, room.id, *args).result()
+
+    def create(self, room_id, always_on=False, snapshot_path=None, record_dir=None, **params):
+        """Registers a room and starts it; `params` go to WorldEngine().
+
+        Resumes from `snapshot_path` (default: rooms_dir/<id>.snapshot) if that file exists.
+        """
+        if not ROOM_ID.match(room_id): raise ValueError(f"Bad room id {room_id!r}")
+        with self.lock:
+            if room_id in self.rooms: raise ValueError(f"Room {room_id!r} already exists")
+            room = Room(room_id, params, snapshot_path or os.path.join(self.rooms_dir, f"{room_id}.snapshot"),
+                        always_on, record_dir, self.make_manager(room_id) if self.make_manager else None)
+            self.rooms[room_id] = room
+            try:
+                self._start(room)
+            except Exception:
+                del self.rooms[room_id]
+                raise
+        return room
+
+    def _start(self, room):
+        host = min(self.hosts, key=lambda h: len(h.rooms))
+        room.host = host
+        room.width, room.height, room.tick = host.call(
+            "open", room.id, room.snapshot_path, room.params, self.tick_rate, room.record_dir, self.profile).result()
+        host.rooms.add(room.id)
+        room.state = RUNNING
+        if room.paused:
+            host.call("pause", room.id).result()
+            room.state = PAUSED
+
+    def _wake(self, room):
+        with self.lock:
+            if room.state == SUSPENDED: self._start(room)
+
+    def attach(self, room_id):
+        """A viewer joined: resumes the room if it was suspended."""
+        with self.lock:
+            room = self.get(room_id)
+            self._wake(room)
+            room.viewers += 1
+            return room
+
+    def detach(self, room_id):
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None: return
+            room.viewers = max(0, room.viewers - 1)
+            if not room.viewers: room.idle_since = time.monotonic()
+
+    def suspend(self, room_id):
+        """Snapshots the room and frees its host; the next attach() resumes it."""
+        with self.lock:
+            room = self.get(room_id)
+            if room.state == SUSPENDED: return
+            room.tick = self._call(room, "close", True)
+            room.host.rooms.discard(room.id)
+            room.host = None
+            room.state = SUSPENDED
+            logger.info(f"Suspended room {room_id} at tick {room.tick}")
+
+    def pause(self, room_id):
+        with self.lock:
+            room = self.get(room_id)
+            if room.state != RUNNING: raise ValueError(f"Room {room_id!r} is {room.state}")
+            self._call(room, "pause")
+            room.state = PAUSED
+            room.paused = True
+
+    def resume(self, room_id):
+        with self.lock:
+            room = self.get(room_id)
+            room.paused = False
+            if room.state == SUSPENDED: self._start(room)
+            elif room.state == PAUSED:
+                self._call(room, "resume")
+                room.state = RUNNING
+
+    def destroy(self, room_id):
+        """Stops the room for good and deletes its snapshot."""
+        with self.lock:
+            room = self.get(room_id)
+            if room.host: self._call(room, "close", False)
+            if room.host: room.host.rooms.discard(room.id)
+            del self.rooms[room_id]
+            if os.path.exists(room.snapshot_path): os.remove(room.snapshot_path)
+
+    def set_rate(self, room_id, tick_rate):
+        room = self.get(room_id)
+        if room.host: self._call(room, "set_rate", tick_rate)
+
+    def keyframe(self, room_id, view=None):
+        return self._call(self.get(room_id), "keyframe", view)
+
+    def subscribe(self, room_id, view, viewport):
+        self._call(self.get(room_id), "subscribe", view, viewport)
+
+    def unsubscribe(self, room_id, view):
+        room = self.rooms.get(room_id)
+        if room and room.host: room.host.call("unsubscribe", room_id, view) # Fire and forget
+
+    def map_bytes(self, room_id):
+        room = self.get(room_id)
+        if room.map_bytes is None:
+            self._wake(room)
+            room.map_bytes = self._call(room, "map_bytes")
+        return room.map_bytes
+
+    def map(self, room_id):
+        """JSON-friendly map; see WorldEngine.get_map()."""
+        room = self.get(room_id)
+        self._wake(room)
+        return self._call(room, "map")
+
+    def state(self, room_id):
+        room = self.get(room_id)
+        if room.state == SUSPENDED: raise ValueError(f"Room {room_id!r} is suspended")
+        return self._call(room, "state")
+
+    def metrics(self):
+        """[(room_id, samples)] of every loaded room; see RoomHost.metrics()."""
+        calls = []
+        for room in list(self.rooms.values()):
+            host = room.host
+            if host: calls.append((room.id, host.call("metrics", room.id)))
+        results = []
+        for room_id, future in calls:
+            try:
+                results.append((room_id, future.result()))
+            except RoomError:
+                pass # Suspended meanwhile
+        return results
+
+    def reap(self, now=None):
+        """Suspends running rooms that have been without viewers for idle_after seconds."""
+        now = time.monotonic() if now is None else now
+        for room in list(self.rooms.values()):
+            if room.state == SUSPENDED and room.always_on: # Its host died
+                try:
+                    self._wake(room)
+                except RoomError as e:
+                    logger.error(f"Could not restart {room.id}: {e}")
+                continue
+            if (room.state != SUSPENDED and not room.always_on and not room.viewers
+                    and now - room.idle_since >= self.idle_after):
+                try:
+                    self.suspend(room.id)
+                except (RoomError, KeyError) as e:
+                    logger.error(f"Could not suspend {room.id}: {e}")
+
+    def close(self):
+        """Snapshots every live room and stops the hosts."""
+        for room in list(self.rooms.values()):
+            if room.state != SUSPENDED:
+                try: self.suspend(room.id)
+                except RoomError as e: logger.error(f"Could not suspend {room.id}: {e}")
+        with self.lock:
+            hosts, self.hosts = self.hosts, [] # No replacements from here on
+        for host in hosts:
+            host.stop()
@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+import time
+import traceback
+
+from systems.interest import Interest
+
+logger = logging.getLogger(__name__)
+
+MAX_CATCH_UP_TICKS = 5 # Ticks run back-to-back after a stall before the backlog is dropped
+AUTOSAVE_EVERY = 600 # Ticks between snapshots (5 minutes at 0.5s/tick)
+
+
+class SimulationScheduler:
+    """Runs WorldEngine.update() on a worker thread at a fixed timestep.
+
+    The accumulator keeps the average rate exact even when ticks take a
+    while; after a stall at most MAX_CATCH_UP_TICKS are replayed and the
+    rest of the backlog is dropped. Each tick's delta is encoded on the
+    worker and handed to `on_frame(frame, views)` as an immutable string,
+    with `views` holding the filtered frame of every subscribed viewport
+    ({view id: frame}). Anything else
+    touching the world from another thread must go through `read()`.
+    With `autosave_path`, the world is snapshotted every `autosave_every` ticks.
+    A replay.Recorder, if given, is stepped after every tick. If the world
+    has `metrics`, delta building, encoding and whole ticks are timed too.
+    """
+
+    def __init__(self, world, tick_rate, on_frame=None, max_catch_up=MAX_CATCH_UP_TICKS,
+                 autosave_path=None, autosave_every=AUTOSAVE_EVERY, recorder=None):
+        self.world = world
+        self.tick_rate = tick_rate # Seconds per tick
+        self.on_frame = on_frame # on_frame(frame, views) called from the worker thread
+        self.max_catch_up = max_catch_up
+        self.lock = threading.RLock()
+        self.autosave_path = autosave_path
+        self.autosave_every = autosave_every
+        self.recorder = recorder
+        self.accumulator = 0.0
+        self.dropped_ticks = 0
+        self._keyframe = (None, None) # (tick, encoded keyframe)
+        self.interests = {} # {view id: Interest} for clients that sent a viewport
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_tick_rate(self, tick_rate):
+        if tick_rate <= 0: raise ValueError("tick_rate must be positive")
+        self.tick_rate = tick_rate
+
+    def read(self, fn):
+        """Runs fn(world) between ticks."""
+        with self.lock:
+            return fn(self.world)
+
+    def subscribe(self, view, viewport):
+        """Streams only `viewport` to `view` from the next frame on, or moves its viewport.
+
+        A new subscriber is assumed to hold the full state; everything outside
+        the viewport is announced as having left.
+        """
+        with self.lock:
+            interest = self.interests.get(view)
+            if interest is None:
+                world = self.world
+                self.interests[view] = Interest(viewport, (a.id for a in world.agents if not a.is_dead),
+                                                (c.id for c in world.corpses))
+            else:
+                interest.viewport = viewport
+
+    def unsubscribe(self, view):
+        self.interests.pop(view, None)
+
+    def keyframe(self, view=None):
+        """Encoded keyframe of the current state (of `view`'s viewport, if subscribed).
+
+        Full keyframes are shared by everyone asking in the same tick.
+        """
+        with self.lock:
+            interest = self.interests.get(view) if view is not None else None
+            if interest is not None:
+                return json.dumps(interest.keyframe(self.world))
+            tick, frame = self._keyframe
+            if tick != self.world.tick_count:
+                frame = json.dumps(self.world.get_keyframe())
+                self._keyframe = (self.world.tick_count, frame)
+            return frame
+
+    def save(self):
+        """Snapshots the world to autosave_path between ticks. Returns False if that failed."""
+        if not self.autosave_path: return False
+        try:
+            with self.lock:
+                t0 = time.perf_counter()
+                self.world.save(self.autosave_path)
+                tick = self.world.tick_count
+            logger.info(f"Saved tick {tick} to {self.autosave_path} in {time.perf_counter() - t0:.2f}s")
+            return True
+        except OSError as e:
+            logger.error(f"Autosave failed: {e}")
+            return False
+
+    def step(self):
+        metrics = self.world.metrics
+        clock = time.perf_counter
+        with self.lock:
+            t0 = clock()
+            self.world.update()
+            if self.recorder: self.recorder.after_tick()
+            t1 = clock()
+            delta = self.world.get_delta()
+            t2 = clock()
+            frame = json.dumps(delta)
+            t3 = clock()
+            views = {view: json.dumps(interest.filter(self.world, delta))
+                     for view, interest in list(self.interests.items())}
+        if metrics is not None:
+            t4 = clock()
+            metrics.observe("tick_phase_seconds", "state", t2 - t1)
+            metrics.observe("tick_phase_seconds", "serialize", t3 - t2)
+            if views: metrics.observe("tick_phase_seconds", "views", t4 - t3)
+            metrics.observe("tick_phase_seconds", "tick", t4 - t0)
+        if self.on_frame: self.on_frame(frame, views)
+        if self.autosave_path and self.world.tick_count % self.autosave_every == 0:
+            self.save()
+
+    def advance(self, elapsed):
+        """Adds wall time to the accumulator and runs the ticks now due. Returns how many ran."""
+        self.accumulator += elapsed
+        ticks = 0
+        while self.accumulator >= self.tick_rate:
+            if ticks >= self.max_catch_up:
+                # Too far behind: drop the backlog rather than spiral
+                backlog = int(self.accumulator // self.tick_rate)
+                self.dropped_ticks += backlog
+                if self.world.metrics is not None: self.world.metrics.inc("dropped_ticks", value=backlog)
+                self.accumulator -= backlog * self.tick_rate
+                logger.warning(f"Simulation behind schedule, dropped {backlog} ticks")
+                break
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"Simulation Loop Error: {e}")
+                traceback.print_exc()
+            self.accumulator -= self.tick_rate
+            ticks += 1
+        return ticks
+
+    def _run(self):
+        logger.info("Starting Simulation Loop...")
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            self.advance(now - last)
+            last = now
+            # Sleep until the next tick is due (also wakes promptly on stop)
+            self._stop.wait(max(0.0, self.tick_rate - self.accumulator))
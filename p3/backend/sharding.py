@@ -0,0 +1,418 @@
+"""Region-sharded world: one WorldEngine per rectangle of the map, each in its own process.
+
+    python3 backend/sharding.py --agents 100000 --size 4096 --shards 4x2 --ticks 20
+    python3 backend/sharding.py --agents 100000 --size 4096 --shards 1x1 --ticks 20   # baseline
+
+The map is cut into a grid of rectangular shards. A shard's worker process
+owns the agents standing inside its rectangle and runs the usual tick over
+them. Each tick:
+
+- agents near a border are mirrored into the neighbouring shards as ghosts
+  (read-only stand-ins, HALO tiles deep), so neighbour queries, targeting
+  and movement blocking see across borders;
+- attacks on and trades with a ghost are forwarded to its owner and applied
+  at the start of the next tick;
+- agents that walked out of their rectangle are handed off, with their
+  memes, to the shard they walked into.
+
+Not everything crosses a border, so near one a sharded run is not
+equivalent to a single world:
+- speech only reaches listeners in the speaker's own shard; ghosts never
+  hear anything, and neither do their owners;
+- the trader navigation field (GOAL_TRADER) only targets traders owned by
+  the local shard.
+
+The coordinator (ShardedWorld) keeps tick_count, time_of_day and the merged
+event stream. It also makes the nightly monster roll for the whole map,
+capped at MAX_MONSTERS overall, and has the owning shard raise the monster.
+Agent and corpse ids come from disjoint per-shard ranges.
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+import traceback
+
+from simulation import (WorldEngine, Agent, NEIGHBOR_RADIUS, TICKS_PER_HOUR, JOB_MONSTER, MONSTER_CHANCE,
+                        MAX_MONSTERS, night_hour)
+from systems.inventory import Item
+
+HALO = NEIGHBOR_RADIUS + 1 # Ghost depth: perception radius plus one step of movement
+ID_STRIDE = 1 << 27 # Ids minted by shard i start at (i + 1) * ID_STRIDE; fits the event log's int32
+MAX_SHARDS = (1 << 31) // ID_STRIDE - 1 # 15: the last shard's ids must stay below 2**31
+
+
+class Ghost:
+    """A neighbour shard's agent, visible here for one tick.
+
+    Carries just what decisions look at. Effects aimed at it go to `outbox`
+    for its owning shard instead of being applied. It is not a listener:
+    speech said near it is not forwarded to its owner.
+    """
+    is_dead = False
+
+    def __init__(self, record, outbox):
+        self.id, self.name, self._x, self._y, self.job = record
+        self._hunger = 0.0
+        self._energy = 100.0
+        self.max_hunger = 100.0
+        self.max_energy = 100.0
+        self._store = None
+        self._row = None
+        self.outbox = outbox
+
+    @property
+    def x(self): return self._x
+
+    @property
+    def y(self): return self._y
+
+    def take_damage(self, amount, attacker, world):
+        self.outbox.append(("damage", self.id, amount, ghost_record(attacker)))
+
+    def buy(self, item):
+        self.outbox.append(("buy", self.id, item.to_record()))
+
+
+def ghost_record(agent):
+    return (agent.id, agent.name, agent.x, agent.y, agent.job)
+
+
+def bundle(world, agent):
+    """An agent's record plus the memes it refers to, for adopting it into another world."""
+    openness, vocabulary, history = agent.memetics.to_record()
+    ids = {mid for ids in vocabulary.values() for mid in ids}.union(history)
+    memes = {mid: (m.text, m.sentiment, m.parent_id, m.generation)
+             for mid in ids if (m := world.memes.get(mid)) is not None}
+    return agent.to_record(), memes
+
+
+class Shard:
+    """The worker side: a WorldEngine plus the hand-off and halo bookkeeping for one rectangle."""
+
+    def __init__(self, index, rect, width, height, grid, seed, columnar):
+        self.index = index
+        self.rect = rect # (x0, y0, x1, y1), x1/y1 exclusive
+        self.world = WorldEngine(width, height, num_agents=0, seed=seed, columnar=columnar, grid=grid)
+        self.world.agents = [] # Drop the trader every new world spawns
+        self.world._spawned.clear()
+        self.world.spawns_monsters = False
+        self.world.last_id = (index + 1) * ID_STRIDE
+        self.by_id = {}
+        self.ghosts = []
+        self.outbox = []
+
+    def owns(self, x, y):
+        x0, y0, x1, y1 = self.rect
+        return x0 <= x < x1 and y0 <= y < y1
+
+    def adopt(self, bundles):
+        """Agents handed over by other shards: (agent record, {meme id: meme record})."""
+        world = self.world
+        for record, memes in bundles:
+            local = {mid: world.memes.intern(text, sentiment, parent_id, generation).id
+                     for mid, (text, sentiment, parent_id, generation) in memes.items()}
+            openness, vocabulary, history = record[-1]
+            vocabulary = {k: [local[mid] for mid in ids] for k, ids in vocabulary.items()}
+            history = [local[mid] for mid in history if mid in local]
+            agent = Agent.from_record(record[:-1] + ((openness, vocabulary, history),), world.rng.memetics, world.memes)
+            world.add_agent(agent)
+            self.by_id[agent.id] = agent
+
+    def apply(self, effects):
+        """Effects other shards aimed at ghosts of our agents last tick."""
+        world = self.world
+        for kind, target_id, *args in effects:
+            target = self.by_id.get(target_id)
+            if target is None or target.is_dead: continue # Not ours, or already gone
+            if kind == "damage":
+                amount, attacker = args
+                target.take_damage(amount, self.by_id.get(attacker[0]) or Ghost(attacker, self.outbox), world)
+            elif kind == "buy":
+                target.buy(Item(*args[0]))
+
+    def tick(self, tick, time_of_day, immigrants, effects, ghosts, want_delta, monster=None):
+        """One tick; `monster` is the (x, y) the coordinator picked to raise a monster on, if any."""
+        world = self.world
+        self.outbox = []
+        self.adopt(immigrants)
+        world.tick_count = tick - 1
+        world.time_of_day = time_of_day
+        self.apply(effects)
+        self.ghosts = [Ghost(record, self.outbox) for record in ghosts]
+        for ghost in self.ghosts: world._index_agent(ghost)
+        t0 = time.process_time() # CPU time: what the shard would take on a core of its own
+        world.update()
+        if monster is not None: world._spawn_monster(*monster)
+        elapsed = time.process_time() - t0
+        for ghost in self.ghosts:
+            world.spatial.remove(ghost)
+            world._vacate(ghost.y * world.width + ghost.x)
+            if ghost._store is not None: ghost._store.detach(ghost)
+        self.ghosts = []
+
+        living = [a for a in world.agents if not a.is_dead]
+        self.by_id = {a.id: a for a in living}
+        emigrants = [a for a in living if not self.owns(a.x, a.y)]
+        x0, y0, x1, y1 = self.rect
+        border = [ghost_record(a) for a in living
+                  if a.x < x0 + HALO or a.x >= x1 - HALO or a.y < y0 + HALO or a.y >= y1 - HALO]
+        crossing = [a.to_dict() for a in emigrants]
+        bundles = [self.release(a) for a in emigrants]
+        delta = world.get_delta() if want_delta else None
+        return {
+            "emigrants": bundles,
+            "crossing": crossing,
+            "border": border,
+            "effects": self.outbox,
+            "events": delta["events"] if delta else world.pop_events(),
+            "delta": delta,
+            "alive": len(self.by_id),
+            "monsters": sum(a.job == JOB_MONSTER for a in living), # Emigrants included
+            "update_s": elapsed,
+        }
+
+    def release(self, agent):
+        """Takes a living agent out of this shard; returns what adopt() needs to rebuild it elsewhere."""
+        world = self.world
+        packed = bundle(world, agent)
+        world.retire_agent(agent)
+        agent.memetics.release()
+        world._agents.remove(agent)
+        del self.by_id[agent.id]
+        return packed
+
+    def state(self):
+        state = self.world.get_state()
+        return state["agents"], state["corpses"]
+
+
+def _shard_main(conn, index, rect, width, height, grid, seed, columnar, records):
+    # Worker loop: one request, one reply
+    try:
+        shard = Shard(index, rect, width, height, grid, seed, columnar)
+        shard.adopt(records)
+        shard.world._spawned.clear() # The starting population reaches clients in keyframes, not a delta
+        conn.send(("ready", len(shard.world.agents)))
+        while True:
+            command, *args = conn.recv()
+            if command == "tick": conn.send(("ok", shard.tick(*args)))
+            elif command == "state": conn.send(("ok", shard.state()))
+            elif command == "stop": break
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def split(width, height, cols, rows):
+    """Rectangles (x0, y0, x1, y1) of a cols x rows grid of shards, row-major."""
+    xs = [width * i // cols for i in range(cols + 1)]
+    ys = [height * j // rows for j in range(rows + 1)]
+    return [(xs[i], ys[j], xs[i + 1], ys[j + 1]) for j in range(rows) for i in range(cols)]
+
+
+class ShardedWorld:
+    """Coordinator for a WorldEngine split into cols x rows worker processes.
+
+    The starting population comes from a regular WorldEngine with the same
+    seed, dealt out to shards by position. With `deltas`, shards ship their
+    deltas back every tick and get_delta() merges them (the scheduler's
+    update/get_delta loop works unchanged); without, only events come back.
+    Call close() when done.
+    """
+
+    def __init__(self, width, height, num_agents, shards=(2, 2), seed=None, columnar=True, deltas=False):
+        cols, rows = shards
+        if cols * rows > MAX_SHARDS:
+            raise ValueError(f"{cols}x{rows} shards is more than {MAX_SHARDS}: ids would overflow int32")
+        source = WorldEngine(width, height, num_agents, seed=seed, columnar=columnar)
+        self.width = width
+        self.height = height
+        self.tick_count = source.tick_count
+        self.time_of_day = source.time_of_day
+        self.rng = random.Random(f"{source.rng.seed}:monsters")
+        self.passable = source.passable
+        self.monsters = source.living_monsters()
+        self.events = []
+        self._new_events = []
+        self.rects = split(width, height, *shards)
+        self._immigrants = [[] for _ in self.rects]
+        self._crossing = [] # to_dict() of agents between shards until the next tick adopts them
+        self._ghosts = [[] for _ in self.rects]
+        self._effects = []
+        self.alive = 0
+        self.handoffs = 0 # Agents moved between shards so far
+        self.deltas = deltas
+        self._deltas = []
+        self.timings = [0.0] * len(self.rects) # CPU seconds each shard spent in update()
+
+        records = [[] for _ in self.rects]
+        for agent in source.agents:
+            if agent.is_dead: continue
+            records[self._owner(agent.x, agent.y)].append(bundle(source, agent))
+        grid = bytes(source.grid)
+        ctx = multiprocessing.get_context()
+        self._conns = []
+        self._procs = []
+        for i, rect in enumerate(self.rects):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_shard_main, name=f"shard-{i}", daemon=True,
+                               args=(child, i, rect, width, height, grid, source.rng.seed * 1000 + i + 1,
+                                     columnar, records[i]))
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        self.alive = sum(self._recv(conn) for conn in self._conns)
+
+    def _owner(self, x, y):
+        for i, (x0, y0, x1, y1) in enumerate(self.rects):
+            if x0 <= x < x1 and y0 <= y < y1: return i
+        raise ValueError(f"({x}, {y}) is off the map")
+
+    def _roll_monster(self, time_of_day):
+        """WorldEngine's nightly monster roll and cap, for the whole map: a walkable (x, y) or None."""
+        if not night_hour(time_of_day) or self.rng.random() >= MONSTER_CHANCE: return None
+        if self.monsters >= MAX_MONSTERS: return None
+        for _ in range(100):
+            x, y = self.rng.randrange(self.width), self.rng.randrange(self.height)
+            if self.passable[y * self.width + x]: return x, y
+        return None
+
+    @staticmethod
+    def _recv(conn):
+        status, payload = conn.recv()
+        if status == "error": raise RuntimeError(f"Shard failed:\n{payload}")
+        return payload
+
+    def update(self, timings=None):
+        """Advances every shard one tick, in parallel.
+
+        If given, `timings["update"]` accumulates the slowest shard's update time.
+        """
+        tick = self.tick_count + 1
+        time_of_day = (self.time_of_day + 1) % 24 if tick % TICKS_PER_HOUR == 0 else self.time_of_day
+        monster = self._roll_monster(time_of_day)
+        owner = self._owner(*monster) if monster is not None else None
+        for i, conn in enumerate(self._conns):
+            conn.send(("tick", tick, self.time_of_day, self._immigrants[i], self._effects, self._ghosts[i], self.deltas,
+                       monster if i == owner else None))
+        results = [self._recv(conn) for conn in self._conns]
+
+        self.tick_count = tick
+        self.time_of_day = time_of_day
+
+        immigrants = [[] for _ in self.rects]
+        for result in results:
+            for record, memes in result["emigrants"]:
+                immigrants[self._owner(record[2], record[3])].append((record, memes))
+        moving = {record[0] for bundles in immigrants for record, _ in bundles}
+        ghosts = [[] for _ in self.rects]
+        for source, result in enumerate(results):
+            for record in result["border"]:
+                if record[0] in moving: continue # Arrives as a real agent instead
+                _, _, x, y, _ = record
+                for i, (x0, y0, x1, y1) in enumerate(self.rects):
+                    if i != source and x0 - HALO <= x < x1 + HALO and y0 - HALO <= y < y1 + HALO:
+                        ghosts[i].append(record)
+        self._immigrants = immigrants
+        self._crossing = [agent for result in results for agent in result["crossing"]]
+        self._ghosts = ghosts
+        self._effects = [effect for result in results for effect in result["effects"]]
+
+        for i, result in enumerate(results):
+            self.timings[i] += result["update_s"]
+            self._new_events.extend(result["events"])
+            self.events.extend(result["events"])
+        self.events = self.events[-5:]
+        self.alive = sum(r["alive"] for r in results) + len(moving)
+        self.monsters = sum(r["monsters"] for r in results)
+        self.handoffs += len(moving)
+        if self.deltas: self._deltas = [r["delta"] for r in results]
+        if timings is not None:
+            timings["update"] = timings.get("update", 0.0) + max(r["update_s"] for r in results)
+
+    def get_delta(self):
+        """The shards' deltas of the last tick, merged into one (call once per update(), like WorldEngine's).
+
+        A handed-off agent's removal by its old shard is dropped and it is
+        sent whole as spawned instead, then again by its new shard next tick.
+        """
+        merged = {
+            "type": "delta", "tick": self.tick_count, "time": self.time_of_day,
+            "agents": {"spawned": [], "changed": [], "removed": []},
+            "corpses": {"added": [], "changed": [], "removed": []},
+            "events": self._new_events,
+        }
+        for delta in self._deltas:
+            for group in ("agents", "corpses"):
+                for key, items in delta[group].items():
+                    merged[group][key].extend(items)
+        crossing = {agent["id"] for agent in self._crossing}
+        if crossing:
+            agents = merged["agents"]
+            agents["removed"] = [aid for aid in agents["removed"] if aid not in crossing]
+            agents["spawned"].extend(self._crossing)
+        self._new_events = []
+        self._deltas = []
+        return merged
+
+    def get_state(self):
+        agents, corpses = [], []
+        for conn in self._conns:
+            conn.send(("state",))
+        for conn in self._conns:
+            shard_agents, shard_corpses = self._recv(conn)
+            agents.extend(shard_agents)
+            corpses.extend(shard_corpses)
+        return {"tick": self.tick_count, "time": self.time_of_day, "width": self.width, "height": self.height,
+                "agents": agents + self._crossing, "corpses": corpses, "events": self.events}
+
+    def get_keyframe(self):
+        return {"type": "keyframe", **self.get_state()}
+
+    def close(self):
+        for conn in self._conns:
+            try: conn.send(("stop",))
+            except (BrokenPipeError, OSError): pass
+        for proc in self._procs:
+            proc.join(5)
+            if proc.is_alive(): proc.terminate()
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--shards", default="2x2", help="COLSxROWS")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    cols, rows = (int(n) for n in args.shards.lower().split("x"))
+
+    t0 = time.perf_counter()
+    with ShardedWorld(args.size, args.size, args.agents, (cols, rows), seed=args.seed) as world:
+        setup = time.perf_counter() - t0
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            world.update()
+        elapsed = time.perf_counter() - start
+        busiest = max(world.timings) / args.ticks * 1000
+        print(f"{args.agents} agents {args.size}x{args.size} on {cols}x{rows} shards: "
+              f"{args.ticks / elapsed:.2f} ticks/s (setup {setup:.1f}s, busiest shard {busiest:.1f}ms/tick, "
+              f"{world.alive} alive)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
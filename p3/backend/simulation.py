@@ -1,20 +1,27 @@
 import random
-import uuid
-import math
+import itertools
 import logging
-from systems.psychology import Psychology, EpisodicMemory
+import time
+from collections import deque
+import numpy as np
+from systems.psychology import Psychology, EpisodicMemory, EpisodicStore
 from systems.inventory import Inventory, Item, CraftingSystem
-from systems.memetics import MemeticHost
+from systems.memetics import MemeticHost, MemeRegistry
 from systems.entities import Corpse, Clan
+from systems.spatial import SpatialHash, radius_pairs
+from systems.rng import RandomStreams
+from systems.agent_store import AgentStore, NO_ACTION
+from systems.timers import TimerWheel
+from systems.snapshot import SnapshotWriter, SnapshotReader, SnapshotError
+from systems.eventlog import EVENT_SPAWN, EVENT_ACTION, EVENT_DEATH, EVENT_CRAFT, EVENT_MEME
+from systems.terrain import (TERRAIN_GRASS, TERRAIN_WALL, TERRAIN_WATER, TERRAIN_FOREST, TERRAIN_NAMES,
+                             WALL, FOREST, passability_mask, encode_map, generate_biomes, ore_faces)
+from systems.navigation import Navigator
 
 logger = logging.getLogger(__name__)
 
 # --- Enums / Constants ---
 GRID_SIZE = 64
-TERRAIN_GRASS = "grass"
-TERRAIN_WALL = "wall"
-TERRAIN_WATER = "water"
-TERRAIN_FOREST = "forest"
 
 ACTION_MOVE = "move"
 ACTION_EAT = "eat"
@@ -34,30 +41,112 @@ JOB_THIEF = "thief"
 JOB_TRADER = "trader"
 JOB_MONSTER = "monster"
 
+# Integer codes for the columnar store / batched passes (index into these tuples)
+ACTIONS = (ACTION_MOVE, ACTION_EAT, ACTION_SLEEP, ACTION_IDLE, ACTION_ATTACK,
+           ACTION_GATHER, ACTION_CRAFT, ACTION_TRADE, ACTION_STEAL)
+ACTION_CODES = {a: code for code, a in enumerate(ACTIONS)}
+JOBS = (JOB_LUMBERJACK, JOB_GUARD, JOB_GATHERER, JOB_BLACKSMITH, JOB_THIEF, JOB_TRADER, JOB_MONSTER)
+JOB_CODES = {j: code for code, j in enumerate(JOBS)}
+TARGETED_ACTIONS = (ACTION_ATTACK, ACTION_TRADE, ACTION_STEAL) # Logged with their target's id
+
+# Passive upkeep per action: (energy delta, hunger delta, hunger applied every N ticks)
+UPKEEP = {
+    ACTION_MOVE: (-1, 1, 5),
+    ACTION_EAT: (-1, -20, 1),
+    ACTION_GATHER: (-2, 2, 5),
+    ACTION_SLEEP: (5, 1, 10), # Slower regen
+    ACTION_IDLE: (-0.5, 0.5, 10),
+}
+SUNLIGHT_DAMAGE = 20 # Idle monsters burn by day
+MONSTER_CHANCE = 0.05 # Per night tick; low because the night is long
+MAX_MONSTERS = 3
+
+# UPKEEP as arrays indexed by action code; the extra last slot is NO_ACTION (-1)
+_UPKEEP_ENERGY = np.array([UPKEEP.get(a, (0, 0, 1))[0] for a in ACTIONS] + [0], dtype=np.float64)
+_UPKEEP_HUNGER = np.array([UPKEEP.get(a, (0, 0, 1))[1] for a in ACTIONS] + [0], dtype=np.float64)
+_UPKEEP_PERIOD = np.array([UPKEEP.get(a, (0, 0, 1))[2] for a in ACTIONS] + [1], dtype=np.int64)
+
 # Configuration for Time
 TICKS_PER_HOUR = 30 # 0.5s * 30 = 15s per hour. Day = 15s * 24 = 6 minutes.
 
+# Dirty flags: which to_dict() groups changed since the last delta
+DIRTY_POS = 1
+DIRTY_STATS = 2
+DIRTY_SPEECH = 4
+
+# decide_action's neighbor radius, as tile offsets for the batched (rasterized) neighbor counts
+NEIGHBOR_RADIUS = 4
+_NEIGHBOR_OFFSETS = [(dx, dy) for dy in range(-NEIGHBOR_RADIUS, NEIGHBOR_RADIUS + 1)
+                     for dx in range(-NEIGHBOR_RADIUS, NEIGHBOR_RADIUS + 1)
+                     if dx * dx + dy * dy <= NEIGHBOR_RADIUS * NEIGHBOR_RADIUS]
+
+# Score columns a lone sleeper's choice is compared against while it is dormant (survival ones are re-simulated)
+_RIVAL_COLUMNS = [code for code, a in enumerate(ACTIONS) if a not in (ACTION_EAT, ACTION_SLEEP)]
+
+MEME_RADIUS = 5 # How far speech carries
+SCAVENGE_RADIUS = 1 # Corpses this close can be looted
+
+# Agents built outside a world count down, so they never collide with world-minted ids
+_standalone_ids = itertools.count(-1, -1)
+
+SMITH_TARGET = "Sword" # What blacksmiths plan their work towards
+
+# Shared navigation goals (see systems.navigation)
+GOAL_FOREST = "forest"
+GOAL_ORE = "ore" # Walkable cells next to a wall
+GOAL_TRADER = "trader"
+RESOURCE_GOALS = {"Wood": GOAL_FOREST, "Ore": GOAL_ORE}
+TRADER_RANGE = 24 # Steps the trader field reaches; it is re-pathed whenever a trader moves
+SELL_URGE = 25 # Extra move score for agents with a full bag and no trader in sight
+RECIPES = tuple(CraftingSystem.RECIPES)
+RECIPE_CODES = {name: code for code, name in enumerate(RECIPES)} # For the event log
+
+
+def night_hour(hour):
+    return hour >= 22 or hour < 6
+
+def gather_loot(job, terrain, ore_face=False):
+    """Resource a gather action can yield for this job on this terrain (None if nothing).
+
+    Walls can't be stood on, so blacksmiths mine Ore from one next to them (`ore_face`).
+    """
+    if terrain == FOREST: return "Wood"
+    if job == JOB_BLACKSMITH and ore_face: return "Ore"
+    return None
+
+
+def smith_goal(plan):
+    """Where a blacksmith with nothing to craft should head: the first missing resource's goal."""
+    for item, _ in plan.missing:
+        goal = RESOURCE_GOALS.get(item)
+        if goal: return goal
+    return None
+
 # --- Models ---
 
 class Agent:
-    def __init__(self, x, y, name="Bot", job=None):
-        self.id = str(uuid.uuid4())[:8]
+    def __init__(self, x, y, name="Bot", job=None, agent_id=None, rng=random, meme_rng=None, memes=None):
+        # rng seeds identity (job, personality); meme_rng drives this agent's memetics, memes is its MemeRegistry
+        self.id = agent_id if agent_id is not None else next(_standalone_ids)
         self.name = name
-        self.x = x
-        self.y = y
-        self.job = job if job else random.choice([JOB_LUMBERJACK, JOB_GUARD, JOB_GATHERER, JOB_BLACKSMITH, JOB_THIEF])
+        self._dirty = 0
+        self._store = None # AgentStore holding hunger/energy when the world is columnar
+        self._row = None
+        self._x = x
+        self._y = y
+        self.job = job if job else rng.choice([JOB_LUMBERJACK, JOB_GUARD, JOB_GATHERER, JOB_BLACKSMITH, JOB_THIEF])
         self.color = self._get_job_color()
         self.clan = None 
         self.is_dead = False
         
         # Core Systems
-        self.psyche = Psychology()
+        self.psyche = Psychology(rng)
         self.inventory = Inventory()
-        self.memetics = MemeticHost(self.psyche.openness)
+        self.memetics = MemeticHost(self.psyche.openness, meme_rng or rng, memes)
         
         # Stats
-        self.hunger = 0
-        self.energy = 100
+        self._hunger = 0
+        self._energy = 100
         self.max_hunger = 100
         self.max_energy = 100
         
@@ -66,14 +155,72 @@ class Agent:
         self.memory = {
             "hostile_agents": set(),
             "last_action": None,
-            "logs": [], 
-            "episodes": []
+            "logs": deque(maxlen=10),
+            "episodes": EpisodicStore()
         }
         self.current_speech = None
         self.speech_tick = 0
         self._current_target = None
         self._craft_target = None
         self._trade_target = None
+        self._goal = None # Navigation goal followed by the next move
+        self._sleep_rival = None # Best non-survival score when this tick's choice was sleeping alone
+        self._wake_tick = None # Set while dormant (see WorldEngine._doze)
+        self._asleep_since = None # Last tick whose sleep upkeep a dormant agent has been given
+
+    # Tracked fields: setters flag the group so get_delta() can send only what changed.
+    # Positions are mirrored into the store; hunger/energy live in it while attached.
+    @property
+    def x(self): return self._x
+
+    @x.setter
+    def x(self, value):
+        if value != self._x:
+            self._x = value
+            self._dirty |= DIRTY_POS
+            if self._store is not None: self._store.x[self._row] = value
+
+    @property
+    def y(self): return self._y
+
+    @y.setter
+    def y(self, value):
+        if value != self._y:
+            self._y = value
+            self._dirty |= DIRTY_POS
+            if self._store is not None: self._store.y[self._row] = value
+
+    @property
+    def hunger(self):
+        if self._store is None: return self._hunger
+        return float(self._store.hunger[self._row])
+
+    @hunger.setter
+    def hunger(self, value):
+        if self._store is None:
+            if value == self._hunger: return
+            self._hunger = value
+        else:
+            column = self._store.hunger
+            if value == column[self._row]: return
+            column[self._row] = value
+        self._dirty |= DIRTY_STATS
+
+    @property
+    def energy(self):
+        if self._store is None: return self._energy
+        return float(self._store.energy[self._row])
+
+    @energy.setter
+    def energy(self, value):
+        if self._store is None:
+            if value == self._energy: return
+            self._energy = value
+        else:
+            column = self._store.energy
+            if value == column[self._row]: return
+            column[self._row] = value
+        self._dirty |= DIRTY_STATS
 
     def _get_job_color(self):
         if self.job == JOB_LUMBERJACK: return "#8D6E63" 
@@ -86,18 +233,15 @@ class Agent:
         return "#BDBDBD"
 
     def calculate_prestige(self):
-        score = len(self.inventory.items)
+        score = len(self.inventory)
         if self.inventory.equipped["hand"]: score += 5
         if self.inventory.equipped["body"]: score += 3
         score += (self.energy / 20)
         return score / 100.0 
 
-    def log_event(self, message, emotional_weight=0, event_type="neutral", tick=0):
+    def log_event(self, message, emotional_weight=0, event_type="neutral", tick=0, related_agent_id=None):
         self.memory["logs"].append(message)
-        if len(self.memory["logs"]) > 10:
-            self.memory["logs"].pop(0)
-            
-        episode = EpisodicMemory(tick, event_type, message, emotional_weight)
+        episode = EpisodicMemory(tick, event_type, message, emotional_weight, related_agent_id)
         self.memory["episodes"].append(episode)
         
         if emotional_weight < -2:
@@ -108,8 +252,9 @@ class Agent:
     def say(self, sentiment, tick_now, world):
         if self.speech_cooldown > 0 or self.job == JOB_MONSTER: return
 
-        if self.psyche.sanity < 30 and random.random() < 0.4:
+        if self.psyche.sanity < 30 and world.rng.agents.random() < 0.4:
             text = "..." 
+            meme = None # Mumbling spreads nothing
         else:
             meme = self.memetics.express(sentiment)
             if not meme: return
@@ -117,23 +262,17 @@ class Agent:
 
         self.current_speech = text
         self.speech_tick = tick_now
+        self._dirty |= DIRTY_SPEECH
         self.speech_cooldown = 20 # 10s silence
         
-        self._broadcast_meme(meme, world)
-
-    def _broadcast_meme(self, meme, world):
-        if not meme: return
-        prestige = len(self.inventory.items) / 10.0
-        nearby = self._get_nearby_agents(world, radius=5)
-        for other in nearby:
-            if other.job == JOB_MONSTER: continue
-            infected = other.memetics.expose(meme, prestige)
-            if infected:
-                other.log_event(f"Learned '{meme.text}' from {self.name}", 0.5, "learning", world.tick_count)
+        if meme: world.queue_utterance(self, meme) # Heard at the end of the tick
 
     def decide_action(self, world):
+        # Reference path; columnar worlds use WorldEngine.decide_actions, which must stay equivalent
+        self._sleep_rival = None
         if self.is_dead: return ACTION_IDLE
         if self.speech_cooldown > 0: self.speech_cooldown -= 1
+        self._goal = None
 
         scores = {
             ACTION_MOVE: 0, ACTION_EAT: 0, ACTION_SLEEP: 0, ACTION_IDLE: 0,
@@ -145,8 +284,9 @@ class Agent:
         nearby_hostiles = [a for a in nearby_agents if a.id in self.memory["hostile_agents"] or a.job == JOB_MONSTER]
         
         # Chat (Increased probability slightly, controlled by cooldown)
-        if nearby_hostiles and random.random() < 0.3: self.say("hostile", world.tick_count, world)
-        elif nearby_agents and random.random() < 0.2: self.say("friendly", world.tick_count, world)
+        rng = world.rng.agents
+        if nearby_hostiles and rng.random() < 0.3: self.say("hostile", world.tick_count, world)
+        elif nearby_agents and rng.random() < 0.2: self.say("friendly", world.tick_count, world)
 
         # 1. Survival
         scores[ACTION_EAT] = (self.hunger / self.max_hunger) * 100
@@ -193,7 +333,8 @@ class Agent:
         # 3. Economy (Trade)
         self._trade_target = None
         traders = [a for a in nearby_agents if a.job == JOB_TRADER]
-        if traders and len(self.inventory.items) > 5 and not is_night:
+        selling = len(self.inventory) > 5 and not is_night
+        if traders and selling:
             scores[ACTION_TRADE] = 70
             self._trade_target = traders[0]
         
@@ -201,24 +342,32 @@ class Agent:
         scores[ACTION_MOVE] = 20
         scores[ACTION_IDLE] = 5
         
-        terrain = world.get_terrain(self.x, self.y)
+        terrain = world.terrain_code(self.x, self.y)
         self._craft_target = None
+        goal = None
 
         if not is_night: 
             if self.job == JOB_LUMBERJACK:
-                if terrain == TERRAIN_FOREST: scores[ACTION_GATHER] = 40
-                else: scores[ACTION_MOVE] += 10
+                if terrain == FOREST: scores[ACTION_GATHER] = 40
+                else:
+                    scores[ACTION_MOVE] += 10
+                    goal = GOAL_FOREST
             elif self.job == JOB_BLACKSMITH:
-                if self.inventory.count("Ore") >= 2:
-                    if CraftingSystem.can_craft(self.inventory, "Sword"):
-                        self._craft_target = "Sword"
-                        scores[ACTION_CRAFT] = 80
-                elif terrain == TERRAIN_WALL: 
+                plan = CraftingSystem.plan(self.inventory, SMITH_TARGET)
+                if plan.next_step:
+                    self._craft_target = plan.next_step
+                    scores[ACTION_CRAFT] = 80
+                elif gather_loot(self.job, terrain, world.ore_face[self.y * world.width + self.x]) in dict(plan.missing):
                     scores[ACTION_GATHER] = 40
                 else:
                     scores[ACTION_MOVE] += 10 
+                    goal = smith_goal(plan)
             elif self.job == JOB_GATHERER:
                 scores[ACTION_GATHER] = 30
+        if selling and not traders:
+            scores[ACTION_MOVE] += SELL_URGE
+            goal = GOAL_TRADER
+        self._goal = goal
         
         if self.inventory.equipped["hand"] is None:
              if CraftingSystem.can_craft(self.inventory, "Spear"):
@@ -231,35 +380,33 @@ class Agent:
             self._current_target = nearby_hostiles[0] if nearby_hostiles else (nearby_agents[0] if nearby_agents else None)
         elif best_action == ACTION_STEAL:
             self._current_target = nearby_agents[0] if nearby_agents else None
+        elif best_action == ACTION_SLEEP and not nearby_agents:
+            self._sleep_rival = max(v for a, v in scores.items() if a not in (ACTION_EAT, ACTION_SLEEP))
 
         return best_action
 
     def perform_action(self, action, world):
         self.memory["last_action"] = action
         tick = world.tick_count
+
+        # Columnar worlds apply upkeep for everyone at once, after all agents acted
+        if self._store is None:
+            self._apply_upkeep(action, world)
+        else:
+            self._store.action[self._row] = ACTION_CODES[action]
+        if world.event_log is not None or world.metrics is not None:
+            target = self._trade_target if action == ACTION_TRADE else self._current_target
+            world.record_event(EVENT_ACTION, self.id, ACTION_CODES[action],
+                               target.id if target and action in TARGETED_ACTIONS else 0)
         
         if action == ACTION_MOVE:
-            self._move_randomly(world)
-            self.energy = max(0, self.energy - 1)
-            # Hunger grows slower now (1.5s per tick is gone, but we want 6m cycle)
-            if tick % 5 == 0: self.hunger = min(self.max_hunger, self.hunger + 1)
-            
-        elif action == ACTION_EAT:
-            self.hunger = max(0, self.hunger - 20)
-            self.energy = max(0, self.energy - 1)
+            self._move(world)
+            if self.job != JOB_MONSTER: world.scavenge(self)
             
         elif action == ACTION_GATHER:
-            self.energy = max(0, self.energy - 2)
-            if tick % 5 == 0: self.hunger = min(self.max_hunger, self.hunger + 2)
-            terrain = world.get_terrain(self.x, self.y)
-            
-            loot = None
-            if self.job == JOB_BLACKSMITH and terrain == TERRAIN_WALL:
-                loot = "Ore"
-            elif terrain == TERRAIN_FOREST:
-                loot = "Wood"
-            
-            if loot and random.random() < 0.6:
+            loot = gather_loot(self.job, world.terrain_code(self.x, self.y), world.ore_face[self.y * world.width + self.x])
+
+            if loot and world.rng.agents.random() < 0.6:
                 self.inventory.add(Item(loot, "resource"))
                 self.log_event(f"Gathered {loot}.", 1, "work", tick)
             else:
@@ -268,17 +415,14 @@ class Agent:
         elif action == ACTION_CRAFT:
             target = self._craft_target
             if target and CraftingSystem.craft(self.inventory, target):
+                world.record_event(EVENT_CRAFT, self.id, RECIPE_CODES[target])
                 self.log_event(f"Crafted {target}!", 5, "achievement", tick)
             else:
                 self.log_event("Failed craft.", -1, "fail", tick)
 
-        elif action == ACTION_SLEEP:
-            self.energy = min(self.max_energy, self.energy + 5) # Slower regen
-            if tick % 10 == 0: self.hunger = min(self.max_hunger, self.hunger + 1)
-            
         elif action == ACTION_ATTACK:
             target = self._current_target
-            if target:
+            if target and not target.is_dead: # Batched decisions may pick a target killed earlier this tick
                 if self.job != JOB_MONSTER: self.say("hostile", tick, world)
                 
                 base_dmg = 10
@@ -289,66 +433,78 @@ class Agent:
                 if self.job == JOB_MONSTER: base_dmg = 20
 
                 hit_chance = 0.7 + (self.energy / 200.0)
-                if random.random() < hit_chance:
+                if world.rng.combat.random() < hit_chance:
                     target.take_damage(base_dmg, self, world)
-                    self.log_event(f"Hit {target.name}!", 2, "combat", tick)
+                    self.log_event(f"Hit {target.name}!", 2, "combat", tick, target.id)
                 else:
-                    self.log_event(f"Missed {target.name}!", -1, "combat", tick)
+                    self.log_event(f"Missed {target.name}!", -1, "combat", tick, target.id)
                 self.energy = max(0, self.energy - 5)
 
         elif action == ACTION_TRADE:
             target = self._trade_target
-            if target:
-                if self.inventory.items:
-                    item = self.inventory.items.pop()
+            if target and not target.is_dead:
+                item = self.inventory.pop_item()
+                if item:
                     self.inventory.gold += item.value
-                    target.inventory.add(item) 
-                    target.inventory.gold -= item.value
-                    self.log_event(f"Sold {item.name}", 2, "trade", tick)
+                    target.buy(item)
+                    self.log_event(f"Sold {item.name}", 2, "trade", tick, target.id)
+
+    def _apply_upkeep(self, action, world):
+        upkeep = UPKEEP.get(action)
+        if upkeep:
+            energy_delta, hunger_delta, period = upkeep
+            if energy_delta > 0: self.energy = min(self.max_energy, self.energy + energy_delta)
+            else: self.energy = max(0, self.energy + energy_delta)
+            if world.tick_count % period == 0:
+                if hunger_delta > 0: self.hunger = min(self.max_hunger, self.hunger + hunger_delta)
+                else: self.hunger = max(0, self.hunger + hunger_delta)
+        if action == ACTION_IDLE and self.job == JOB_MONSTER and not world.is_night():
+            self.take_damage(SUNLIGHT_DAMAGE, self, world)
 
-        elif action == ACTION_IDLE:
-             self.energy = max(0, self.energy - 0.5)
-             if tick % 10 == 0: self.hunger = min(self.max_hunger, self.hunger + 0.5)
-             
-             if self.job == JOB_MONSTER and not world.is_night():
-                 self.take_damage(20, self, world) 
+    def buy(self, item):
+        self.inventory.add(item)
+        self.inventory.gold -= item.value
 
     def take_damage(self, amount, attacker, world):
+        if self._wake_tick is not None: world.rouse(self) # Catch up on skipped sleep before losing energy
         self.energy = max(0, self.energy - amount)
         if attacker != self:
             self.memory["hostile_agents"].add(attacker.id)
         
-        self.log_event(f"Hurt by {attacker.name}!", -5, "pain", world.tick_count)
+        self.log_event(f"Hurt by {attacker.name}!", -5, "pain", world.tick_count, attacker.id)
         
         if self.energy <= 0:
             self.die(world, attacker)
 
     def die(self, world, killer):
         self.is_dead = True
-        corpse = Corpse(self.x, self.y, self.name, self.inventory, killer.id if killer else None)
+        world.retire_agent(self)
+        self.memetics.release()
+        world.record_event(EVENT_DEATH, self.id, killer.id if killer and killer != self else 0)
+        corpse = Corpse(self.x, self.y, self.name, self.inventory, killer.id if killer else None, world.next_id())
         world.add_corpse(corpse)
         msg = f"{self.name} died."
         if killer and killer != self: msg = f"{self.name} killed by {killer.name}!"
         world.broadcast_event(msg)
 
+    def _move(self, world):
+        # Follow the shared flow field to the goal; wander without one or when the way is taken
+        step = world.step_towards(self._goal, self.x, self.y) if self._goal else None
+        if step is None or world.is_blocked(*step): return self._move_randomly(world)
+        world.move_agent(self, *step)
+
     def _move_randomly(self, world):
-        dx = random.choice([-1, 0, 1])
-        dy = random.choice([-1, 0, 1])
+        rng = world.rng.agents
+        dx = rng.choice([-1, 0, 1])
+        dy = rng.choice([-1, 0, 1])
         new_x = self.x + dx
         new_y = self.y + dy
         if 0 <= new_x < world.width and 0 <= new_y < world.height:
             if not world.is_blocked(new_x, new_y):
-                self.x = new_x
-                self.y = new_y
+                world.move_agent(self, new_x, new_y)
 
     def _get_nearby_agents(self, world, radius=4):
-        nearby = []
-        for other in world.agents:
-            if other.id == self.id or other.is_dead: continue
-            dist = math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
-            if dist <= radius:
-                nearby.append(other)
-        return nearby
+        return world.get_nearby_agents(self.x, self.y, radius, exclude=self)
 
     def to_dict(self):
         return {
@@ -364,118 +520,793 @@ class Agent:
             "speech": {"text": self.current_speech, "tick": self.speech_tick}
         }
 
+    def to_record(self):
+        """Everything needed to rebuild this agent, as primitives (see WorldEngine.save)."""
+        return (self.id, self.name, self._x, self._y, self.job, self.is_dead,
+                self.hunger, self.energy, self.max_hunger, self.max_energy,
+                self.speech_cooldown, self.current_speech, self.speech_tick,
+                self.memory["last_action"], list(self.memory["hostile_agents"]), list(self.memory["logs"]),
+                self.memory["episodes"].to_record(), self.psyche.to_record(),
+                self.inventory.to_record(), self.memetics.to_record())
+
+    @classmethod
+    def from_record(cls, record, meme_rng, memes):
+        agent = cls.__new__(cls)
+        (agent.id, agent.name, agent._x, agent._y, agent.job, agent.is_dead,
+         agent._hunger, agent._energy, agent.max_hunger, agent.max_energy,
+         agent.speech_cooldown, agent.current_speech, agent.speech_tick,
+         last_action, hostile, logs, episodes, psyche, inventory, memetics) = record
+        agent._dirty = 0
+        agent._store = None
+        agent._row = None
+        agent.color = agent._get_job_color()
+        agent.clan = None
+        agent.psyche = Psychology.from_record(psyche)
+        agent.inventory = Inventory.from_record(inventory)
+        agent.memetics = MemeticHost.from_record(memetics, meme_rng, memes)
+        agent.memory = {
+            "hostile_agents": set(hostile),
+            "last_action": last_action,
+            "logs": deque(logs, maxlen=10),
+            "episodes": EpisodicStore.from_record(episodes)
+        }
+        agent._current_target = None # Targets are picked afresh by the next decision
+        agent._craft_target = None
+        agent._trade_target = None
+        agent._goal = None
+        agent._sleep_rival = None
+        agent._wake_tick = None # Dormancy is restored by WorldEngine.load
+        agent._asleep_since = None
+        return agent
+
+    def pop_patch(self):
+        """Returns the changed to_dict() groups since the last call (or None) and clears them."""
+        dirty = self._dirty
+        inv_dirty = self.inventory.dirty
+        if not dirty and not inv_dirty: return None
+        patch = {"id": self.id}
+        if dirty & DIRTY_POS:
+            patch["x"] = self._x
+            patch["y"] = self._y
+        if dirty & DIRTY_STATS:
+            patch["stats"] = {"hunger": self.hunger, "energy": self.energy} # Live in the store while attached
+        if dirty & DIRTY_SPEECH:
+            patch["speech"] = {"text": self.current_speech, "tick": self.speech_tick}
+        if inv_dirty:
+            patch["inventory"] = self.inventory.to_dict()
+        self.clear_dirty()
+        return patch
+
+    def clear_dirty(self):
+        self._dirty = 0
+        self.inventory.dirty = False
+
 
 class WorldEngine:
-    def __init__(self, width=GRID_SIZE, height=GRID_SIZE, num_agents=10):
+    def __init__(self, width=GRID_SIZE, height=GRID_SIZE, num_agents=10, seed=None, columnar=False, grid=None):
         self.width = width
         self.height = height
+        self.rng = RandomStreams(seed) # Same seed + same calls = bit-identical run
+        self.last_id = 0
+        self.memes = MemeRegistry() # Shared meme pool for this world's agents
         self.tick_count = 0
         self.time_of_day = 8 # Start at 8:00
-        self.grid = self._generate_biomes()
-        self.agents = []
+        # Flat row-major bytearray of terrain codes (given when restoring a snapshot)
+        self.grid = bytearray(grid) if grid is not None else self._generate_biomes()
+        self.passable = self._build_passability()
+        self.ore_face = ore_faces(width, height, self.grid)
+        self.navigation = Navigator(width, height, self.passable)
+        self.navigation.set_goals(GOAL_FOREST, np.flatnonzero(np.frombuffer(bytes(self.grid), dtype=np.uint8) == FOREST).tolist())
+        self.navigation.set_goals(GOAL_ORE, np.flatnonzero(self.ore_face).tolist())
+        self._traders_tick = None # Tick the trader field was last re-targeted
+        self.spatial = SpatialHash()
+        self.occupancy = {} # {y * width + x: living agents standing there}
+        self.dormant_index = SpatialHash() # Dormant agents, roused by anyone coming within NEIGHBOR_RADIUS
+        self.sleepers = TimerWheel() # (agent, wake tick) of dormant agents
+        self._decided_tick = 0 # Last tick whose agents have decided
+        self._waiting = set() # Dormant agents whose turn is still ahead in a sequential (reference) tick
+        # Columnar mode: living agents' per-tick scalars in NumPy arrays, upkeep applied in bulk
+        self.store = AgentStore() if columnar else None
+        self._agents = []
         self.corpses = []
+        self.corpse_index = SpatialHash() # Loot lookups
+        self.corpse_timers = TimerWheel() # Decay
         self.events = [] 
+        # Delta bookkeeping, drained by get_delta()
+        self._spawned = {}
+        self._removed = []
+        self._new_corpses = []
+        self._changed_corpses = {}
+        self._removed_corpses = []
+        self._new_events = []
+        self._utterances = [] # (speaker, meme, prestige, x, y) said this tick
+        self.spawns_monsters = True # Off in shards: their coordinator rolls for the whole map
+        self.event_log = None # systems.eventlog.EventLog, attached by replay.Recorder
+        self.metrics = None # systems.metrics.Metrics; phase timings and counters when profiling
         self._spawn_agents(num_agents)
 
+    @property
+    def agents(self):
+        return self._agents
+
+    @agents.setter
+    def agents(self, agents):
+        # Wholesale replacement (tests, restores): rebuild the neighbor index
+        for a in self._agents:
+            if a._wake_tick is not None: self._wake(a, self.tick_count)
+        self.dormant_index.clear()
+        self._agents = list(agents)
+        self.spatial.clear()
+        self.occupancy.clear()
+        if self.store is not None: self.store.clear()
+        for a in self._agents:
+            if not a.is_dead: self._index_agent(a)
+
+    def add_agent(self, agent):
+        self._agents.append(agent)
+        self._spawned[agent.id] = agent
+        self.record_event(EVENT_SPAWN, agent.id, JOB_CODES[agent.job])
+        if not agent.is_dead and agent not in self.spatial:
+            self._index_agent(agent)
+
+    def _index_agent(self, agent):
+        if self.store is not None: self.store.attach(agent, JOB_CODES[agent.job])
+        self.spatial.insert(agent)
+        cell = agent.y * self.width + agent.x
+        self.occupancy[cell] = self.occupancy.get(cell, 0) + 1
+        if self.dormant_index: self._rouse_near(agent)
+
+    def retire_agent(self, agent):
+        """Takes a dead agent out of the spatial/occupancy indexes and the state stream."""
+        if agent not in self.spatial: return
+        self.spatial.remove(agent)
+        if agent in self.dormant_index: self.dormant_index.remove(agent)
+        self._vacate(agent.y * self.width + agent.x)
+        if agent._store is not None: agent._store.detach(agent)
+        if self._spawned.pop(agent.id, None) is None:
+            self._removed.append(agent.id)
+
+    def _vacate(self, cell):
+        n = self.occupancy[cell] - 1
+        if n: self.occupancy[cell] = n
+        else: del self.occupancy[cell]
+
+    def move_agent(self, agent, x, y):
+        if agent not in self.spatial:
+            agent.x = x
+            agent.y = y
+            self._index_agent(agent)
+            return
+        self._vacate(agent.y * self.width + agent.x)
+        agent.x = x
+        agent.y = y
+        cell = y * self.width + x
+        self.occupancy[cell] = self.occupancy.get(cell, 0) + 1
+        self.spatial.update(agent)
+        if self.dormant_index: self._rouse_near(agent)
+
+    def _rouse_near(self, agent):
+        for sleeper in self.dormant_index.query_radius(agent.x, agent.y, NEIGHBOR_RADIUS, exclude=agent):
+            self.rouse(sleeper)
+
+    def rouse(self, agent):
+        """Wakes a dormant agent in time for the next decisions, applying the sleep it skipped until then."""
+        if agent._wake_tick is None: return
+        if self._decided_tick != self.tick_count or agent.id in self._waiting: # Its decision this tick is still to come
+            return self._wake(agent, self.tick_count - 1)
+        self._catch_up(agent, self.tick_count)
+        if agent in self.dormant_index: self.dormant_index.remove(agent)
+        if agent._wake_tick > self.tick_count + 1:
+            agent._wake_tick = self.tick_count + 1
+            self.sleepers.schedule((agent, agent._wake_tick), agent._wake_tick)
+
+    def _catch_up(self, agent, through):
+        """Gives a dormant agent the sleep upkeep of the ticks after _asleep_since, up to `through`."""
+        since = agent._asleep_since
+        skipped = through - since
+        if skipped <= 0: return
+        energy_gain, hunger_gain, period = UPKEEP[ACTION_SLEEP]
+        agent.energy = min(agent.max_energy, agent.energy + energy_gain * skipped)
+        agent.hunger = min(agent.max_hunger, agent.hunger + hunger_gain * (through // period - since // period))
+        agent.speech_cooldown = max(0, agent.speech_cooldown - skipped) # One per skipped decision
+        agent._asleep_since = through
+
+    def _wake(self, agent, through):
+        self._catch_up(agent, through)
+        agent._wake_tick = agent._asleep_since = None
+        if agent in self.dormant_index: self.dormant_index.remove(agent)
+
+    def _wake_sleepers(self):
+        for agent, due in self.sleepers.advance(self.tick_count):
+            # Stale entries: roused early (and rescheduled), or died
+            if agent._wake_tick == due and not agent.is_dead: self._wake(agent, self.tick_count - 1)
+
+    def _turns(self, living):
+        """Living agents in order, minus dormant ones; one roused before its turn still takes it."""
+        self._waiting = {a.id for a in living if a._wake_tick is not None}
+        for agent in living:
+            if agent._wake_tick is None: yield agent
+            else: self._waiting.discard(agent.id)
+        self._waiting = set()
+
+    def _doze(self, agents):
+        """Puts agents that slept alone this tick to sleep until their choice could change.
+
+        Dormant agents skip decide/perform; they wake at _dormant_until, when
+        anyone comes within NEIGHBOR_RADIUS (_rouse_near) or when hurt, and
+        only then receive the sleep upkeep of the ticks they missed.
+        """
+        tick = self.tick_count
+        for agent in agents:
+            if agent._sleep_rival is None or agent.is_dead or agent._wake_tick is not None: continue
+            if self.get_nearby_agents(agent.x, agent.y, NEIGHBOR_RADIUS, exclude=agent): continue # Someone came by
+            wake = self._dormant_until(agent)
+            if wake <= tick + 1: continue
+            agent._asleep_since = tick
+            agent._wake_tick = wake
+            self.sleepers.schedule((agent, wake), wake)
+            self.dormant_index.insert(agent)
+
+    def _dormant_until(self, agent):
+        """First tick a lone sleeper could choose anything but sleep.
+
+        That is the next dawn or dusk, or the first tick at which its stats,
+        replayed through sleep upkeep, no longer make sleep beat both eating
+        and its best other action (a tie wakes it, which is merely early).
+        """
+        tick = self.tick_count
+        night = self.is_night()
+        hours = ((6 if night else 22) - self.time_of_day) % 24
+        turn = tick + (hours - 1) * TICKS_PER_HOUR + TICKS_PER_HOUR - tick % TICKS_PER_HOUR
+        energy, hunger = agent.energy, agent.hunger
+        max_energy, max_hunger = agent.max_energy, agent.max_hunger
+        neurotic = agent.psyche.neuroticism > 0.5
+        rival = agent._sleep_rival
+        energy_gain, hunger_gain, period = UPKEEP[ACTION_SLEEP]
+        t = tick + 1
+        while t < turn:
+            # Same arithmetic as decide_action, so the comparison is exact
+            sleep = ((max_energy - energy) / max_energy) * 100
+            if night:
+                sleep += 20
+                if neurotic: sleep += 20
+            if sleep <= rival or sleep <= (hunger / max_hunger) * 100: break
+            energy = min(max_energy, energy + energy_gain)
+            if t % period == 0: hunger = min(max_hunger, hunger + hunger_gain)
+            t += 1
+        return t
+
+    def get_nearby_agents(self, x, y, radius, exclude=None):
+        return self.spatial.query_radius(x, y, radius, exclude)
+
+    def next_id(self):
+        self.last_id += 1
+        return self.last_id
+
+    def _new_agent(self, name, job=None):
+        return Agent(0, 0, name, job, agent_id=self.next_id(), rng=self.rng.agents, meme_rng=self.rng.memetics, memes=self.memes)
+
     def is_night(self):
-        return self.time_of_day >= 22 or self.time_of_day < 6
+        return night_hour(self.time_of_day)
 
     def _generate_biomes(self):
-        grid = [[TERRAIN_GRASS for _ in range(self.width)] for _ in range(self.height)]
-        def grow_region(terrain_type, count, min_size, max_size):
-            for _ in range(count):
-                cx = random.randint(0, self.width - 1)
-                cy = random.randint(0, self.height - 1)
-                size = random.randint(min_size, max_size)
-                for _ in range(size * 4): 
-                    ox = random.randint(-int(math.sqrt(size)), int(math.sqrt(size)))
-                    oy = random.randint(-int(math.sqrt(size)), int(math.sqrt(size)))
-                    nx, ny = cx + ox, cy + oy
-                    if 0 <= nx < self.width and 0 <= ny < self.height:
-                        grid[ny][nx] = terrain_type
-        grow_region(TERRAIN_WATER, 3, 20, 50)
-        grow_region(TERRAIN_FOREST, 6, 10, 30)
-        for _ in range(5):
-            cx = random.randint(0, self.width - 1)
-            cy = random.randint(0, self.height - 1)
-            dx = random.choice([-1, 0, 1])
-            dy = random.choice([-1, 0, 1])
-            length = random.randint(5, 15)
-            for i in range(length):
-                nx, ny = cx + dx*i, cy + dy*i
-                if 0 <= nx < self.width and 0 <= ny < self.height:
-                    grid[ny][nx] = TERRAIN_WALL
-        return grid
+        return generate_biomes(self.width, self.height, self.rng.terrain)
+
+    def _build_passability(self):
+        # 1 = walkable terrain, 0 = wall/water; same flat indexing as grid and occupancy
+        return passability_mask(self.grid)
 
     def _spawn_agents(self, count):
         for i in range(1):
-            agent = Agent(0, 0, f"Trader-{i}", JOB_TRADER)
+            agent = self._new_agent(f"Trader-{i}", JOB_TRADER)
             self._place_agent(agent)
-            self.agents.append(agent)
+            self.add_agent(agent)
             
         for i in range(count):
             name = f"Citoyen-{i}"
-            agent = Agent(0, 0, name)
+            agent = self._new_agent(name)
             self._place_agent(agent)
-            self.agents.append(agent)
+            self.add_agent(agent)
+
+    def living_monsters(self):
+        return len([a for a in self.agents if a.job == JOB_MONSTER and not a.is_dead])
 
-    def _spawn_monster(self):
-        monsters = len([a for a in self.agents if a.job == JOB_MONSTER and not a.is_dead])
-        if monsters < 3:
-            monster = Agent(0, 0, "Nightmare", JOB_MONSTER)
-            monster.energy = 200 
-            self._place_agent(monster)
-            self.agents.append(monster)
-            self.broadcast_event("A shadow rises...")
+    def _spawn_monster(self, x=None, y=None):
+        """Raises a monster at (x, y) if given and free, else on a random free cell."""
+        monster = self._new_agent("Nightmare", JOB_MONSTER)
+        monster.energy = 200
+        if x is not None and not self.is_blocked(x, y): self.move_agent(monster, x, y)
+        else: self._place_agent(monster)
+        self.add_agent(monster)
+        self.broadcast_event("A shadow rises...")
 
     def _place_agent(self, agent):
         attempts = 0
         while attempts < 100:
-            rx = random.randint(0, self.width - 1)
-            ry = random.randint(0, self.height - 1)
+            rx = self.rng.agents.randint(0, self.width - 1)
+            ry = self.rng.agents.randint(0, self.height - 1)
             if not self.is_blocked(rx, ry):
-                agent.x = rx
-                agent.y = ry
+                self.move_agent(agent, rx, ry)
                 break
             attempts += 1
 
+    def step_towards(self, goal, x, y):
+        """Next cell from (x, y) towards a navigation goal, or None."""
+        if goal == GOAL_TRADER and self._traders_tick != self.tick_count:
+            # Moving target: re-target once per tick, re-path only if a trader actually moved
+            self._traders_tick = self.tick_count
+            cells = [a.y * self.width + a.x for a in self._agents if a.job == JOB_TRADER and not a.is_dead]
+            self.navigation.set_goals(GOAL_TRADER, cells, TRADER_RANGE)
+        return self.navigation.step(goal, x, y)
+
     def is_blocked(self, x, y):
-        terrain = self.grid[y][x]
-        if terrain == TERRAIN_WALL or terrain == TERRAIN_WATER:
-            return True
-        for a in self.agents:
-            if not a.is_dead and a.x == x and a.y == y:
-                return True
-        return False
+        cell = y * self.width + x
+        return not self.passable[cell] or cell in self.occupancy
 
-    def get_terrain(self, x, y):
+    def terrain_code(self, x, y):
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.grid[y][x]
-        return TERRAIN_WALL
+            return self.grid[y * self.width + x]
+        return WALL
+
+    def get_terrain(self, x, y):
+        return TERRAIN_NAMES[self.terrain_code(x, y)]
 
     def add_corpse(self, corpse):
+        corpse.expires_at = self.tick_count + corpse.decay
         self.corpses.append(corpse)
+        self.corpse_index.insert(corpse)
+        self.corpse_timers.schedule(corpse, corpse.expires_at)
+        self._new_corpses.append(corpse)
+
+    def _expire_corpses(self):
+        expired = self.corpse_timers.advance(self.tick_count)
+        if not expired: return
+        for corpse in expired:
+            self.corpse_index.remove(corpse)
+            self._changed_corpses.pop(corpse.id, None)
+            self._removed_corpses.append(corpse.id)
+        gone = {c.id for c in expired}
+        self.corpses = [c for c in self.corpses if c.id not in gone]
+
+    def scavenge(self, agent):
+        """Agent takes one item from a corpse within SCAVENGE_RADIUS, if it has room. Returns the item."""
+        inventory = agent.inventory
+        if not self.corpse_index or len(inventory) >= inventory.capacity: return None
+        for corpse in self.corpse_index.query_radius(agent.x, agent.y, SCAVENGE_RADIUS):
+            item = corpse.inventory.pop_item()
+            if item is None: continue
+            inventory.add(item)
+            self._changed_corpses[corpse.id] = corpse
+            agent.log_event(f"Scavenged {item.name}.", 1, "scavenge", self.tick_count)
+            return item
+        return None
+
+    def record_event(self, kind, a, b=0, c=0):
+        if self.event_log is not None: self.event_log.record(self.tick_count, kind, a, b, c)
+        metrics = self.metrics
+        if metrics is not None:
+            if kind == EVENT_ACTION: metrics.inc("actions", ACTIONS[b])
+            elif kind == EVENT_MEME: metrics.inc("infections")
+            elif kind == EVENT_DEATH: metrics.inc("deaths")
+            elif kind == EVENT_SPAWN: metrics.inc("spawns", JOBS[b])
+            elif kind == EVENT_CRAFT: metrics.inc("crafts", RECIPES[b])
 
     def broadcast_event(self, text):
-        self.events.append({"tick": self.tick_count, "text": text})
+        event = {"tick": self.tick_count, "text": text}
+        self.events.append(event)
+        self._new_events.append(event)
         if len(self.events) > 5: self.events.pop(0)
 
     def update(self):
+        """Advances one tick. With `metrics` attached, each phase's duration is observed under tick_phase_seconds."""
+        metrics = self.metrics
         self.tick_count += 1
         
         # New Time Logic: 30 ticks = 1 hour
         if self.tick_count % TICKS_PER_HOUR == 0:
             self.time_of_day = (self.time_of_day + 1) % 24
+        self._wake_sleepers()
         
-        if self.is_night() and random.random() < 0.05: # Lower spawn chance due to longer night
-            self._spawn_monster()
+        if self.spawns_monsters and self.is_night() and self.rng.agents.random() < MONSTER_CHANCE:
+            if self.living_monsters() < MAX_MONSTERS: self._spawn_monster()
 
-        active_agents = [a for a in self.agents if not a.is_dead]
-        for agent in active_agents:
-            action = agent.decide_action(self)
-            agent.perform_action(action, self)
+        living = [a for a in self.agents if not a.is_dead]
+        self._decided_tick = self.tick_count
+        clock = time.perf_counter
+        if self.store is not None:
+            active_agents = [a for a in living if a._wake_tick is None]
+            # Everyone decides from the start-of-tick state, then acts in order
+            t0 = clock()
+            actions = self.decide_actions(active_agents)
+            t1 = clock()
+            for agent, action in zip(active_agents, actions):
+                if not agent.is_dead: agent.perform_action(action, self)
+            if metrics is not None:
+                metrics.observe("tick_phase_seconds", "decide", t1 - t0)
+                metrics.observe("tick_phase_seconds", "perform", clock() - t1)
+        elif metrics is None:
+            for agent in self._turns(living):
+                action = agent.decide_action(self)
+                agent.perform_action(action, self)
+        else:
+            decide = perform = 0.0
+            for agent in self._turns(living):
+                t0 = clock()
+                action = agent.decide_action(self)
+                t1 = clock()
+                agent.perform_action(action, self)
+                decide += t1 - t0
+                perform += clock() - t1
+            metrics.observe("tick_phase_seconds", "decide", decide)
+            metrics.observe("tick_phase_seconds", "perform", perform)
+
+        if metrics is None:
+            self._propagate_memes()
+            if self.store is not None: self._apply_upkeep_columnar()
+            self._doze(living)
+            self._expire_corpses()
+        else:
+            t0 = clock()
+            self._propagate_memes()
+            t1 = clock()
+            if self.store is not None: self._apply_upkeep_columnar()
+            self._doze(living)
+            t2 = clock()
+            self._expire_corpses()
+            metrics.observe("tick_phase_seconds", "memes", t1 - t0)
+            if self.store is not None: metrics.observe("tick_phase_seconds", "upkeep", t2 - t1)
+            metrics.observe("tick_phase_seconds", "corpses", clock() - t2)
+            metrics.inc("ticks")
+        if self.event_log is not None: self.event_log.end_tick(self.tick_count)
             
-        self.agents = [a for a in self.agents if not (a.job == JOB_MONSTER and a.is_dead)]
+        # Dead monsters already left the spatial index in die()
+        self._agents = [a for a in self._agents if not (a.job == JOB_MONSTER and a.is_dead)]
+
+    def _neighbor_counts(self, rows):
+        """Living agents within NEIGHBOR_RADIUS of each row, excluding itself: (all, monsters, thieves, traders).
+
+        Each tile of a padded grid packs the four counts as 16-bit fields of
+        one int64, so summing the disc offsets is a single gather per offset
+        instead of a spatial query per agent.
+        """
+        store = self.store
+        pad = NEIGHBOR_RADIUS
+        live = np.flatnonzero(store.alive[:store.size])
+        jobs = store.job[live]
+        weights = np.ones(len(live), dtype=np.int64)
+        for shift, job in ((16, JOB_MONSTER), (32, JOB_THIEF), (48, JOB_TRADER)):
+            weights += (jobs == JOB_CODES[job]).astype(np.int64) << shift
+        # Only rasterize the box the agents occupy (a shard's region, or a crowded corner of a big map)
+        xs = store.x[live].astype(np.int64)
+        ys = store.y[live].astype(np.int64)
+        ox, oy = int(xs.min()) - pad, int(ys.min()) - pad
+        pw = int(xs.max()) - ox + 1 + pad
+        grid = np.zeros(pw * (int(ys.max()) - oy + 1 + pad), dtype=np.int64)
+        np.add.at(grid, (ys - oy) * pw + xs - ox, weights)
+
+        base = (store.y[rows].astype(np.int64) - oy) * pw + store.x[rows] - ox
+        packed = np.zeros(len(rows), dtype=np.int64)
+        for dx, dy in _NEIGHBOR_OFFSETS:
+            packed += grid[base + (dy * pw + dx)]
+        packed -= weights[np.searchsorted(live, rows)] # Don't count yourself
+        return [(packed >> shift) & 0xFFFF for shift in (0, 16, 32, 48)]
+
+    def decide_actions(self, agents):
+        """Agent.decide_action for many living, store-backed agents at once.
+
+        Scores are built as one N x len(ACTIONS) matrix from per-agent feature
+        columns and resolved with an argmax (first max wins, like max() over
+        the scores dict). Chat rolls, speech and targets happen in agent order.
+        """
+        n = len(agents)
+        if not n: return []
+        store = self.store
+        tick = self.tick_count
+        is_night = self.is_night()
+        day = not is_night
+        rows = np.fromiter((a._row for a in agents), dtype=np.int64, count=n)
+        t0 = time.perf_counter()
+        near_all, near_monsters, near_thieves, near_traders = self._neighbor_counts(rows)
+        if self.metrics is not None: self.metrics.observe("tick_phase_seconds", "neighbors", time.perf_counter() - t0)
+        job = store.job[rows]
+        is_monster = job == JOB_CODES[JOB_MONSTER]
+        is_guard = job == JOB_CODES[JOB_GUARD]
+        is_thief = job == JOB_CODES[JOB_THIEF]
+        is_blacksmith = job == JOB_CODES[JOB_BLACKSMITH]
+        cells = store.y[rows].astype(np.int64) * self.width + store.x[rows]
+        terrain = np.frombuffer(self.grid, dtype=np.uint8)[cells]
+
+        # Per-agent pass, in order: cooldowns, remembered hostiles, chat, inventory features
+        rng = self.rng.agents
+        any_near = (near_all > 0).tolist()
+        monster_near = (near_monsters > 0).tolist()
+        hostile = [False] * n
+        paranoid = [False] * n
+        armed = [False] * n
+        bare_hand = [False] * n
+        spear = [False] * n
+        many_items = [False] * n
+        smith_step = [None] * n # Next recipe towards SMITH_TARGET, if one can be crafted now
+        smith_gather = [False] * n
+        terrain_codes = terrain.tolist()
+        at_ore_face = self.ore_face[cells].tolist()
+        blacksmith_at_work = (is_blacksmith & day).tolist()
+        lumberjack_searching = ((job == JOB_CODES[JOB_LUMBERJACK]) & (terrain != FOREST) & day).tolist()
+        trader_near = (near_traders > 0).tolist()
+        monster = is_monster.tolist()
+        for i, agent in enumerate(agents):
+            if agent.speech_cooldown > 0: agent.speech_cooldown -= 1
+            agent._sleep_rival = None
+            inventory = agent.inventory
+            hand = inventory.equipped["hand"]
+            if hand is None:
+                bare_hand[i] = True
+                spear[i] = "Spear" in inventory.craftable
+            elif hand.power > 10:
+                armed[i] = True
+            many_items[i] = len(inventory) > 5
+            goal = None
+            if blacksmith_at_work[i]:
+                plan = CraftingSystem.plan(inventory, SMITH_TARGET)
+                if plan.next_step:
+                    smith_step[i] = plan.next_step
+                else:
+                    smith_gather[i] = gather_loot(JOB_BLACKSMITH, terrain_codes[i], at_ore_face[i]) in dict(plan.missing)
+                    if not smith_gather[i]: goal = smith_goal(plan)
+            elif lumberjack_searching[i]:
+                goal = GOAL_FOREST
+            if many_items[i] and day and not trader_near[i] and not monster[i]: goal = GOAL_TRADER
+            agent._goal = goal
+            if not any_near[i]: continue
+            h = monster_near[i]
+            known = agent.memory["hostile_agents"]
+            if not h and known:
+                h = any(a.id in known for a in agent._get_nearby_agents(self))
+            hostile[i] = h
+            paranoid[i] = "paranoia" in agent.psyche.disorders
+            if h and rng.random() < 0.3: agent.say("hostile", tick, self)
+            elif rng.random() < 0.2: agent.say("friendly", tick, self)
+
+        neuroticism = np.fromiter((a.psyche.neuroticism for a in agents), dtype=np.float64, count=n)
+        any_near = near_all > 0
+        hostile = np.array(hostile)
+        paranoid = np.array(paranoid)
+        bare_hand = np.array(bare_hand)
+        spear = np.array(spear)
+        smithing = np.array([step is not None for step in smith_step])
+        smith_gather = np.array(smith_gather)
+
+        scores = np.zeros((n, len(ACTIONS)))
+        col = ACTION_CODES
+        # 1. Survival
+        scores[:, col[ACTION_EAT]] = (store.hunger[rows] / store.max_hunger[rows]) * 100
+        max_energy = store.max_energy[rows]
+        sleep = ((max_energy - store.energy[rows]) / max_energy) * 100
+        if is_night:
+            sleep = sleep + 20
+            sleep = sleep + np.where(neuroticism > 0.5, 20, 0)
+        scores[:, col[ACTION_SLEEP]] = sleep
+
+        # 2. Combat / Danger
+        confidence = np.where(np.array(armed) | is_guard, 1.0, 0.2)
+        confidence = np.where(neuroticism > 0.7, confidence * 0.5, confidence)
+        calm = any_near & ~hostile
+        attack = np.where(hostile, 90 * confidence, 0.0)
+        attack = np.where(calm & is_guard & (near_thieves + near_monsters > 0), 80, attack)
+        attack = np.where(calm & ~is_guard & ~is_thief & paranoid, 50 * confidence, attack)
+        scores[:, col[ACTION_ATTACK]] = attack
+        scores[:, col[ACTION_STEAL]] = np.where(calm & is_thief, 60, 0)
+
+        # 3. Economy (Trade)
+        selling = np.array(many_items) & day
+        scores[:, col[ACTION_TRADE]] = np.where(selling & (near_traders > 0), 70, 0)
+
+        # 4. Work
+        is_lumberjack = job == JOB_CODES[JOB_LUMBERJACK]
+        searching = is_blacksmith & ~smithing
+        gather = np.zeros(n)
+        move = np.full(n, 20.0)
+        craft = np.zeros(n)
+        if day:
+            gather[is_lumberjack & (terrain == FOREST)] = 40
+            gather[searching & smith_gather] = 40
+            gather[job == JOB_CODES[JOB_GATHERER]] = 30
+            move[(is_lumberjack & (terrain != FOREST)) | (searching & ~smith_gather)] += 10
+            craft[smithing] = 80
+            move[selling & (near_traders == 0)] += SELL_URGE
+        craft[bare_hand & spear] = 75
+        scores[:, col[ACTION_GATHER]] = gather
+        scores[:, col[ACTION_MOVE]] = move
+        scores[:, col[ACTION_IDLE]] = 5
+        scores[:, col[ACTION_CRAFT]] = craft
+
+        # Monsters only hunt (night) or linger (day)
+        monster_scores = np.zeros(len(ACTIONS))
+        if is_night: monster_scores[col[ACTION_MOVE]] = 50
+        else: monster_scores[col[ACTION_IDLE]] = 100
+        scores[is_monster] = monster_scores
+        if is_night:
+            scores[is_monster & any_near, col[ACTION_ATTACK]] = 100
+
+        best = scores.argmax(axis=1)
+
+        # Lone sleepers may go dormant; keep what sleep has to keep beating (see _doze)
+        dozing = np.flatnonzero((best == col[ACTION_SLEEP]) & ~any_near & ~is_monster)
+        if dozing.size:
+            rivals = scores[np.ix_(dozing, _RIVAL_COLUMNS)].max(axis=1)
+            for i, rival in zip(dozing.tolist(), rivals.tolist()): agents[i]._sleep_rival = rival
+
+        # Targets only for the agents that need one
+        needs_target = is_monster | np.isin(best, [col[ACTION_ATTACK], col[ACTION_STEAL], col[ACTION_TRADE], col[ACTION_CRAFT]])
+        for i in np.flatnonzero(needs_target).tolist():
+            agent = agents[i]
+            action = ACTIONS[best[i]]
+            if action == ACTION_CRAFT:
+                agent._craft_target = "Spear" if bare_hand[i] and spear[i] else smith_step[i]
+                continue
+            nearby = agent._get_nearby_agents(self)
+            if is_monster[i]:
+                living = [a for a in nearby if not a.is_dead and a.job != JOB_MONSTER]
+                agent._current_target = living[0] if living else None
+            elif action == ACTION_ATTACK:
+                known = agent.memory["hostile_agents"]
+                hostiles = [a for a in nearby if a.id in known or a.job == JOB_MONSTER]
+                agent._current_target = hostiles[0] if hostiles else (nearby[0] if nearby else None)
+            elif action == ACTION_STEAL:
+                agent._current_target = nearby[0] if nearby else None
+            elif action == ACTION_TRADE:
+                agent._trade_target = next(a for a in nearby if a.job == JOB_TRADER)
+        return [ACTIONS[code] for code in best.tolist()]
+
+    def queue_utterance(self, speaker, meme):
+        prestige = len(speaker.inventory) / 10.0
+        self._utterances.append((speaker, meme, prestige, speaker.x, speaker.y))
+
+    def _propagate_memes(self):
+        """Exposes listeners to everything said this tick in one pass.
+
+        Speaker/listener pairs come from one radius join, and infection rolls
+        (openness * virality * (1 + prestige)) are drawn for all pairs at
+        once. Only the hits reach Python: listeners that already know the
+        meme are skipped and each (listener, meme) is learned once.
+        """
+        utterances = self._utterances
+        if not utterances: return
+        self._utterances = []
+        listeners = [a for a in self._agents if not a.is_dead and a.job != JOB_MONSTER]
+        if not listeners: return
+        n = len(listeners)
+        si, li = radius_pairs([u[3] for u in utterances], [u[4] for u in utterances],
+                              np.fromiter((a.x for a in listeners), dtype=np.int64, count=n),
+                              np.fromiter((a.y for a in listeners), dtype=np.int64, count=n), MEME_RADIUS)
+        speaker_ids = np.array([u[0].id for u in utterances], dtype=np.int64)
+        listener_ids = np.fromiter((a.id for a in listeners), dtype=np.int64, count=n)
+        not_self = speaker_ids[si] != listener_ids[li]
+        si, li = si[not_self], li[not_self]
+        if not len(si): return
+
+        openness = np.fromiter((a.memetics.openness for a in listeners), dtype=np.float64, count=n)
+        virality = np.array([u[1].virality for u in utterances])
+        prestige = np.array([u[2] for u in utterances])
+        chance = openness[li] * virality[si] * (1.0 + prestige[si])
+        rolls = np.random.default_rng(self.rng.memetics.getrandbits(64)).random(len(si))
+        hit = np.flatnonzero(rolls < chance)
+
+        # First hit per (listener, meme) wins
+        meme_ids = np.array([u[1].id for u in utterances], dtype=np.int64)
+        key = li[hit] * (int(meme_ids.max()) + 1) + meme_ids[si[hit]]
+        _, first = np.unique(key, return_index=True)
+        tick = self.tick_count
+        for k in np.sort(hit[first]).tolist():
+            speaker, meme = utterances[si[k]][:2]
+            other = listeners[li[k]]
+            if other.memetics.knows(meme.id): continue
+            other.memetics.learn(meme)
+            self.record_event(EVENT_MEME, speaker.id, other.id, meme.id)
+            other.log_event(f"Learned '{meme.text}' from {speaker.name}", 0.5, "learning", tick, speaker.id)
+
+    def _apply_upkeep_columnar(self):
+        """Agent._apply_upkeep for every row at once, from the actions recorded this tick."""
+        store = self.store
+        n = store.size
+        action = store.action[:n]
+        energy = store.energy[:n]
+        hunger = store.hunger[:n]
+
+        energy_delta = _UPKEEP_ENERGY[action]
+        hunger_delta = np.where(self.tick_count % _UPKEEP_PERIOD[action] == 0, _UPKEEP_HUNGER[action], 0.0)
+        new_energy = energy + energy_delta
+        new_energy = np.where(energy_delta > 0, np.minimum(new_energy, store.max_energy[:n]), np.maximum(new_energy, 0))
+        new_hunger = hunger + hunger_delta
+        new_hunger = np.where(hunger_delta > 0, np.minimum(new_hunger, store.max_hunger[:n]), np.maximum(new_hunger, 0))
+
+        changed = np.flatnonzero((new_energy != energy) | (new_hunger != hunger))
+        energy[:] = new_energy
+        hunger[:] = new_hunger
+        agents = store.agents
+        for row in changed.tolist():
+            agents[row]._dirty |= DIRTY_STATS
+
+        if not self.is_night():
+            burning = (action == ACTION_CODES[ACTION_IDLE]) & (store.job[:n] == JOB_CODES[JOB_MONSTER])
+            # By id, not row: row layout differs after a restore, and deaths mint ids
+            for monster in sorted((agents[row] for row in np.flatnonzero(burning).tolist()), key=lambda a: a.id):
+                monster.take_damage(SUNLIGHT_DAMAGE, monster, self) # May detach the row
+        store.action[:n] = NO_ACTION
+
+    def save(self, path):
+        """Writes a versioned binary snapshot of the whole world (see systems/snapshot.py).
+
+        Records are streamed one agent/corpse at a time. A world loaded from
+        it continues exactly as this one would have.
+        """
+        with SnapshotWriter(path) as out:
+            out.write(("world", {
+                "width": self.width, "height": self.height, "seed": self.rng.seed,
+                "columnar": self.store is not None, "tick": self.tick_count, "time": self.time_of_day,
+                "last_id": self.last_id, "rng": self.rng.getstate(), "events": self.events,
+                "agents": len(self._agents), "corpses": len(self.corpses),
+                "dormant": [(a.id, a._asleep_since, a._wake_tick) for a in self._agents if a._wake_tick is not None],
+            }))
+            out.write(("grid", bytes(self.grid)))
+            out.write(("memes", self.memes.to_record()))
+            for agent in self._agents:
+                out.write(("agent", agent.to_record()))
+            # Neighbor queries return bucket insertion order; keep it so restored runs match
+            out.write(("spatial", [eid for bucket in self.spatial.buckets.values() for eid in bucket]))
+            for corpse in self.corpses:
+                out.write(("corpse", corpse.to_record()))
+            out.write(("end", None))
+
+    @classmethod
+    def load(cls, path):
+        """Rebuilds a world written by save(). Raises SnapshotError on a bad or truncated file."""
+        with SnapshotReader(path) as src:
+            return cls._from_records(src)
+
+    @classmethod
+    def _from_records(cls, src):
+        def expect(kind):
+            record = src.read()
+            if not isinstance(record, tuple) or len(record) != 2 or record[0] != kind:
+                raise SnapshotError(f"Expected {kind!r} record, got {record!r:.40}")
+            return record[1]
+
+        meta = expect("world")
+        grid = expect("grid")
+        # Checked before allocating anything sized by the header
+        if len(grid) != meta["width"] * meta["height"]: raise SnapshotError("Grid doesn't match the world size")
+        world = cls(meta["width"], meta["height"], num_agents=0, seed=meta["seed"],
+                    columnar=meta["columnar"], grid=grid)
+        world.agents = [] # Drop the trader every new world spawns
+        world._spawned.clear()
+        world.rng.setstate(meta["rng"])
+        world.tick_count = meta["tick"]
+        world.time_of_day = meta["time"]
+        world.last_id = meta["last_id"]
+        world.events = list(meta["events"])
+        world.memes = MemeRegistry.from_record(expect("memes"))
+        agents = [Agent.from_record(expect("agent"), world.rng.memetics, world.memes)
+                  for _ in range(meta["agents"])]
+        by_id = {a.id: a for a in agents}
+        world._agents = agents
+        for agent_id in expect("spatial"):
+            world._index_agent(by_id[agent_id])
+        world.sleepers.now = world._decided_tick = world.tick_count
+        for agent_id, since, wake in meta.get("dormant", ()): # Older snapshots have no dormant agents
+            agent = by_id[agent_id]
+            agent._asleep_since, agent._wake_tick = since, wake
+            world.sleepers.schedule((agent, wake), wake)
+            if wake > since + 1: world.dormant_index.insert(agent) # Not yet roused
+        world.corpse_timers.now = world.tick_count
+        for _ in range(meta["corpses"]):
+            corpse = Corpse.from_record(expect("corpse"))
+            world.corpses.append(corpse)
+            world.corpse_index.insert(corpse)
+            world.corpse_timers.schedule(corpse, corpse.expires_at)
+        expect("end")
+        src.finish()
+        return world
 
     def get_state(self):
         return {
@@ -488,9 +1319,69 @@ class WorldEngine:
             "events": self.events
         }
 
+    def get_keyframe(self):
+        return {"type": "keyframe", **self.get_state()}
+
+    def get_delta(self):
+        """Changes since the previous call: spawned/changed/removed agents and corpses, new events.
+
+        Keyframes (get_keyframe) don't consume this; every delta follows on from the last one.
+        """
+        spawned = []
+        for agent in self._spawned.values():
+            agent.clear_dirty()
+            spawned.append(agent.to_dict())
+        changed = []
+        for agent in self._agents:
+            if agent._dirty or agent.inventory.dirty:
+                if agent.is_dead:
+                    agent.clear_dirty()
+                    continue
+                patch = agent.pop_patch()
+                if patch: changed.append(patch)
+        delta = {
+            "type": "delta",
+            "tick": self.tick_count,
+            "time": self.time_of_day,
+            "agents": {"spawned": spawned, "changed": changed, "removed": self._removed},
+            "corpses": {
+                "added": [c.to_dict() for c in self._new_corpses],
+                "changed": [{"id": c.id, "inventory": c.inventory.to_dict()} for c in self._changed_corpses.values()
+                            if c not in self._new_corpses], # New ones already carry their latest state
+                "removed": self._removed_corpses
+            },
+            "events": self._new_events
+        }
+        self._spawned = {}
+        self._removed = []
+        self._new_corpses = []
+        self._changed_corpses = {}
+        self._removed_corpses = []
+        self._new_events = []
+        return delta
+
+    def pop_events(self):
+        """New events since the last call, discarding the rest of the delta bookkeeping.
+
+        For headless runs that never send deltas; don't mix with get_delta().
+        """
+        events = self._new_events
+        self._spawned = {}
+        self._removed = []
+        self._new_corpses = []
+        self._changed_corpses = {}
+        self._removed_corpses = []
+        self._new_events = []
+        return events
+
     def get_map(self):
+        """JSON-friendly map: rows of terrain names. Prefer get_map_bytes() for transport."""
+        w = self.width
         return {
             "width": self.width,
             "height": self.height,
-            "grid": self.grid
+            "grid": [[TERRAIN_NAMES[c] for c in self.grid[y * w:(y + 1) * w]] for y in range(self.height)]
         }
+
+    def get_map_bytes(self):
+        return encode_map(self.width, self.height, self.grid)
@@ -0,0 +1,80 @@
+import numpy as np
+
+NO_ACTION = -1
+
+
+class AgentStore:
+    """Columnar (structure-of-arrays) storage for the scalars every agent updates each tick.
+
+    Attached agents read and write hunger/energy straight from their row;
+    positions are mirrored here on every write so whole-array passes can
+    use them. Rows of detached (dead) agents are recycled.
+    """
+
+    COLUMNS = ("x", "y", "hunger", "energy", "max_hunger", "max_energy", "job", "alive", "action")
+
+    def __init__(self, capacity=256):
+        self.size = 0 # Rows in use, including freed ones awaiting reuse
+        self.agents = [] # row -> Agent (None once freed)
+        self._free = []
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.hunger = np.zeros(capacity, dtype=np.float64)
+        self.energy = np.zeros(capacity, dtype=np.float64)
+        self.max_hunger = np.zeros(capacity, dtype=np.float64)
+        self.max_energy = np.zeros(capacity, dtype=np.float64)
+        self.job = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.action = np.full(capacity, NO_ACTION, dtype=np.int8) # Performed this tick, for batched upkeep
+
+    def __len__(self):
+        return self.size - len(self._free)
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.full(capacity, NO_ACTION, dtype=old.dtype) if name == "action" else np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def attach(self, agent, job_code):
+        """Moves the agent's scalars into a row; the agent becomes a view over it."""
+        if self._free:
+            row = self._free.pop()
+            self.agents[row] = agent
+        else:
+            if self.size == len(self.x): self._grow()
+            row = self.size
+            self.size += 1
+            self.agents.append(agent)
+        self.x[row] = agent._x
+        self.y[row] = agent._y
+        self.hunger[row] = agent._hunger
+        self.energy[row] = agent._energy
+        self.max_hunger[row] = agent.max_hunger
+        self.max_energy[row] = agent.max_energy
+        self.job[row] = job_code
+        self.alive[row] = True
+        self.action[row] = NO_ACTION
+        agent._store = self
+        agent._row = row
+
+    def detach(self, agent):
+        """Copies the row back onto the agent (e.g. on death) and frees it."""
+        row = agent._row
+        agent._hunger = float(self.hunger[row])
+        agent._energy = float(self.energy[row])
+        agent._store = None
+        agent._row = None
+        self.alive[row] = False
+        self.action[row] = NO_ACTION
+        self.agents[row] = None
+        self._free.append(row)
+
+    def clear(self):
+        for agent in self.agents:
+            if agent is not None: self.detach(agent)
+        self.size = 0
+        self.agents = []
+        self._free = []
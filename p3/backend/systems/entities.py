@@ -1,4 +1,5 @@
 from typing import List, Dict
+from systems.inventory import Inventory
 
 class Clan:
     def __init__(self, name, color):
@@ -17,20 +18,37 @@ class Clan:
         if other_clan_name not in self.enemies:
             self.enemies.append(other_clan_name)
 
+CORPSE_DECAY = 100 # Ticks a corpse lies around
+
 class Corpse:
-    def __init__(self, x, y, name, inventory, killer_id=None):
+    def __init__(self, x, y, name, inventory, killer_id=None, corpse_id=None):
+        self.id = corpse_id
         self.x = x
         self.y = y
         self.name = f"Corpse of {name}"
         self.inventory = inventory
         self.killer_id = killer_id
-        self.decay = 100 # ticks before disappearing
+        self.decay = CORPSE_DECAY # ticks before disappearing
+        self.expires_at = None # Tick it decays on, set when added to a world
+
+    def to_record(self):
+        return (self.id, self.x, self.y, self.name, self.inventory.to_record(), self.killer_id, self.decay, self.expires_at)
+
+    @classmethod
+    def from_record(cls, record):
+        corpse = cls.__new__(cls)
+        (corpse.id, corpse.x, corpse.y, corpse.name, inventory,
+         corpse.killer_id, corpse.decay, corpse.expires_at) = record
+        corpse.inventory = Inventory.from_record(inventory)
+        return corpse
 
     def to_dict(self):
         return {
+            "id": self.id,
             "x": self.x,
             "y": self.y,
             "name": self.name,
             "inventory": self.inventory.to_dict(),
-            "decay": self.decay
+            "decay": self.decay,
+            "expires": self.expires_at
         }
@@ -0,0 +1,138 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Event kinds; the meaning of a/b/c per kind
+EVENT_SPAWN = 1 # a=agent id, b=job code
+EVENT_ACTION = 2 # a=agent id, b=action code, c=target id (0 if none)
+EVENT_DEATH = 3 # a=agent id, b=killer id (0 if none)
+EVENT_CRAFT = 4 # a=agent id, b=recipe code
+EVENT_MEME = 5 # a=speaker id, b=listener id, c=meme id
+
+EVENT_DTYPE = np.dtype([("tick", "<u4"), ("kind", "u1"), ("a", "<i4"), ("b", "<i4"), ("c", "<i4")])
+
+LOG_MAGIC = b"BLOG"
+LOG_VERSION = 1
+CHUNK_TICKS = 256 # Ticks per compressed chunk
+
+_HEADER = struct.Struct("<4sH")
+_CHUNK = struct.Struct("<IIII") # first tick, last tick, rows, compressed bytes
+
+
+class EventLog:
+    """Append-only tick log of integer events, written as zlib-compressed chunks.
+
+    Rows are buffered column by column and flushed every CHUNK_TICKS ticks.
+    Each chunk header carries its tick range, so readers skip whole chunks
+    without decompressing them.
+    """
+
+    def __init__(self, path, chunk_ticks=CHUNK_TICKS):
+        self.path = path
+        self.chunk_ticks = chunk_ticks
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+        else:
+            _check_header(path)
+        self._chunk_start = None
+        self._columns = ([], [], [], [], [])
+
+    def __len__(self):
+        return len(self._columns[0]) # Rows not flushed yet
+
+    def record(self, tick, kind, a, b=0, c=0):
+        ticks, kinds, aa, bb, cc = self._columns
+        if self._chunk_start is None: self._chunk_start = tick
+        ticks.append(tick)
+        kinds.append(kind)
+        aa.append(a)
+        bb.append(b)
+        cc.append(c)
+
+    def end_tick(self, tick):
+        """Called once per tick; flushes when the current chunk spans chunk_ticks."""
+        if self._chunk_start is not None and tick - self._chunk_start + 1 >= self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        ticks = self._columns[0]
+        if not ticks: return
+        rows = np.empty(len(ticks), dtype=EVENT_DTYPE)
+        for name, column in zip(EVENT_DTYPE.names, self._columns):
+            rows[name] = column
+        payload = zlib.compress(rows.tobytes(), 6)
+        self._file.write(_CHUNK.pack(ticks[0], ticks[-1], len(rows), len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self._chunk_start = None
+        self._columns = ([], [], [], [], [])
+
+    def truncate(self, tick):
+        """Drops every event after `tick` (e.g. when resuming from an older snapshot)."""
+        self.flush()
+        self._file.close()
+        keep = None
+        with open(self.path, "r+b") as f:
+            for offset, first, last, n, size in _chunks(f):
+                if last <= tick: continue
+                if first <= tick:
+                    f.seek(offset + _CHUNK.size)
+                    keep = _decode(f.read(size), n)
+                    keep = keep[keep["tick"] <= tick]
+                f.truncate(offset)
+                break
+        self._file = open(self.path, "ab")
+        if keep is not None and len(keep):
+            for row in keep.tolist(): self.record(*row)
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def _check_header(path):
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or _HEADER.unpack(header) != (LOG_MAGIC, LOG_VERSION):
+        raise ValueError(f"{path} is not a version {LOG_VERSION} event log")
+
+
+def _chunks(f):
+    # Yields (offset, first tick, last tick, rows, compressed size) without reading payloads
+    f.seek(_HEADER.size)
+    while True:
+        offset = f.tell()
+        head = f.read(_CHUNK.size)
+        if len(head) < _CHUNK.size: return # End, or a torn final write
+        first, last, n, size = _CHUNK.unpack(head)
+        yield offset, first, last, n, size
+        f.seek(offset + _CHUNK.size + size) # Callers may have moved the file position
+
+
+def _decode(payload, n):
+    return np.frombuffer(zlib.decompress(payload), dtype=EVENT_DTYPE, count=n)
+
+
+def read_events(path, since=None, until=None, kind=None):
+    """Events with since <= tick <= until (both optional) as one EVENT_DTYPE array."""
+    _check_header(path)
+    parts = []
+    with open(path, "rb") as f:
+        for offset, first, last, n, size in _chunks(f):
+            if since is not None and last < since: continue
+            if until is not None and first > until: break
+            f.seek(offset + _CHUNK.size)
+            payload = f.read(size)
+            if len(payload) < size: break
+            rows = _decode(payload, n)
+            mask = np.ones(n, dtype=bool)
+            if since is not None: mask &= rows["tick"] >= since
+            if until is not None: mask &= rows["tick"] <= until
+            if kind is not None: mask &= rows["kind"] == kind
+            parts.append(rows[mask])
+    return np.concatenate(parts) if parts else np.empty(0, dtype=EVENT_DTYPE)
@@ -0,0 +1,108 @@
+from typing import NamedTuple
+
+AOI_MARGIN = 8 # Tiles streamed around a client's viewport so panning doesn't pop
+
+
+class Viewport(NamedTuple):
+    """Inclusive tile rectangle a client wants updates for."""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @classmethod
+    def from_message(cls, message, width, height, margin=AOI_MARGIN):
+        """Parses {"x0", "y0", "x1", "y1"} (tiles), grows it by `margin` and clamps it to the map.
+
+        Raises ValueError on a malformed rectangle.
+        """
+        try:
+            x0, y0, x1, y1 = (int(message[k]) for k in ("x0", "y0", "x1", "y1"))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Bad viewport: {message!r}") from e
+        if x1 < x0 or y1 < y0: raise ValueError(f"Empty viewport: {message!r}")
+        return cls(max(0, x0 - margin), max(0, y0 - margin),
+                   min(width - 1, x1 + margin), min(height - 1, y1 + margin))
+
+
+class Interest:
+    """One client's area of interest and the entities it currently knows about.
+
+    filter() turns the world's delta into this client's delta: entities
+    that came into the rectangle are sent whole under "entered", those that
+    walked out are listed under "left", and spawns, patches and removals
+    outside it are dropped. Both carry "population", the world's living
+    agent count, since the agent lists no longer add up to it.
+    """
+
+    def __init__(self, viewport, agent_ids=(), corpse_ids=()):
+        self.viewport = viewport
+        self.agents = set(agent_ids) # Ids the client currently holds
+        self.corpses = set(corpse_ids)
+
+    def _visible(self, world):
+        agents = {a.id: a for a in world.spatial.query_rect(*self.viewport)}
+        corpses = {c.id: c for c in world.corpse_index.query_rect(*self.viewport)}
+        return agents, corpses
+
+    def keyframe(self, world):
+        """The world's keyframe cut down to the viewport; later deltas follow on from it."""
+        agents, corpses = self._visible(world)
+        self.agents = set(agents)
+        self.corpses = set(corpses)
+        return {
+            "type": "keyframe",
+            "tick": world.tick_count,
+            "time": world.time_of_day,
+            "width": world.width,
+            "height": world.height,
+            "viewport": list(self.viewport),
+            "population": len(world.spatial),
+            "agents": [a.to_dict() for a in agents.values()],
+            "corpses": [c.to_dict() for c in corpses.values()],
+            "events": world.events
+        }
+
+    def filter(self, world, delta):
+        """This client's share of `delta` (a WorldEngine.get_delta() taken right before)."""
+        agents, corpses = self._visible(world)
+        known, known_corpses = self.agents, self.corpses
+        self.agents = set(agents)
+        self.corpses = set(corpses)
+
+        spawned = [a for a in delta["agents"]["spawned"] if a["id"] in agents]
+        sent = {a["id"] for a in spawned}
+        entered = [a.to_dict() for aid, a in agents.items() if aid not in known and aid not in sent]
+        sent.update(a["id"] for a in entered)
+        removed = [aid for aid in delta["agents"]["removed"] if aid in known]
+        gone = set(removed)
+
+        added = [c for c in delta["corpses"]["added"] if c["id"] in corpses]
+        sent_corpses = {c["id"] for c in added}
+        corpses_entered = [c.to_dict() for cid, c in corpses.items() if cid not in known_corpses and cid not in sent_corpses]
+        sent_corpses.update(c["id"] for c in corpses_entered)
+        corpses_removed = [cid for cid in delta["corpses"]["removed"] if cid in known_corpses]
+        corpses_gone = set(corpses_removed)
+
+        return {
+            "type": "delta",
+            "tick": delta["tick"],
+            "time": delta["time"],
+            "population": len(world.spatial),
+            "agents": {
+                "spawned": spawned,
+                "entered": entered,
+                "changed": [p for p in delta["agents"]["changed"] if p["id"] in agents and p["id"] not in sent],
+                "removed": removed,
+                "left": [aid for aid in known if aid not in agents and aid not in gone]
+            },
+            "corpses": {
+                "added": added,
+                "entered": corpses_entered,
+                "changed": [p for p in delta["corpses"]["changed"]
+                            if p["id"] in corpses and p["id"] not in sent_corpses],
+                "removed": corpses_removed,
+                "left": [cid for cid in known_corpses if cid not in corpses and cid not in corpses_gone]
+            },
+            "events": delta["events"]
+        }
@@ -1,79 +1,282 @@
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, NamedTuple, Tuple
 
 class Item:
-    def __init__(self, name: str, item_type: str, power: float = 0):
+    __slots__ = ("name", "type", "power", "value")
+
+    def __init__(self, name: str, item_type: str, power: float = 0, value: int = 1):
         self.name = name
         self.type = item_type # "resource", "weapon", "armor"
         self.power = power
+        self.value = value # Gold paid by traders
+
+    def to_record(self):
+        return (self.name, self.type, self.power, self.value)
 
     def to_dict(self):
         return {
             "name": self.name,
             "type": self.type,
-            "power": self.power
+            "power": self.power,
+            "value": self.value
         }
 
 class Inventory:
+    """Resources are stacked by (name, type, power, value); gear (weapons, armor) stays as distinct Items.
+
+    count() and len() are O(1), and the set of craftable recipes is cached
+    until the contents change.
+    """
+
     def __init__(self, capacity=10):
         self.capacity = capacity
-        self.items: List[Item] = []
+        self.gold = 0
+        self.resources: Dict[str, int] = {} # {name: count}, insertion ordered
+        self.gear: List[Item] = []
+        self.counts: Dict[str, int] = {} # {name: count} over resources and gear
         self.equipped: Dict[str, Optional[Item]] = {
             "hand": None,
             "body": None
         }
+        self._size = 0
+        self._stacks: Dict[tuple, int] = {} # {Item.to_record(): count}, insertion ordered; equal items share one
+        self._craftable: Optional[frozenset] = None
+        self._signature: Optional[tuple] = None
+        self.dirty = False # Set on any change; cleared when the owner's delta is sent
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def items(self) -> List[Item]:
+        """Carried items as a list (stacks expanded); a copy, so use add/remove/pop_item to change it."""
+        items = [Item(*record) for record, n in self._stacks.items() for _ in range(n)]
+        items.extend(self.gear)
+        return items
+
+    @property
+    def craftable(self) -> frozenset:
+        if self._craftable is None:
+            self._craftable = CraftingSystem.graph.craftable(self.counts)
+        return self._craftable
+
+    @property
+    def signature(self) -> tuple:
+        """Hashable summary of the contents, for memoizing on what an inventory holds."""
+        if self._signature is None:
+            self._signature = tuple(sorted(self.counts.items()))
+        return self._signature
+
+    def _changed(self):
+        self._craftable = None
+        self._signature = None
+        self.dirty = True
 
     def add(self, item: Item):
-        if len(self.items) < self.capacity:
-            self.items.append(item)
-            return True
-        return False
+        if self._size >= self.capacity: return False
+        if item.type == "resource":
+            self.resources[item.name] = self.resources.get(item.name, 0) + 1
+            record = item.to_record()
+            self._stacks[record] = self._stacks.get(record, 0) + 1
+        else:
+            self.gear.append(item)
+        self.counts[item.name] = self.counts.get(item.name, 0) + 1
+        self._size += 1
+        self._changed()
+        return True
         
     def remove(self, item_name: str, count=1):
-        removed = 0
-        to_remove = []
-        for i in self.items:
-            if i.name == item_name and removed < count:
-                to_remove.append(i)
-                removed += 1
-        
-        if removed == count:
-            for i in to_remove:
-                self.items.remove(i)
-            return True
-        return False
+        if self.counts.get(item_name, 0) < count: return False
+        stacked = self.resources.get(item_name, 0)
+        from_stack = min(stacked, count)
+        if from_stack:
+            self._take_resource(item_name, from_stack)
+        if count > from_stack:
+            left = count - from_stack
+            kept = []
+            for i in self.gear:
+                if left and i.name == item_name: left -= 1
+                else: kept.append(i)
+            self.gear = kept
+            self._uncount(item_name, count - from_stack)
+        self._changed()
+        return True
+
+    def _take_resource(self, name, n, record=None):
+        # From `record`'s stack first if given, then from the oldest stacks of that name
+        left = self.resources[name] - n
+        if left: self.resources[name] = left
+        else: del self.resources[name]
+        self._uncount(name, n)
+        stacks = self._stacks
+        order = [record] if record in stacks else []
+        order += [r for r in stacks if r[0] == name and r != record]
+        for r in order:
+            take = min(n, stacks[r])
+            if take == stacks[r]: del stacks[r]
+            else: stacks[r] -= take
+            n -= take
+            if not n: break
+
+    def _uncount(self, name, n):
+        left = self.counts[name] - n
+        if left: self.counts[name] = left
+        else: del self.counts[name]
+        self._size -= n
+
+    def pop_item(self) -> Optional[Item]:
+        """Removes and returns the most recent gear, else one item of the newest resource stack."""
+        if self.gear:
+            item = self.gear.pop()
+            self._uncount(item.name, 1)
+        elif self.resources:
+            record = next(reversed(self._stacks))
+            item = Item(*record) # Fresh each time: items never end up shared between inventories
+            self._take_resource(item.name, 1, record)
+        else:
+            return None
+        self._changed()
+        return item
 
     def count(self, item_name: str):
-        return sum(1 for i in self.items if i.name == item_name)
+        return self.counts.get(item_name, 0)
 
     def equip(self, item: Item, slot: str):
         if slot in self.equipped:
             if self.equipped[slot]:
                 self.add(self.equipped[slot]) # Unequip old
             self.equipped[slot] = item
-            if item in self.items:
-                self.items.remove(item)
+            if item in self.gear:
+                self.gear.remove(item)
+                self._uncount(item.name, 1)
+            elif item.type == "resource" and self.resources.get(item.name):
+                self._take_resource(item.name, 1, item.to_record())
+            self._changed()
+
+    def to_record(self):
+        return (self.capacity, self.gold, dict(self.resources), list(self._stacks.items()),
+                [i.to_record() for i in self.gear],
+                {slot: (i.to_record() if i else None) for slot, i in self.equipped.items()})
+
+    @classmethod
+    def from_record(cls, record):
+        capacity, gold, resources, stacks, gear, equipped = record
+        inv = cls(capacity)
+        inv.gold = gold
+        inv.resources = dict(resources)
+        if stacks and len(stacks[0]) == 4: # Older snapshots: one item record per name
+            inv._stacks = {tuple(r): resources[r[0]] for r in stacks}
+        else:
+            inv._stacks = {tuple(r): n for r, n in stacks}
+        inv.gear = [Item(*r) for r in gear]
+        inv.equipped = {slot: (Item(*r) if r else None) for slot, r in equipped.items()}
+        for name, n in inv.resources.items(): inv.counts[name] = inv.counts.get(name, 0) + n
+        for item in inv.gear: inv.counts[item.name] = inv.counts.get(item.name, 0) + 1
+        inv._size = sum(inv.counts.values())
+        return inv
 
     def to_dict(self):
         return {
+            "gold": self.gold,
             "items": [i.to_dict() for i in self.items],
             "equipped": {k: (v.to_dict() if v else None) for k, v in self.equipped.items()}
         }
 
+class CraftPlan(NamedTuple):
+    target: str
+    steps: Tuple[str, ...] # Recipes to craft, in order, ending with the target
+    missing: Tuple[Tuple[str, int], ...] # Raw materials still to gather
+    next_step: Optional[str] # First step craftable right now, if any
+
+class RecipeGraph:
+    """RECIPES compiled once: each recipe's tier, its consumers and how to plan towards it.
+
+    Raw materials are tier 0; a recipe is one tier above its deepest
+    ingredient. Plans expand intermediates depth-first, using what the
+    inventory already holds before crafting anything.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.tiers: Dict[str, int] = {}
+        self.consumers: Dict[str, List[str]] = {} # {ingredient: recipes that use it}
+        for name, recipe in recipes.items():
+            self._tier(name, ())
+            for material in recipe["cost"]:
+                self.consumers.setdefault(material, []).append(name)
+        self.products = tuple(n for n, r in recipes.items() if r["result"].type != "resource")
+
+    def _tier(self, name, path):
+        if name not in self.recipes: return 0
+        if name in path: raise ValueError(f"Recipe cycle: {' -> '.join(path + (name,))}")
+        if name not in self.tiers:
+            self.tiers[name] = 1 + max(self._tier(m, path + (name,)) for m in self.recipes[name]["cost"])
+        return self.tiers[name]
+
+    def plan(self, target, have):
+        """Steps and missing raw materials to make one `target` from `have` ({name: count})."""
+        steps, missing = [], {}
+        self._craft(target, dict(have), steps, missing)
+        return steps, missing
+
+    def _craft(self, name, have, steps, missing):
+        for material, n in self.recipes[name]["cost"].items():
+            self._need(material, n, have, steps, missing)
+        steps.append(name)
+
+    def _need(self, name, qty, have, steps, missing):
+        take = min(have.get(name, 0), qty)
+        have[name] = have.get(name, 0) - take
+        short = qty - take
+        if not short: return
+        if name not in self.recipes:
+            missing[name] = missing.get(name, 0) + short
+            return
+        for _ in range(short):
+            self._craft(name, have, steps, missing)
+
+    def craftable(self, have):
+        return frozenset(name for name, recipe in self.recipes.items()
+                         if all(have.get(m, 0) >= n for m, n in recipe["cost"].items()))
+
+@lru_cache(maxsize=4096)
+def _plan(targets, signature):
+    # Memoized on the inventory signature: agents holding the same goods share one search
+    graph = CraftingSystem.graph
+    have = dict(signature)
+    craftable = graph.craftable(have)
+    best = None
+    for target in targets:
+        steps, missing = graph.plan(target, have)
+        cost = (sum(missing.values()), len(steps), graph.tiers[target])
+        if best is None or cost < best[0]:
+            next_step = next((s for s in steps if s in craftable), None)
+            best = (cost, CraftPlan(target, tuple(steps), tuple(sorted(missing.items())), next_step))
+    return best[1] if best else None
+
 class CraftingSystem:
     RECIPES = {
         "Spear": {"cost": {"Wood": 3}, "result": Item("Spear", "weapon", 15)},
         "Tunic": {"cost": {"Fiber": 3}, "result": Item("Tunic", "armor", 10)},
         "Club": {"cost": {"Wood": 2}, "result": Item("Club", "weapon", 10)},
+        "Ingot": {"cost": {"Ore": 2}, "result": Item("Ingot", "resource", 0, 3)},
+        "Sword": {"cost": {"Ingot": 2, "Wood": 1}, "result": Item("Sword", "weapon", 25)},
     }
+    graph: RecipeGraph # Compiled from RECIPES below
 
     @staticmethod
     def can_craft(inventory: Inventory, item_name: str):
-        if item_name not in CraftingSystem.RECIPES: return False
-        recipe = CraftingSystem.RECIPES[item_name]
-        for mat, count in recipe["cost"].items():
-            if inventory.count(mat) < count:
-                return False
-        return True
+        return item_name in inventory.craftable
+
+    @staticmethod
+    def plan(inventory: Inventory, targets=None) -> Optional[CraftPlan]:
+        """Cheapest target to work towards (fewest missing materials, then fewest steps).
+
+        `targets` is one recipe name or several; defaults to every non-resource product.
+        """
+        if targets is None: targets = CraftingSystem.graph.products
+        elif isinstance(targets, str): targets = (targets,)
+        return _plan(tuple(targets), inventory.signature)
 
     @staticmethod
     def craft(inventory: Inventory, item_name: str):
@@ -85,6 +288,8 @@ class CraftingSystem:
             inventory.remove(mat, count)
         
         # Add result
-        new_item = Item(recipe["result"].name, recipe["result"].type, recipe["result"].power)
-        inventory.add(new_item)
+        result = recipe["result"]
+        inventory.add(Item(result.name, result.type, result.power, result.value))
         return True
+
+CraftingSystem.graph = RecipeGraph(CraftingSystem.RECIPES)
@@ -1,47 +1,137 @@
 import random
-import uuid
+from collections import OrderedDict
+
+HISTORY_SIZE = 64 # Meme ids a host remembers having caught (LRU)
+VOCAB_SIZE = 6 # Memes kept per sentiment
 
 class Meme:
-    def __init__(self, text, sentiment, parent_id=None):
-        self.id = str(uuid.uuid4())[:8]
+    __slots__ = ("id", "text", "sentiment", "parent_id", "generation", "virality")
+
+    def __init__(self, meme_id, text, sentiment, parent_id=None, generation=0):
+        self.id = meme_id
         self.text = text
         self.sentiment = sentiment # "hostile", "friendly", "fearful", "neutral"
         self.parent_id = parent_id # Lineage
-        self.generation = 0
+        self.generation = generation
         self.virality = 1.0 # Base infection rate
 
-    def mutate(self):
+    @property
+    def key(self):
+        return (self.text, self.sentiment, self.parent_id)
+
+    def mutate(self, rng=random, registry=None):
         """Returns a mutated version of this meme."""
         # Mutation Logic: Phonetic drift or Synonym swap
-        new_text = self._apply_drift(self.text)
-        child = Meme(new_text, self.sentiment, self.id)
-        child.generation = self.generation + 1
-        return child
+        new_text = self._apply_drift(self.text, rng)
+        return (registry if registry is not None else MEMES).intern(new_text, self.sentiment, self.id, self.generation + 1)
 
-    def _apply_drift(self, text):
+    def _apply_drift(self, text, rng):
         # Simple procedural corruption
         vowels = "aeiou"
-        if random.random() < 0.3:
+        if rng.random() < 0.3:
             # Vowel shift
             char_list = list(text)
-            idx = random.randint(0, len(char_list)-1)
+            idx = rng.randint(0, len(char_list)-1)
             if char_list[idx] in vowels:
-                char_list[idx] = random.choice(vowels)
+                char_list[idx] = rng.choice(vowels)
             return "".join(char_list)
-        elif random.random() < 0.2:
+        elif rng.random() < 0.2:
             # Truncation
             if len(text) > 3:
                 return text[:-1]
-        elif random.random() < 0.2:
+        elif rng.random() < 0.2:
             # Emphasize
             return text + "!"
         return text
 
+class MemeRegistry:
+    """Shared pool of memes, interned by (text, sentiment, parent) with integer ids.
+
+    Hosts hold ids and reference-count them through acquire/release; a meme
+    nobody carries any more is dropped, so the pool tracks what is alive
+    rather than everything ever said. Lineage walks parent ids as far as
+    ancestors are still known.
+    """
+
+    def __init__(self):
+        self.memes = {} # {id: Meme}
+        self.carriers = {} # {id: hosts holding it}
+        self._ids = {} # {(text, sentiment, parent_id): id}
+        self.last_id = 0
+
+    def __len__(self):
+        return len(self.memes)
+
+    def get(self, meme_id):
+        return self.memes.get(meme_id)
+
+    def intern(self, text, sentiment, parent_id=None, generation=0):
+        meme_id = self._ids.get((text, sentiment, parent_id))
+        if meme_id is not None:
+            return self.memes[meme_id]
+        self.last_id += 1
+        meme = Meme(self.last_id, text, sentiment, parent_id, generation)
+        self.memes[meme.id] = meme
+        self._ids[meme.key] = meme.id
+        self.carriers[meme.id] = 0
+        return meme
+
+    def acquire(self, meme):
+        if meme.id not in self.memes: # Dropped while still in flight; bring it back
+            self.memes[meme.id] = meme
+            self._ids.setdefault(meme.key, meme.id)
+        self.carriers[meme.id] = self.carriers.get(meme.id, 0) + 1
+
+    def release(self, meme_id):
+        n = self.carriers.get(meme_id, 0) - 1
+        if n > 0:
+            self.carriers[meme_id] = n
+            return
+        meme = self.memes.pop(meme_id, None)
+        self.carriers.pop(meme_id, None)
+        if meme and self._ids.get(meme.key) == meme_id: del self._ids[meme.key]
+
+    def prevalence(self, meme_id):
+        return self.carriers.get(meme_id, 0)
+
+    def lineage(self, meme_id):
+        """The meme and its known ancestors, newest first."""
+        chain = []
+        meme = self.memes.get(meme_id)
+        while meme is not None:
+            chain.append(meme)
+            meme = self.memes.get(meme.parent_id) if meme.parent_id is not None else None
+        return chain
+
+    def to_record(self):
+        # Carriers aren't saved: restored hosts acquire their memes again
+        return (self.last_id, [(m.id, m.text, m.sentiment, m.parent_id, m.generation, m.virality)
+                               for m in self.memes.values()])
+
+    @classmethod
+    def from_record(cls, record):
+        registry = cls()
+        registry.last_id, memes = record
+        for meme_id, text, sentiment, parent_id, generation, virality in memes:
+            meme = Meme(meme_id, text, sentiment, parent_id, generation)
+            meme.virality = virality
+            registry.memes[meme_id] = meme
+            registry._ids[meme.key] = meme_id
+        return registry
+
+    def most_prevalent(self, n=10):
+        ranked = sorted(self.carriers.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(self.memes[i], count) for i, count in ranked]
+
+MEMES = MemeRegistry() # Default pool for hosts created outside a world
+
 class MemeticHost:
-    def __init__(self, openness_trait):
+    def __init__(self, openness_trait, rng=random, registry=None):
         self.openness = openness_trait # Susceptibility
-        self.vocabulary = {} # {sentiment: [Meme]}
-        self.infection_history = set() # Meme IDs already caught
+        self.rng = rng
+        self.registry = registry if registry is not None else MEMES
+        self.vocabulary = {} # {sentiment: [meme id]}
+        self.infection_history = OrderedDict() # Recently caught meme ids (LRU of HISTORY_SIZE)
 
         # Seed basic vocab
         self._seed_vocab()
@@ -54,42 +144,79 @@ class MemeticHost:
             "neutral": ["Hmm.", "Okay.", "Work."]
         }
         for cat, texts in seeds.items():
-            self.vocabulary[cat] = [Meme(t, cat) for t in texts]
+            for t in texts: self.learn(self.registry.intern(t, cat))
+
+    def knows(self, meme_id):
+        history = self.infection_history
+        if meme_id in history:
+            history.move_to_end(meme_id)
+            return True
+        return any(meme_id in ids for ids in self.vocabulary.values())
 
     def expose(self, meme: Meme, source_prestige: float):
         """Try to learn a new meme from a source."""
-        if meme.id in self.infection_history:
+        if self.knows(meme.id):
             return False # Already immune/knows it
         
         # Infection Chance = Openness * Virality * Source Prestige
         chance = self.openness * meme.virality * (1.0 + source_prestige)
         
-        if random.random() < chance:
+        if self.rng.random() < chance:
             self.learn(meme)
             return True
         return False
 
     def learn(self, meme: Meme):
-        if meme.sentiment not in self.vocabulary:
-            self.vocabulary[meme.sentiment] = []
+        vocab = self.vocabulary.setdefault(meme.sentiment, [])
+        self._remember(meme.id)
+        if meme.id in vocab: return
         
         # Limit vocab size (Memory constraint)
-        if len(self.vocabulary[meme.sentiment]) > 5:
-            self.vocabulary[meme.sentiment].pop(0) # Forget oldest
+        if len(vocab) >= VOCAB_SIZE:
+            self.registry.release(vocab.pop(0)) # Forget oldest
             
-        self.vocabulary[meme.sentiment].append(meme)
-        self.infection_history.add(meme.id)
+        vocab.append(meme.id)
+        self.registry.acquire(meme)
+
+    def _remember(self, meme_id):
+        history = self.infection_history
+        history[meme_id] = None
+        history.move_to_end(meme_id)
+        if len(history) > HISTORY_SIZE: history.popitem(last=False)
+
+    def release(self):
+        """Drops every held meme from the registry and forgets what it caught (the host died or left)."""
+        for ids in self.vocabulary.values():
+            for meme_id in ids: self.registry.release(meme_id)
+        self.vocabulary = {}
+        self.infection_history.clear()
+
+    def to_record(self):
+        return (self.openness, {k: list(ids) for k, ids in self.vocabulary.items()}, list(self.infection_history))
+
+    @classmethod
+    def from_record(cls, record, rng, registry):
+        host = cls.__new__(cls)
+        openness, vocabulary, history = record
+        host.openness = openness
+        host.rng = rng
+        host.registry = registry
+        host.vocabulary = {k: list(ids) for k, ids in vocabulary.items()}
+        host.infection_history = OrderedDict.fromkeys(history)
+        for ids in host.vocabulary.values():
+            for meme_id in ids: registry.acquire(registry.memes[meme_id])
+        return host
 
     def express(self, sentiment):
         """Returns a meme to speak, potentially mutating it."""
         if sentiment not in self.vocabulary or not self.vocabulary[sentiment]:
             return None
         
-        meme = random.choice(self.vocabulary[sentiment])
+        meme = self.registry.memes[self.rng.choice(self.vocabulary[sentiment])]
         
         # Mutation on expression (Evolution)
-        if random.random() < 0.1: # 10% mutation rate
-            mutant = meme.mutate()
+        if self.rng.random() < 0.1: # 10% mutation rate
+            mutant = meme.mutate(self.rng, self.registry)
             self.learn(mutant) # Self-infection with new idea
             return mutant
         
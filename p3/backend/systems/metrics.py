@@ -0,0 +1,114 @@
+from collections import defaultdict, deque
+
+PREFIX = "botmoo_"
+WINDOW = 1024 # Samples kept per summary; quantiles cover roughly the last WINDOW ticks
+QUANTILES = (0.5, 0.99)
+
+# family: (Prometheus type, help, label name or None)
+FAMILIES = {
+    "tick_phase_seconds": ("summary", "Seconds spent in each tick phase, over a rolling window", "phase"),
+    "ticks": ("counter", "Ticks simulated", None),
+    "dropped_ticks": ("counter", "Ticks skipped because the simulation fell behind", None),
+    "actions": ("counter", "Actions performed, by type", "action"),
+    "infections": ("counter", "Memes passed from one agent to another", None),
+    "deaths": ("counter", "Agents and monsters that died", None),
+    "spawns": ("counter", "Agents and monsters spawned, by job", "job"),
+    "crafts": ("counter", "Items crafted, by recipe", "recipe"),
+    "broadcast_bytes": ("counter", "Encoded frame bytes sent to clients", None),
+    "agents": ("gauge", "Living agents and monsters", None),
+    "dormant": ("gauge", "Lone sleepers skipping their ticks until something wakes them", None),
+    "corpses": ("gauge", "Corpses on the map", None),
+    "connections": ("gauge", "Connected viewers", None),
+}
+
+
+class Summary:
+    """Rolling window of recent samples plus lifetime sum and count."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.sum += value
+        self.count += 1
+
+    def quantiles(self, qs=QUANTILES):
+        ordered = sorted(self.samples)
+        if not ordered: return [0.0] * len(qs)
+        return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs]
+
+
+class Metrics:
+    """Counters, gauges and phase timings of one world.
+
+    Instrumented code holds `world.metrics`, which is None unless profiling
+    is on, so a disabled hook costs one attribute check. Families and their
+    labels are declared in FAMILIES.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.values = defaultdict(float) # {(family, label): value} for counters and gauges
+        self.summaries = {} # {(family, label): Summary}
+
+    def inc(self, family, label=None, value=1):
+        self.values[family, label] += value
+
+    def set(self, family, value, label=None):
+        self.values[family, label] = value
+
+    def observe(self, family, label, value):
+        summary = self.summaries.get((family, label))
+        if summary is None: summary = self.summaries[family, label] = Summary(self.window)
+        summary.observe(value)
+
+    def total(self, family, label=None):
+        """Lifetime sum of a summary, or the value of a counter/gauge."""
+        summary = self.summaries.get((family, label))
+        return summary.sum if summary else self.values.get((family, label), 0.0)
+
+    def samples(self):
+        """Plain (family, label, value) rows, picklable across processes; see render().
+
+        Summaries' values are (quantiles, sum, count).
+        """
+        rows = [(family, label, value) for (family, label), value in self.values.items()]
+        rows += [(family, label, (s.quantiles(), s.sum, s.count)) for (family, label), s in self.summaries.items()]
+        return rows
+
+
+def _labels(labels):
+    if not labels: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def render(sources):
+    """Prometheus text exposition of [(labels, Metrics.samples()), ...], e.g. one source per world."""
+    rows = defaultdict(list)
+    for labels, samples in sources:
+        for family, label, value in samples:
+            rows[family].append((labels, label, value))
+    lines = []
+    for family, (kind, help_text, label_name) in FAMILIES.items():
+        if family not in rows: continue
+        name = PREFIX + family
+        # Metadata names the samples exactly (counters' carry _total, as the official client writes them)
+        meta_name = f"{name}_total" if kind == "counter" else name
+        lines.append(f"# HELP {meta_name} {help_text}")
+        lines.append(f"# TYPE {meta_name} {kind}")
+        for labels, label, value in rows[family]:
+            labels = dict(labels)
+            if label is not None: labels[label_name] = label
+            if kind == "summary":
+                quantiles, total, count = value
+                for q, v in zip(QUANTILES, quantiles):
+                    lines.append(f"{name}{_labels({**labels, 'quantile': q})} {v:.9g}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:.9g}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+            else:
+                lines.append(f"{meta_name}{_labels(labels)} {value:.9g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Agents step to any of their 8 neighbours; flow fields index into this
+STEPS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+NO_STEP = -1
+
+
+def distance_field(passable, width, height, goals, limit=None):
+    """Steps from every walkable cell to the nearest goal cell, by multi-source BFS.
+
+    `passable` is a flat bool array, `goals` flat cell indices. Cells further
+    than `limit` steps (or unreachable) stay -1, so a bounded field only costs
+    the area it covers. Returns (distances, (x0, y0, x1, y1) box of reached cells).
+    """
+    dist = np.full(width * height, -1, dtype=np.int32)
+    frontier = np.unique(np.asarray(goals, dtype=np.int64))
+    frontier = frontier[passable[frontier]]
+    if not frontier.size: return dist, None
+    dist[frontier] = 0
+    slot = np.empty(width * height, dtype=np.int64) # Scratch for de-duplicating frontiers without sorting
+    x0, y0, x1, y1 = width, height, -1, -1
+    d = 0
+    while frontier.size:
+        xs, ys = frontier % width, frontier // width
+        x0, x1 = min(x0, int(xs.min())), max(x1, int(xs.max()))
+        y0, y1 = min(y0, int(ys.min())), max(y1, int(ys.max()))
+        if d == limit: break
+        d += 1
+        reached = []
+        for dx, dy in STEPS:
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+            reached.append(ny[inside] * width + nx[inside])
+        cells = np.concatenate(reached)
+        cells = cells[(dist[cells] < 0) & passable[cells]]
+        order = np.arange(cells.size)
+        slot[cells] = order # Last write wins: keeps one copy of each cell
+        frontier = cells[slot[cells] == order]
+        dist[frontier] = d
+    return dist, (x0, y0, x1, y1)
+
+
+def flow_field(dist, width, height, box):
+    """For each cell in `box`, the index into STEPS of its neighbour nearest the goal (NO_STEP at goals)."""
+    flow = np.full(width * height, NO_STEP, dtype=np.int8)
+    if box is None: return flow
+    x0, y0, x1, y1 = box
+    # Everything outside the box is out of reach, so a padded copy of the box is all we need
+    far = np.iinfo(np.int32).max
+    here = dist.reshape(height, width)[y0:y1 + 1, x0:x1 + 1].astype(np.int64)
+    here[here < 0] = far
+    padded = np.pad(here, 1, constant_values=far)
+    best = here.copy()
+    choice = np.full(here.shape, NO_STEP, dtype=np.int8)
+    h, w = here.shape
+    for k, (dx, dy) in enumerate(STEPS):
+        there = padded[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx]
+        closer = there < best # First of equally good steps wins
+        best = np.where(closer, there, best)
+        choice[closer] = k
+    flow.reshape(height, width)[y0:y1 + 1, x0:x1 + 1] = choice
+    return flow
+
+
+class Navigator:
+    """Shared distance and flow fields over one map, one per named goal.
+
+    Fields are built the first time an agent asks for a step and kept until
+    their goal cells change, so every agent chasing the same goal reads its
+    next step from one array. Bounded goals (`limit`) only cover the cells
+    within that many steps, which keeps moving targets cheap to re-path.
+    """
+
+    def __init__(self, width, height, passable):
+        self.width = width
+        self.height = height
+        self.passable = np.frombuffer(bytes(passable), dtype=np.uint8).astype(bool)
+        self.goals = {} # {name: (goal cells, limit)}
+        self.fields = {} # {name: (distances, flow)}, built lazily
+
+    def set_goals(self, name, cells, limit=None):
+        """(Re)targets a field; it is only rebuilt if the cells actually changed."""
+        cells = tuple(sorted(cells))
+        if self.goals.get(name) == (cells, limit): return
+        self.goals[name] = (cells, limit)
+        self.fields.pop(name, None)
+
+    def invalidate(self, passable):
+        """Terrain changed: every field is rebuilt on next use."""
+        self.passable = np.frombuffer(bytes(passable), dtype=np.uint8).astype(bool)
+        self.fields.clear()
+
+    def field(self, name):
+        field = self.fields.get(name)
+        if field is None:
+            cells, limit = self.goals[name]
+            dist, box = distance_field(self.passable, self.width, self.height, cells, limit)
+            field = self.fields[name] = (dist, flow_field(dist, self.width, self.height, box))
+        return field
+
+    def distance(self, name, x, y):
+        """Steps from (x, y) to the goal, or -1 if out of reach."""
+        if name not in self.goals: return -1
+        return int(self.field(name)[0][y * self.width + x])
+
+    def step(self, name, x, y):
+        """Next cell from (x, y) towards the goal, or None at the goal or out of reach."""
+        if name not in self.goals: return None
+        k = self.field(name)[1][y * self.width + x]
+        if k == NO_STEP: return None
+        dx, dy = STEPS[k]
+        return x + dx, y + dy
@@ -1,14 +1,13 @@
 import random
-import uuid
 
 class Psychology:
-    def __init__(self):
+    def __init__(self, rng=random):
         # Big Five Personality Traits (0.0 to 1.0)
-        self.openness = random.random()        # Creativity, curiosity -> Affects Crafting / Exploration
-        self.conscientiousness = random.random() # Discipline, organization -> Affects Work / Hoarding
-        self.extraversion = random.random()    # Social energy -> Affects Chat / Grouping
-        self.agreeableness = random.random()   # Kindness, cooperation -> Affects Sharing / Aggression
-        self.neuroticism = random.random()     # Anxiety, instability -> Affects Sanity loss / Flight response
+        self.openness = rng.random()        # Creativity, curiosity -> Affects Crafting / Exploration
+        self.conscientiousness = rng.random() # Discipline, organization -> Affects Work / Hoarding
+        self.extraversion = rng.random()    # Social energy -> Affects Chat / Grouping
+        self.agreeableness = rng.random()   # Kindness, cooperation -> Affects Sharing / Aggression
+        self.neuroticism = rng.random()     # Anxiety, instability -> Affects Sanity loss / Flight response
 
         # Mental State
         self.sanity = 100.0
@@ -32,6 +31,18 @@ class Psychology:
         if self.sanity < 40 and self.conscientiousness > 0.8 and "hoarding_ocd" not in self.disorders:
             self.disorders.append("hoarding_ocd")
 
+    def to_record(self):
+        return (self.openness, self.conscientiousness, self.extraversion, self.agreeableness,
+                self.neuroticism, self.sanity, self.max_sanity, list(self.disorders))
+
+    @classmethod
+    def from_record(cls, record):
+        psyche = cls.__new__(cls)
+        (psyche.openness, psyche.conscientiousness, psyche.extraversion, psyche.agreeableness,
+         psyche.neuroticism, psyche.sanity, psyche.max_sanity, disorders) = record
+        psyche.disorders = list(disorders)
+        return psyche
+
     def to_dict(self):
         return {
             "traits": {
@@ -45,7 +56,14 @@ class Psychology:
             "disorders": self.disorders
         }
 
+EPISODE_CAPACITY = 32 # Recent episodes kept verbatim per agent
+SALIENT_CAPACITY = 16 # Strong memories kept after they leave the recent buffer
+SALIENCE_THRESHOLD = 3 # |emotional_weight| at or above this is worth keeping
+
+
 class EpisodicMemory:
+    __slots__ = ("tick", "type", "description", "emotional_weight", "related_agent_id")
+
     def __init__(self, tick, event_type, description, emotional_weight, related_agent_id=None):
         self.tick = tick
         self.type = event_type # "trauma", "joy", "neutral"
@@ -53,9 +71,131 @@ class EpisodicMemory:
         self.emotional_weight = emotional_weight # -10.0 (Trauma) to +10.0 (Ecstasy)
         self.related_agent_id = related_agent_id
 
+    def to_record(self):
+        return (self.tick, self.type, self.description, self.emotional_weight, self.related_agent_id)
+
     def to_dict(self):
         return {
             "tick": self.tick,
             "desc": self.description,
             "weight": self.emotional_weight
         }
+
+
+class RoutineSummary:
+    """What's left of the routine episodes of one type once they've been forgotten."""
+    __slots__ = ("count", "first_tick", "last_tick", "total_weight")
+
+    def __init__(self, tick):
+        self.count = 0
+        self.first_tick = tick
+        self.last_tick = tick
+        self.total_weight = 0.0
+
+    def add(self, episode):
+        self.count += 1
+        self.last_tick = episode.tick
+        self.total_weight += episode.emotional_weight
+
+    def to_dict(self):
+        return {"count": self.count, "first_tick": self.first_tick, "last_tick": self.last_tick,
+                "mean_weight": round(self.total_weight / self.count, 2) if self.count else 0}
+
+
+class EpisodicStore:
+    """Fixed-size episodic memory for one agent.
+
+    New episodes go into a ring buffer. When one is overwritten it is
+    consolidated: salient episodes (strong |emotional_weight|) move to a
+    small long-term set that drops its weakest member when full, routine
+    ones are folded into a per-type RoutineSummary. Size stays bounded no
+    matter how long the agent lives.
+    """
+
+    def __init__(self, capacity=EPISODE_CAPACITY, salient_capacity=SALIENT_CAPACITY, threshold=SALIENCE_THRESHOLD):
+        self.capacity = capacity
+        self.salient_capacity = salient_capacity
+        self.threshold = threshold
+        self._ring = [None] * capacity
+        self._next = 0 # Slot the next episode is written to
+        self._count = 0
+        self.salient = [] # Oldest first
+        self.summaries = {} # {event_type: RoutineSummary}
+
+    def __len__(self):
+        return self._count + len(self.salient)
+
+    def __iter__(self):
+        """Salient then recent episodes, oldest first."""
+        yield from self.salient
+        yield from self.recent()
+
+    def append(self, episode):
+        evicted = self._ring[self._next]
+        self._ring[self._next] = episode
+        self._next = (self._next + 1) % self.capacity
+        if evicted is None:
+            self._count += 1
+        else:
+            self._consolidate(evicted)
+
+    def _consolidate(self, episode):
+        if abs(episode.emotional_weight) >= self.threshold:
+            salient = self.salient
+            if len(salient) >= self.salient_capacity:
+                # Forget the weakest (oldest on ties) unless the newcomer is weaker still
+                weakest = min(range(len(salient)), key=lambda i: abs(salient[i].emotional_weight))
+                if abs(salient[weakest].emotional_weight) > abs(episode.emotional_weight):
+                    self._summarize(episode)
+                    return
+                self._summarize(salient.pop(weakest))
+            salient.append(episode)
+        else:
+            self._summarize(episode)
+
+    def _summarize(self, episode):
+        summary = self.summaries.get(episode.type)
+        if summary is None:
+            summary = self.summaries[episode.type] = RoutineSummary(episode.tick)
+        summary.add(episode)
+
+    def recent(self, n=None):
+        """Episodes still in the ring buffer, oldest first (the last `n` if given)."""
+        start = self._next if self._count == self.capacity else 0
+        ordered = [self._ring[(start + i) % self.capacity] for i in range(self._count)]
+        return ordered if n is None else ordered[-n:]
+
+    def query(self, event_type=None, since=None, until=None, related_agent_id=None):
+        """Remembered episodes matching every given filter, by tick (since/until inclusive)."""
+        found = []
+        for episode in self:
+            if event_type is not None and episode.type != event_type: continue
+            if since is not None and episode.tick < since: continue
+            if until is not None and episode.tick > until: continue
+            if related_agent_id is not None and episode.related_agent_id != related_agent_id: continue
+            found.append(episode)
+        found.sort(key=lambda e: e.tick)
+        return found
+
+    def to_record(self):
+        return (self.capacity, self.salient_capacity, self.threshold,
+                [e.to_record() for e in self.recent()], [e.to_record() for e in self.salient],
+                {t: (s.count, s.first_tick, s.last_tick, s.total_weight) for t, s in self.summaries.items()})
+
+    @classmethod
+    def from_record(cls, record):
+        capacity, salient_capacity, threshold, recent, salient, summaries = record
+        store = cls(capacity, salient_capacity, threshold)
+        for episode in recent: store.append(EpisodicMemory(*episode))
+        store.salient = [EpisodicMemory(*episode) for episode in salient]
+        for event_type, (count, first_tick, last_tick, total_weight) in summaries.items():
+            summary = store.summaries[event_type] = RoutineSummary(first_tick)
+            summary.count, summary.last_tick, summary.total_weight = count, last_tick, total_weight
+        return store
+
+    def to_dict(self):
+        return {
+            "recent": [e.to_dict() for e in self.recent()],
+            "salient": [e.to_dict() for e in self.salient],
+            "summaries": {t: s.to_dict() for t, s in self.summaries.items()}
+        }
@@ -0,0 +1,25 @@
+import random
+
+STREAMS = ("terrain", "agents", "memetics", "combat")
+
+class RandomStreams:
+    """Independent random.Random streams derived from one world seed.
+
+    Each subsystem draws from its own stream, so e.g. an extra meme
+    mutation never shifts the terrain or combat rolls of the same seed.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**63)
+        self.seed = seed
+        for name in STREAMS:
+            # str seeds are hashed with SHA-512: stable across runs and processes
+            setattr(self, name, random.Random(f"{seed}:{name}"))
+
+    def getstate(self):
+        return {name: getattr(self, name).getstate() for name in STREAMS}
+
+    def setstate(self, state):
+        for name in STREAMS:
+            getattr(self, name).setstate(state[name])
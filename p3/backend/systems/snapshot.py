@@ -0,0 +1,118 @@
+import gzip
+import io
+import os
+import pickle
+import struct
+import zlib
+
+SNAPSHOT_MAGIC = b"BWLD"
+SNAPSHOT_VERSION = 1
+
+# File: magic, format version, then a gzip stream of length-prefixed records
+_HEADER = struct.Struct("<4sH")
+_LENGTH = struct.Struct("<I")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+# What a damaged file makes decompressing or unpickling raise
+DECODE_ERRORS = (EOFError, gzip.BadGzipFile, zlib.error, struct.error, pickle.UnpicklingError)
+
+
+class _PrimitiveUnpickler(pickle.Unpickler):
+    # Records are tuples/lists/dicts/sets of primitives; refusing globals means a
+    # tampered file can't make us import or call anything
+    def find_class(self, module, name):
+        raise SnapshotError(f"Unexpected object in snapshot: {module}.{name}")
+
+
+class SnapshotWriter:
+    """Streams records (primitive tuples, dicts, bytes...) into a snapshot file.
+
+    Writes go to `path + ".tmp"` and replace `path` only when the writer is
+    closed without an error, so a crash mid-save never clobbers the last
+    good snapshot.
+    """
+
+    def __init__(self, path, compresslevel=1):
+        self.path = path
+        self._tmp = f"{path}.tmp"
+        self._raw = open(self._tmp, "wb")
+        self._raw.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION))
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=compresslevel)
+
+    def write(self, record):
+        data = pickle.dumps(record, protocol=5)
+        self._stream.write(_LENGTH.pack(len(data)))
+        self._stream.write(data)
+
+    def close(self, commit=True):
+        self._stream.close()
+        self._raw.close()
+        if commit: os.replace(self._tmp, self.path)
+        else: os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+class SnapshotReader:
+    """Reads back the records of a SnapshotWriter file, in order.
+
+    The whole stream is decompressed once up front, so a damaged file fails
+    its CRC check (as SnapshotError) before any record is handed out.
+    Call finish() after the last record to reject trailing data.
+    """
+
+    def __init__(self, path):
+        self._raw = open(path, "rb")
+        header = self._raw.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            self._raw.close()
+            raise SnapshotError("Not a world snapshot")
+        magic, version = _HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC:
+            self._raw.close()
+            raise SnapshotError("Not a world snapshot")
+        if version != SNAPSHOT_VERSION:
+            self._raw.close()
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        self.version = version
+        try:
+            with gzip.GzipFile(fileobj=self._raw, mode="rb") as check:
+                while check.read(1 << 20): pass
+        except DECODE_ERRORS as e:
+            self._raw.close()
+            raise SnapshotError(f"Corrupt snapshot: {e}") from e
+        self._raw.seek(_HEADER.size)
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode="rb")
+
+    def read(self):
+        try:
+            head = self._stream.read(_LENGTH.size)
+            if len(head) < _LENGTH.size: raise SnapshotError("Truncated snapshot")
+            (n,) = _LENGTH.unpack(head)
+            data = self._stream.read(n)
+            if len(data) < n: raise SnapshotError("Truncated snapshot")
+            return _PrimitiveUnpickler(io.BytesIO(data)).load()
+        except DECODE_ERRORS as e:
+            raise SnapshotError(f"Corrupt snapshot: {e}") from e
+
+    def finish(self):
+        """Raises SnapshotError if anything follows the last record."""
+        if self._stream.read(1): raise SnapshotError("Unexpected data after the last record")
+
+    def close(self):
+        self._stream.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
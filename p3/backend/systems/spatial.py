@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class SpatialHash:
+    """Uniform grid of buckets for radius queries over entities with id/x/y."""
+
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self.buckets = {} # {(cx, cy): {entity_id: entity}}
+        self.cells = {} # {entity_id: (cx, cy)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, entity):
+        return entity.id in self.cells
+
+    def _key(self, x, y):
+        return (int(x) // self.cell_size, int(y) // self.cell_size)
+
+    def insert(self, entity):
+        key = self._key(entity.x, entity.y)
+        self.cells[entity.id] = key
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {}
+        bucket[entity.id] = entity
+
+    def remove(self, entity):
+        key = self.cells.pop(entity.id, None)
+        if key is None: return
+        bucket = self.buckets[key]
+        del bucket[entity.id]
+        if not bucket:
+            del self.buckets[key]
+
+    def update(self, entity):
+        """Re-buckets an entity after its position changed (inserts it if unknown)."""
+        old_key = self.cells.get(entity.id)
+        new_key = self._key(entity.x, entity.y)
+        if old_key == new_key: return
+        if old_key is not None:
+            self.remove(entity)
+        self.insert(entity)
+
+    def clear(self):
+        self.buckets.clear()
+        self.cells.clear()
+
+    def query_radius(self, x, y, radius, exclude=None):
+        """Entities within `radius` (euclidean, inclusive) of (x, y)."""
+        cs = self.cell_size
+        r2 = radius * radius
+        min_cx, max_cx = int(x - radius) // cs, int(x + radius) // cs
+        min_cy, max_cy = int(y - radius) // cs, int(y + radius) // cs
+        exclude_id = exclude.id if exclude is not None else None
+        found = []
+        buckets = self.buckets
+        for cy in range(min_cy, max_cy + 1):
+            for cx in range(min_cx, max_cx + 1):
+                bucket = buckets.get((cx, cy))
+                if not bucket: continue
+                for eid, e in bucket.items():
+                    if eid == exclude_id: continue
+                    dx = e.x - x
+                    dy = e.y - y
+                    if dx * dx + dy * dy <= r2:
+                        found.append(e)
+        return found
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Entities with x0 <= x <= x1 and y0 <= y <= y1."""
+        cs = self.cell_size
+        found = []
+        buckets = self.buckets
+        for cy in range(int(y0) // cs, int(y1) // cs + 1):
+            for cx in range(int(x0) // cs, int(x1) // cs + 1):
+                bucket = buckets.get((cx, cy))
+                if not bucket: continue
+                for e in bucket.values():
+                    if x0 <= e.x <= x1 and y0 <= e.y <= y1:
+                        found.append(e)
+        return found
+
+
+def radius_pairs(qx, qy, px, py, radius):
+    """Every (query index, point index) pair within `radius` (euclidean, inclusive).
+
+    One bucketed join over whole arrays: points are sorted by cell
+    (cell size = radius) and each query looks up its 3x3 cell block with
+    searchsorted. Pairs come back sorted by query, then point index.
+    """
+    qx, qy = np.asarray(qx, dtype=np.int64), np.asarray(qy, dtype=np.int64)
+    px, py = np.asarray(px, dtype=np.int64), np.asarray(py, dtype=np.int64)
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(qx) or not len(px): return empty, empty
+    cs = max(1, int(radius))
+    qcx, qcy, pcx, pcy = qx // cs, qy // cs, px // cs, py // cs
+    # Shift cells to start at 1 so the -1 neighbours keep non-negative keys
+    min_cx = min(qcx.min(), pcx.min()) - 1
+    min_cy = min(qcy.min(), pcy.min()) - 1
+    span = max(qcx.max(), pcx.max()) - min_cx + 2
+    keys = (pcy - min_cy) * span + (pcx - min_cx)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    qs, ps = [], []
+    for oy in (-1, 0, 1):
+        for ox in (-1, 0, 1):
+            k = (qcy + oy - min_cy) * span + (qcx + ox - min_cx)
+            lo = np.searchsorted(sorted_keys, k, "left")
+            n = np.searchsorted(sorted_keys, k, "right") - lo
+            total = int(n.sum())
+            if not total: continue
+            starts = np.repeat(lo - (np.cumsum(n) - n), n)
+            qs.append(np.repeat(np.arange(len(qx)), n))
+            ps.append(order[starts + np.arange(total)])
+    if not qs: return empty, empty
+    qi, pi = np.concatenate(qs), np.concatenate(ps)
+    dx, dy = px[pi] - qx[qi], py[pi] - qy[qi]
+    keep = dx * dx + dy * dy <= radius * radius
+    qi, pi = qi[keep], pi[keep]
+    by_query = np.lexsort((pi, qi))
+    return qi[by_query], pi[by_query]
@@ -0,0 +1,118 @@
+import struct
+import numpy as np
+
+TERRAIN_GRASS = "grass"
+TERRAIN_WALL = "wall"
+TERRAIN_WATER = "water"
+TERRAIN_FOREST = "forest"
+
+# Grid cells hold one byte: an index into TERRAIN_NAMES
+TERRAIN_NAMES = (TERRAIN_GRASS, TERRAIN_WALL, TERRAIN_WATER, TERRAIN_FOREST)
+TERRAIN_CODES = {name: code for code, name in enumerate(TERRAIN_NAMES)}
+GRASS, WALL, WATER, FOREST = range(len(TERRAIN_NAMES))
+
+# bytes.translate() table: terrain code -> 1 if walkable else 0
+PASSABLE_TABLE = bytes(1 if code in (GRASS, FOREST) else 0 for code in range(256))
+
+MAP_MAGIC = b"BMAP"
+MAP_VERSION = 1
+_HEADER = struct.Struct("<4sBIIB") # magic, version, width, height, legend size
+
+
+# Biome generation: fractions of the map, and feature sizes in tiles
+WATER_FRACTION = 0.05
+FOREST_FRACTION = 0.12
+BLOB_SCALE = 12 # Typical lake / woods radius
+WALLS_PER_CELL = 5 / 4096 # 5 wall runs on the classic 64x64 map
+WALL_LENGTH = (5, 15)
+
+
+def _value_noise(gen, width, height, scale, octaves=2):
+    """Smoothed value noise in [0, 1): random lattice every `scale` tiles, bicubic-eased."""
+    field = np.zeros((height, width), dtype=np.float32)
+    amplitude = 1.0
+    for _ in range(octaves):
+        cw, ch = width // scale + 2, height // scale + 2
+        lattice = gen.random((ch, cw), dtype=np.float32)
+        # Separable interpolation: along x for every lattice row, then along y
+        gx = np.arange(width, dtype=np.float32) / scale
+        x0 = gx.astype(np.int32)
+        fx = gx - x0
+        fx = fx * fx * (3 - 2 * fx)
+        rows = lattice[:, x0] * (1 - fx) + lattice[:, x0 + 1] * fx
+        gy = np.arange(height, dtype=np.float32) / scale
+        y0 = gy.astype(np.int32)
+        fy = (gy - y0)[:, None]
+        fy = fy * fy * (3 - 2 * fy)
+        field += amplitude * (rows[y0] * (1 - fy) + rows[y0 + 1] * fy)
+        amplitude *= 0.5
+        scale = max(1, scale // 2)
+    return field
+
+
+def generate_biomes(width, height, rng):
+    """Terrain codes as a flat row-major bytearray: grass with lakes, woods and wall runs.
+
+    Whole-array NumPy passes, seeded from `rng` (the world's terrain stream).
+    Coverage fractions and wall counts scale with the map area.
+    """
+    gen = np.random.default_rng(rng.getrandbits(64))
+    grid = np.full((height, width), GRASS, dtype=np.uint8)
+    area = width * height
+
+    # Lowest points of one noise field become lakes, highest of another become woods
+    wet = _value_noise(gen, width, height, BLOB_SCALE)
+    grid[wet <= np.quantile(wet, WATER_FRACTION)] = WATER
+    lush = _value_noise(gen, width, height, BLOB_SCALE)
+    grid[(lush >= np.quantile(lush, 1 - FOREST_FRACTION)) & (grid != WATER)] = FOREST
+
+    # Straight wall runs in one of the 8 directions, rasterized together
+    n = max(1, round(area * WALLS_PER_CELL))
+    cx = gen.integers(0, width, n)
+    cy = gen.integers(0, height, n)
+    dx = gen.integers(-1, 2, n)
+    dy = gen.integers(-1, 2, n)
+    length = gen.integers(WALL_LENGTH[0], WALL_LENGTH[1] + 1, n)
+    steps = np.arange(WALL_LENGTH[1])
+    xs = cx[:, None] + dx[:, None] * steps
+    ys = cy[:, None] + dy[:, None] * steps
+    keep = (steps < length[:, None]) & (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    grid[ys[keep], xs[keep]] = WALL
+
+    return bytearray(grid.tobytes())
+
+
+def passability_mask(cells):
+    return cells.translate(PASSABLE_TABLE)
+
+
+def ore_faces(width, height, cells):
+    """Flat bool array: walkable cells with a wall among their 8 neighbours, where blacksmiths mine Ore."""
+    grid = np.frombuffer(bytes(cells), dtype=np.uint8).reshape(height, width)
+    wall = np.pad(grid == WALL, 1)
+    near = np.zeros((height, width), dtype=bool)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            near |= wall[1 + dy:height + 1 + dy, 1 + dx:width + 1 + dx]
+    walkable = np.frombuffer(passability_mask(cells), dtype=np.uint8).reshape(height, width).astype(bool)
+    return (near & walkable).ravel()
+
+
+def encode_map(width, height, cells):
+    """Binary /map payload: header, legend (code order), then one byte per cell, row-major."""
+    legend = b"".join(bytes([len(name)]) + name.encode("ascii") for name in TERRAIN_NAMES)
+    return _HEADER.pack(MAP_MAGIC, MAP_VERSION, width, height, len(TERRAIN_NAMES)) + legend + bytes(cells)
+
+
+def decode_map(data):
+    """Inverse of encode_map: (width, height, legend names, cells)."""
+    magic, version, width, height, count = _HEADER.unpack_from(data)
+    if magic != MAP_MAGIC or version != MAP_VERSION:
+        raise ValueError(f"Unsupported map payload {magic!r} v{version}")
+    offset = _HEADER.size
+    legend = []
+    for _ in range(count):
+        size = data[offset]
+        legend.append(data[offset + 1:offset + 1 + size].decode("ascii"))
+        offset += 1 + size
+    return width, height, legend, bytearray(data[offset:offset + width * height])
@@ -0,0 +1,31 @@
+class TimerWheel:
+    """Hashed timing wheel keyed by tick.
+
+    schedule() is O(1) and advance() only looks at the one slot for the
+    current tick; entries more than a lap away wait in their slot for a
+    later pass. advance() must be called for every tick, in order.
+    """
+
+    def __init__(self, slots=128):
+        self.slots = [[] for _ in range(slots)]
+        self.now = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, item, due):
+        due = max(due, self.now + 1) # Never into a slot that was already swept
+        self.slots[due % len(self.slots)].append((due, item))
+        self._count += 1
+
+    def advance(self, now):
+        """Moves the wheel to tick `now` and returns the items due, in scheduling order."""
+        self.now = now
+        slot = self.slots[now % len(self.slots)]
+        if not slot: return []
+        due = [item for t, item in slot if t <= now]
+        if due:
+            slot[:] = [(t, item) for t, item in slot if t > now]
+            self._count -= len(due)
+        return due
@@ -0,0 +1,46 @@
+"""A client's copy of the world, rebuilt from a keyframe plus deltas, for the stream tests."""
+
+
+class Mirror:
+    """Agents and corpses by id, as a client holds them."""
+
+    def __init__(self, keyframe):
+        self.agents = {a["id"]: a for a in keyframe["agents"]}
+        self.corpses = {c["id"]: c for c in keyframe["corpses"]}
+
+    def apply(self, delta):
+        """Applies a WorldEngine delta, or an Interest-filtered one with its "entered"/"left" lists."""
+        for group, held, added in (("agents", self.agents, "spawned"), ("corpses", self.corpses, "added")):
+            changes = delta[group]
+            for eid in changes["removed"] + changes.get("left", []): del held[eid]
+            for e in changes[added] + changes.get("entered", []): held[e["id"]] = e
+            for patch in changes["changed"]: held[patch["id"]].update(patch)
+
+
+def check_stream(test, world, ticks, interest=None, pans=None):
+    """Runs `world` from 21:00 for `ticks`, checking after every tick that its deltas rebuild get_state().
+
+    The hour brings on monsters, deaths and corpses. With an `interest`, the
+    stream goes through it and only the viewport is compared; `pans` maps a
+    tick number to the Viewport to switch to before it. Returns the last state.
+    """
+    world.time_of_day = 21
+    world.get_delta() # The starting population is in the keyframe
+    mirror = Mirror(interest.keyframe(world) if interest else world.get_keyframe())
+    state = world.get_state()
+    for tick in range(ticks):
+        if pans and tick in pans: interest.viewport = pans[tick]
+        world.update()
+        delta = world.get_delta()
+        if interest: delta = interest.filter(world, delta)
+        mirror.apply(delta)
+
+        state = world.get_state()
+        inside = lambda e: True
+        if interest:
+            v = interest.viewport
+            inside = lambda e: v.x0 <= e["x"] <= v.x1 and v.y0 <= e["y"] <= v.y1
+            test.assertEqual(delta["population"], len(state["agents"]))
+        test.assertEqual(mirror.agents, {a["id"]: a for a in state["agents"] if inside(a)})
+        test.assertEqual(mirror.corpses, {c["id"]: c for c in state["corpses"] if inside(c)})
+    return state
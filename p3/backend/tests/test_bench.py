@@ -0,0 +1,17 @@
+import unittest
+from bench import run_benchmark, compare, PHASES
+
+class TestBench(unittest.TestCase):
+    def test_run_reports_phases(self):
+        result = run_benchmark(num_agents=5, ticks=3, width=16, height=16)
+        self.assertEqual(result["ticks"], 3)
+        self.assertEqual(set(result["ms_per_tick"]), set(PHASES))
+        self.assertGreater(result["ticks_per_sec"], 0)
+
+    def test_compare_flags_slowdowns(self):
+        baseline = [{"agents": 10, "ticks_per_sec": 100.0}, {"agents": 100, "ticks_per_sec": 10.0}]
+        results = [{"agents": 10, "ticks_per_sec": 95.0}, {"agents": 100, "ticks_per_sec": 7.0}]
+        self.assertEqual(compare(results, baseline, 0.2), [(100, 10.0, 7.0)])
+
+if __name__ == '__main__':
+    unittest.main()
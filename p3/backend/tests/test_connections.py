@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from connections import ConnectionManager
+
+class FakeSocket:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.delay: await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+class TestConnectionManager(unittest.TestCase):
+    def test_keyframe_then_frames_in_order(self):
+        async def scenario():
+            manager = ConnectionManager(lambda view: "KEY")
+            ws = FakeSocket()
+            await manager.connect(ws)
+            await asyncio.sleep(0)
+            for i in range(3): manager.broadcast(f"d{i}")
+            await asyncio.sleep(0.01)
+            return ws.sent
+        self.assertEqual(asyncio.run(scenario()), ["KEY", "d0", "d1", "d2"])
+
+    def test_slow_client_is_coalesced_not_waited_on(self):
+        async def scenario():
+            manager = ConnectionManager(lambda view: "KEY", max_queue=4)
+            slow, fast = FakeSocket(delay=0.05), FakeSocket()
+            await manager.connect(slow)
+            await manager.connect(fast)
+            await asyncio.sleep(0)
+            for i in range(20):
+                manager.broadcast(f"d{i}")
+                await asyncio.sleep(0.001) # One tick
+            await asyncio.sleep(0.2)
+            return slow.sent, fast.sent
+        slow_sent, fast_sent = asyncio.run(scenario())
+        self.assertEqual(fast_sent, ["KEY"] + [f"d{i}" for i in range(20)])
+        # The slow viewer skipped its backlog and was resynced with a keyframe
+        self.assertLess(len(slow_sent), 21)
+        self.assertGreaterEqual(slow_sent.count("KEY"), 2)
+
+    def test_subscribed_clients_get_their_view(self):
+        async def scenario():
+            dropped = []
+            manager = ConnectionManager(lambda view: f"KEY{view}", on_disconnect=dropped.append)
+            plain, viewer = FakeSocket(), FakeSocket()
+            await manager.connect(plain)
+            await manager.connect(viewer)
+            view = manager.view(viewer)
+            await asyncio.sleep(0)
+            manager.broadcast("full", {view: "mine"})
+            await asyncio.sleep(0.01)
+            manager.disconnect(viewer)
+            return plain.sent, viewer.sent, view, dropped
+        plain_sent, viewer_sent, view, dropped = asyncio.run(scenario())
+        self.assertEqual(plain_sent, ["KEYNone", "full"])
+        self.assertEqual(viewer_sent, [f"KEY{view}", "mine"])
+        self.assertEqual(dropped, [view])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 from simulation import Agent, WorldEngine, ACTION_ATTACK, ACTION_TRADE, JOB_TRADER, JOB_THIEF, Corpse
 from systems.inventory import Item
+from systems.timers import TimerWheel
+from systems.interest import Interest, Viewport
+from mirror import check_stream
 
 class TestDeltaFeatures(unittest.TestCase):
     def test_combat_damage(self):
@@ -48,5 +51,85 @@ class TestDeltaFeatures(unittest.TestCase):
         self.assertEqual(seller.inventory.gold, 50)
         self.assertEqual(trader.inventory.items[0].name, "Sword")
 
+class TestStateDeltas(unittest.TestCase):
+    def test_delta_only_carries_changes(self):
+        world = WorldEngine(width=10, height=10, num_agents=3)
+        first = world.get_delta()
+        self.assertEqual(len(first["agents"]["spawned"]), 4)
+
+        self.assertEqual(world.get_delta()["agents"]["changed"], [])
+        mover = world.agents[0]
+        world.move_agent(mover, mover.x, mover.y) # No-op move isn't a change
+        self.assertEqual(world.get_delta()["agents"]["changed"], [])
+
+        mover.energy -= 1
+        changed = world.get_delta()["agents"]["changed"]
+        self.assertEqual(changed, [{"id": mover.id, "stats": {"hunger": mover.hunger, "energy": mover.energy}}])
+
+    def test_columnar_deltas_rebuild_the_state(self):
+        world = WorldEngine(width=30, height=30, num_agents=40, seed=4, columnar=True)
+        check_stream(self, world, 60)
+
+    def test_death_reported_as_removal(self):
+        world = WorldEngine(width=10, height=10, num_agents=2)
+        world.get_delta()
+        victim = world.agents[1]
+        victim.die(world, world.agents[0])
+        delta = world.get_delta()
+        self.assertEqual(delta["agents"]["removed"], [victim.id])
+        self.assertEqual(len(delta["corpses"]["added"]), 1)
+        self.assertEqual(len(delta["events"]), 1)
+        self.assertNotIn(victim.id, [a["id"] for a in world.get_keyframe()["agents"]])
+
+    def test_corpses_decay_and_get_scavenged(self):
+        world = WorldEngine(width=10, height=10, num_agents=0)
+        victim, scavenger = Agent(5, 5, "Victim"), Agent(5, 6, "Scavenger")
+        victim.inventory.add(Item("Wood", "resource"))
+        victim.inventory.add(Item("Ore", "resource"))
+        world.agents = [victim, scavenger]
+        victim.die(world, None)
+        corpse = world.corpses[0]
+        self.assertEqual(len(world.get_delta()["corpses"]["added"]), 1)
+
+        self.assertEqual(world.scavenge(scavenger).name, "Ore")
+        delta = world.get_delta()["corpses"]
+        self.assertEqual(delta["changed"], [{"id": corpse.id, "inventory": corpse.inventory.to_dict()}])
+        self.assertEqual(world.get_delta()["corpses"]["changed"], [])
+
+        world.agents = [] # Nobody left to disturb the clock
+        for _ in range(corpse.decay - 1): world.update()
+        self.assertEqual(world.corpses, [corpse])
+        world.update()
+        self.assertEqual(world.corpses, [])
+        self.assertEqual(world.get_delta()["corpses"]["removed"], [corpse.id])
+        self.assertEqual(world.corpse_index.query_radius(5, 5, 1), [])
+
+class TestInterest(unittest.TestCase):
+    def test_viewport_is_padded_and_clamped(self):
+        self.assertEqual(Viewport.from_message({"x0": 2, "y0": 10, "x1": 20, "y1": 30}, 64, 32, margin=4),
+                         Viewport(0, 6, 24, 31))
+        for bad in ({"x0": 1}, {"x0": 5, "y0": 0, "x1": 1, "y1": 3}, {"x0": "a", "y0": 0, "x1": 1, "y1": 1}):
+            with self.assertRaises(ValueError): Viewport.from_message(bad, 64, 64)
+
+    def test_filtered_stream_tracks_the_viewport(self):
+        world = WorldEngine(width=40, height=40, num_agents=60, seed=3)
+        interest = Interest(Viewport(5, 5, 20, 25))
+        self.assertEqual(interest.keyframe(world)["population"], len(world.get_state()["agents"]))
+        check_stream(self, world, 80, interest, pans={40: Viewport(15, 0, 39, 18)})
+
+class TestTimerWheel(unittest.TestCase):
+    def test_due_items_across_laps(self):
+        wheel = TimerWheel(slots=8)
+        wheel.schedule("a", 3)
+        wheel.schedule("b", 11) # Same slot, next lap
+        wheel.schedule("c", 3)
+        fired = {t: wheel.advance(t) for t in range(1, 13)}
+        self.assertEqual(fired[3], ["a", "c"])
+        self.assertEqual(fired[11], ["b"])
+        self.assertEqual(sum(map(len, fired.values())), 3)
+        self.assertEqual(len(wheel), 0)
+        wheel.schedule("late", 5) # Already past: fires on the next tick
+        self.assertEqual(wheel.advance(13), ["late"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from simulation import WorldEngine
+from systems.metrics import Metrics, render
+
+class TestMetrics(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        metrics = Metrics(window=4)
+        for v in (0.4, 0.1, 0.3, 0.2, 0.5): metrics.observe("tick_phase_seconds", "decide", v)
+        metrics.inc("actions", "move", 3)
+        metrics.set("agents", 7)
+        text = render([({"world": 'a"b'}, metrics.samples()), ({"world": "c"}, [("agents", None, 2)])])
+        lines = text.splitlines()
+        self.assertIn("# TYPE botmoo_tick_phase_seconds summary", lines)
+        self.assertIn('botmoo_tick_phase_seconds{world="a\\"b",phase="decide",quantile="0.5"} 0.3', lines) # 0.4 fell out of the window
+        self.assertIn('botmoo_tick_phase_seconds{world="a\\"b",phase="decide",quantile="0.99"} 0.5', lines)
+        self.assertIn('botmoo_tick_phase_seconds_count{world="a\\"b",phase="decide"} 5', lines)
+        self.assertIn("# TYPE botmoo_actions_total counter", lines)
+        self.assertIn('botmoo_actions_total{world="a\\"b",action="move"} 3', lines)
+        # One family block, both worlds' samples in it
+        self.assertEqual(lines.count("# TYPE botmoo_agents gauge"), 1)
+        self.assertIn('botmoo_agents{world="c"} 2', lines)
+
+    def test_world_hooks(self):
+        for columnar in (False, True):
+            world = WorldEngine(width=30, height=30, num_agents=20, seed=5, columnar=columnar)
+            metrics = world.metrics = Metrics()
+            for _ in range(10): world.update()
+            phases = {label for family, label in metrics.summaries}
+            self.assertLessEqual({"decide", "perform", "memes", "corpses"}, phases)
+            self.assertEqual("neighbors" in phases, columnar)
+            self.assertEqual(metrics.total("ticks"), 10)
+            actions = sum(v for (family, _), v in metrics.values.items() if family == "actions")
+            self.assertGreaterEqual(actions, 10 * sum(1 for a in world.agents if not a.is_dead) // 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import copy
+import os
+import tempfile
+import unittest
+from replay import Recorder, ReplayEngine
+from simulation import WorldEngine
+from systems.eventlog import EventLog, read_events, EVENT_ACTION, EVENT_DEATH, EVENT_SPAWN, EVENT_MEME
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "events.log")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_chunks_round_trip_and_filter(self):
+        log = EventLog(self.path, chunk_ticks=10)
+        for tick in range(1, 51):
+            log.record(tick, EVENT_ACTION, tick, 1)
+            if tick % 7 == 0: log.record(tick, EVENT_DEATH, tick, 0)
+            log.end_tick(tick)
+        self.assertEqual(len(log), 0) # 50 ticks = 5 full chunks, all flushed
+        log.close()
+        self.assertEqual(len(read_events(self.path)), 57)
+        window = read_events(self.path, since=15, until=29)
+        self.assertEqual(window["tick"].tolist()[0], 15)
+        self.assertEqual(window["tick"].tolist()[-1], 29)
+        self.assertEqual(read_events(self.path, kind=EVENT_DEATH)["a"].tolist(), [7, 14, 21, 28, 35, 42, 49])
+
+    def test_truncate_drops_later_events(self):
+        log = EventLog(self.path, chunk_ticks=10)
+        for tick in range(1, 31):
+            log.record(tick, EVENT_ACTION, tick)
+            log.end_tick(tick)
+        log.truncate(15) # Mid-chunk
+        log.record(16, EVENT_SPAWN, 99)
+        log.close()
+        rows = read_events(self.path)
+        self.assertEqual(rows["tick"].tolist(), list(range(1, 17)))
+        self.assertEqual(rows["a"].tolist()[-1], 99)
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def record(self, ticks, columnar=False):
+        world = WorldEngine(width=30, height=30, num_agents=40, seed=5, columnar=columnar)
+        world.time_of_day = 21 # Night: monsters spawn and fight
+        recorder = Recorder(world, self.dir.name, snapshot_every=25)
+        states = {}
+        for _ in range(ticks):
+            world.update()
+            recorder.after_tick()
+            states[world.tick_count] = copy.deepcopy(world.get_state()) # events is a live list
+        recorder.close()
+        return states
+
+    def test_seek_rebuilds_any_tick(self):
+        states = self.record(90, columnar=True)
+        engine = ReplayEngine(self.dir.name)
+        self.assertEqual(engine.snapshot_ticks, [0, 25, 50, 75])
+        self.assertEqual(engine.nearest_snapshot(62), 50)
+        for tick in (1, 25, 62, 90):
+            self.assertEqual(engine.seek(tick).get_state(), states[tick])
+
+    def test_log_records_the_run(self):
+        self.record(90)
+        engine = ReplayEngine(self.dir.name)
+        actions = engine.events(kind=EVENT_ACTION)
+        self.assertEqual(sorted(set(actions["tick"].tolist())), list(range(1, 91)))
+        self.assertTrue(len(engine.events(kind=EVENT_DEATH)))
+        self.assertTrue(len(engine.events(kind=EVENT_SPAWN))) # Night monsters
+        self.assertTrue(len(engine.events(kind=EVENT_MEME)))
+        self.assertIsNone(engine.verify(10, 90))
+
+    def test_resuming_from_an_older_snapshot_rewrites_the_tail(self):
+        self.record(60)
+        engine = ReplayEngine(self.dir.name)
+        world = engine.seek(50)
+        recorder = Recorder(world, self.dir.name, snapshot_every=25)
+        self.assertEqual(engine.events()["tick"].max(), 50)
+        for _ in range(20):
+            world.update()
+            recorder.after_tick()
+        recorder.close()
+        self.assertIsNone(ReplayEngine(self.dir.name).verify(50, 70))
+
+if __name__ == '__main__':
+    unittest.main()
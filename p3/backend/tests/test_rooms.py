@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from rooms import RoomHost, RoomError, WorldRegistry, RUNNING, PAUSED, SUSPENDED
+from simulation import WorldEngine
+
+PARAMS = {"width": 20, "height": 20, "num_agents": 5, "seed": 3}
+
+class TestRoomHost(unittest.TestCase):
+    def test_rooms_tick_pause_and_resume_from_snapshots(self):
+        sent = []
+        host = RoomHost(sent.append)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "a.snapshot")
+            self.assertEqual(host.open("a", path, PARAMS, 0.5), (20, 20, 0))
+            host.open("b", os.path.join(d, "b.snapshot"), PARAMS, 0.25, profile=True)
+            host.advance(1.0)
+            frames = [(m[1], json.loads(m[2])["tick"]) for m in sent if m[0] == "frame"]
+            self.assertEqual(frames, [("a", 1), ("a", 2), ("b", 1), ("b", 2), ("b", 3), ("b", 4)])
+
+            self.assertEqual(host.metrics("a"), [])
+            self.assertIn(("ticks", None, 4), host.metrics("b"))
+
+            host.pause("a")
+            sent.clear()
+            host.advance(0.5)
+            self.assertEqual({m[1] for m in sent}, {"b"})
+            host.resume("a")
+
+            self.assertEqual(host.close("a"), 2)
+            self.assertEqual(WorldEngine.load(path).tick_count, 2)
+            self.assertEqual(host.open("a", path, PARAMS, 0.5), (20, 20, 2))
+
+            host.handle((7, "keyframe", ("nope",)))
+            self.assertEqual(sent[-1][:3], ("reply", 7, False))
+
+    def test_corrupt_snapshots_start_a_new_world(self):
+        host = RoomHost(lambda message: None)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "a.snapshot")
+            world = WorldEngine(**PARAMS)
+            for _ in range(5): world.update()
+            world.save(path)
+            with open(path, "rb") as f: data = f.read()
+            for damaged in (data[:len(data) // 2], data[:-8] + b"garbage!", b"garbage"):
+                with open(path, "wb") as f: f.write(damaged)
+                self.assertEqual(host.open("a", path, PARAMS, 0.5), (20, 20, 0))
+                with open(path + ".corrupt", "rb") as f: self.assertEqual(f.read(), damaged) # Kept, not clobbered
+                host.close("a")
+
+class TestWorldRegistry(unittest.TestCase):
+    def test_rooms_are_suspended_when_idle_and_woken_by_viewers(self):
+        frames = {}
+        ticked = threading.Event()
+        def on_frame(room, frame, views):
+            frames[room.id] = json.loads(frame)["tick"]
+            ticked.set()
+        with tempfile.TemporaryDirectory() as d:
+            registry = WorldRegistry(d, hosts=1, tick_rate=0.01, idle_after=0.0, on_frame=on_frame)
+            try:
+                with self.assertRaises(ValueError): registry.create("../etc", **PARAMS)
+                registry.create("a", **PARAMS)
+                registry.create("always", always_on=True, **PARAMS)
+                self.assertTrue(ticked.wait(30))
+                self.assertEqual(json.loads(registry.keyframe("a"))["width"], 20)
+
+                registry.reap()
+                self.assertEqual(registry.get("a").state, SUSPENDED)
+                self.assertEqual(registry.get("always").state, RUNNING)
+                tick = WorldEngine.load(os.path.join(d, "a.snapshot")).tick_count
+                self.assertGreater(tick, 0)
+
+                room = registry.attach("a")
+                self.assertEqual((room.state, room.viewers), (RUNNING, 1))
+                self.assertGreaterEqual(json.loads(registry.keyframe("a"))["tick"], tick)
+                registry.reap() # Watched
+                self.assertEqual(room.state, RUNNING)
+
+                registry.pause("a")
+                registry.detach("a")
+                registry.reap()
+                registry.attach("a") # Comes back paused
+                self.assertEqual(room.state, PAUSED)
+                paused_at = json.loads(registry.keyframe("a"))["tick"]
+                time.sleep(0.1)
+                self.assertEqual(json.loads(registry.keyframe("a"))["tick"], paused_at)
+                registry.resume("a")
+                self.assertEqual(room.state, RUNNING)
+
+                registry.destroy("a")
+                self.assertFalse(os.path.exists(os.path.join(d, "a.snapshot")))
+                with self.assertRaises(KeyError): registry.get("a")
+            finally:
+                registry.close()
+            self.assertTrue(os.path.exists(os.path.join(d, "always.snapshot")))
+
+    def test_rooms_of_a_dead_host_restart_elsewhere(self):
+        with tempfile.TemporaryDirectory() as d:
+            registry = WorldRegistry(d, hosts=1, tick_rate=0.01)
+            try:
+                room = registry.create("a", **PARAMS)
+                dead = room.host
+                dead.process.kill()
+                deadline = time.monotonic() + 30
+                while room.state != SUSPENDED and time.monotonic() < deadline: time.sleep(0.01)
+                self.assertEqual((room.state, room.host), (SUSPENDED, None))
+                with self.assertRaises(RoomError): dead.call("state", "a").result()
+                with self.assertRaises(RoomError): registry.keyframe("a")
+
+                registry.attach("a")
+                self.assertEqual(room.state, RUNNING)
+                self.assertIsNot(room.host, dead)
+                self.assertEqual(json.loads(registry.keyframe("a"))["width"], 20)
+            finally:
+                registry.close()
+
+if __name__ == '__main__':
+    unittest.main()
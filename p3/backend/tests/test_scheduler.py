@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from simulation import WorldEngine
+from scheduler import SimulationScheduler
+from systems.interest import Viewport
+from systems.metrics import Metrics
+
+class TestSimulationScheduler(unittest.TestCase):
+    def test_accumulator_runs_due_ticks(self):
+        frames = []
+        world = WorldEngine(width=10, height=10, num_agents=2)
+        sched = SimulationScheduler(world, 0.5, on_frame=lambda frame, views: frames.append(frame))
+        self.assertEqual(sched.advance(0.3), 0)
+        self.assertEqual(sched.advance(0.3), 1) # 0.6s accumulated
+        self.assertEqual(sched.advance(1.0), 2)
+        self.assertEqual(world.tick_count, 3)
+        self.assertEqual([json.loads(f)["tick"] for f in frames], [1, 2, 3])
+
+    def test_catch_up_is_capped(self):
+        world = WorldEngine(width=10, height=10, num_agents=0)
+        world.metrics = Metrics()
+        sched = SimulationScheduler(world, 0.1, max_catch_up=3)
+        self.assertEqual(sched.advance(1.05), 3)
+        self.assertEqual(sched.dropped_ticks, 7)
+        self.assertEqual(world.metrics.total("dropped_ticks"), 7)
+        self.assertLess(sched.accumulator, 0.1)
+
+    def test_thread_ticks_and_rate_change(self):
+        world = WorldEngine(width=10, height=10, num_agents=2)
+        sched = SimulationScheduler(world, 0.01)
+        sched.start()
+        time.sleep(0.2)
+        sched.set_tick_rate(10.0)
+        ticks = sched.read(lambda w: w.tick_count)
+        time.sleep(0.1)
+        sched.stop()
+        self.assertGreater(ticks, 5)
+        self.assertLessEqual(world.tick_count, ticks + 1)
+        self.assertEqual(json.loads(sched.keyframe())["tick"], world.tick_count)
+
+    def test_autosave_every_n_ticks(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "world.snapshot")
+            world = WorldEngine(width=10, height=10, num_agents=2)
+            sched = SimulationScheduler(world, 0.1, autosave_path=path, autosave_every=3)
+            sched.advance(0.25)
+            self.assertFalse(os.path.exists(path))
+            sched.advance(0.1)
+            self.assertEqual(WorldEngine.load(path).tick_count, 3)
+
+    def test_viewport_subscribers_get_their_own_frames(self):
+        sent = []
+        world = WorldEngine(width=40, height=40, num_agents=30, seed=2)
+        sched = SimulationScheduler(world, 0.1, on_frame=lambda frame, views: sent.append((frame, views)))
+        sched.subscribe(7, Viewport(0, 0, 9, 9))
+        sched.step()
+        frame, views = sent[-1]
+        full, view = json.loads(frame), json.loads(views[7])
+        inside = {a.id for a in world.agents if not a.is_dead and a.x < 10 and a.y < 10}
+        outside = {a.id for a in world.agents if not a.is_dead} - inside
+        self.assertEqual(set(view["agents"]["left"]), outside) # Subscriber held the full state
+        self.assertLessEqual(len(views[7]), len(frame))
+        self.assertNotIn("left", full["agents"])
+        self.assertEqual({a["id"] for a in json.loads(sched.keyframe(7))["agents"]}, inside)
+        sched.unsubscribe(7)
+        sched.step()
+        self.assertEqual(sent[-1][1], {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from simulation import WorldEngine, JOB_GUARD, JOB_MONSTER, TICKS_PER_HOUR
+from sharding import ShardedWorld, Shard, split, bundle, MAX_SHARDS
+from systems.inventory import Item
+from mirror import check_stream
+
+class TestShard(unittest.TestCase):
+    def make_shard(self, index=0):
+        world = WorldEngine(width=32, height=16, num_agents=0, seed=1)
+        grid = bytes(len(world.grid)) # All grass
+        return Shard(index, split(32, 16, 2, 1)[index], 32, 16, grid, seed=index, columnar=True)
+
+    def test_effects_on_ghosts_reach_the_owner(self):
+        left, right = self.make_shard(0), self.make_shard(1)
+        source = WorldEngine(width=32, height=16, num_agents=0, seed=2)
+        guard = source._new_agent("Guard", JOB_GUARD)
+        guard.x, guard.y = 14, 8
+        monster = source._new_agent("Nightmare", JOB_MONSTER)
+        monster.x, monster.y = 17, 8
+        left.adopt([bundle(source, guard)])
+        right.adopt([bundle(source, monster)])
+
+        # The monster sees the guard's ghost across the border and attacks it
+        out = right.tick(1, 23, [], [], [(guard.id, "Guard", 14, 8, JOB_GUARD)], False)
+        damage = [e for e in out["effects"] if e[0] == "damage"]
+        self.assertEqual([e[1] for e in damage], [guard.id])
+        energy = left.by_id[guard.id].energy
+        left.tick(2, 23, [], out["effects"], [], False)
+        self.assertLess(left.by_id[guard.id].energy, energy - 10)
+        self.assertIn(monster.id, left.by_id[guard.id].memory["hostile_agents"])
+
+        left.apply([("buy", guard.id, Item("Wood", "resource").to_record())])
+        self.assertEqual(left.by_id[guard.id].inventory.count("Wood"), 1)
+
+    def test_agents_walking_out_are_handed_over_with_their_memes(self):
+        left, right = self.make_shard(0), self.make_shard(1)
+        source = WorldEngine(width=32, height=16, num_agents=0, seed=2)
+        walker = source._new_agent("Walker")
+        walker.memetics.learn(source.memes.intern("Ore!", "neutral"))
+        left.adopt([bundle(source, walker)])
+        left.world.move_agent(left.by_id[walker.id], 16, 8) # Stepped onto the right shard's side
+        texts = lambda world, agent: sorted(world.memes.get(m).text for ids in agent.memetics.vocabulary.values() for m in ids)
+        expected = texts(source, walker)
+
+        packed = left.release(left.by_id[walker.id])
+        self.assertEqual(left.world.agents, [])
+        self.assertEqual(left.world.memes.prevalence(left.world.memes.intern("Ore!", "neutral").id), 0)
+        right.adopt([packed])
+        self.assertEqual(texts(right.world, right.by_id[walker.id]), expected)
+        self.assertIn("Ore!", expected)
+
+class TestShardedWorld(unittest.TestCase):
+    def test_shards_keep_one_consistent_world(self):
+        with ShardedWorld(64, 64, 200, shards=(2, 2), seed=4, deltas=True) as world:
+            state = check_stream(self, world, TICKS_PER_HOUR + 10) # Monsters and fights across borders
+            self.assertEqual(world.tick_count, TICKS_PER_HOUR + 10)
+            self.assertEqual(world.time_of_day, 22)
+            self.assertGreater(world.handoffs, 0)
+            ids = [a["id"] for a in state["agents"]]
+            self.assertEqual(len(ids), len(set(ids))) # Nobody owned twice
+            self.assertEqual(len(ids), world.alive)
+
+    def test_the_monster_cap_spans_all_shards(self):
+        with ShardedWorld(64, 64, 50, shards=(2, 2), seed=4) as world:
+            world.time_of_day = 23
+            world.rng.random = lambda: 0.0 # A monster every tick, up to the cap
+            for _ in range(10):
+                world.update()
+            monsters = [a for a in world.get_state()["agents"] if a["job"] == JOB_MONSTER]
+            self.assertEqual(len(monsters), 3)
+            self.assertEqual(world.monsters, 3)
+
+    def test_too_many_shards_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ShardedWorld(64, 64, 10, shards=(MAX_SHARDS + 1, 1), seed=1)
+
+if __name__ == '__main__':
+    unittest.main()
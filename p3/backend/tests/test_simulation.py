@@ -1,6 +1,11 @@
+import os
+import tempfile
 import unittest
-from simulation import Agent, WorldEngine, ACTION_EAT, ACTION_SLEEP, ACTION_ATTACK, TERRAIN_WATER, TERRAIN_FOREST, TERRAIN_GRASS, JOB_GUARD
+from simulation import Agent, WorldEngine, ACTION_EAT, ACTION_SLEEP, ACTION_ATTACK, TERRAIN_WATER, TERRAIN_FOREST, TERRAIN_GRASS, JOB_GUARD, UPKEEP
 from systems.inventory import Item
+from systems.spatial import radius_pairs
+from systems.snapshot import SnapshotError
+from systems.terrain import decode_map, WATER, FOREST, WALL, WATER_FRACTION, FOREST_FRACTION
 
 class TestAgentAI(unittest.TestCase):
     def test_initial_state(self):
@@ -59,13 +64,128 @@ class TestAgentAI(unittest.TestCase):
         self.assertIn(agent_a.id, agent_b.memory["hostile_agents"])
 
 class TestWorld(unittest.TestCase):
+    def test_nearby_agents_match_bruteforce(self):
+        world = WorldEngine(width=40, height=40, num_agents=60)
+        for _ in range(5): world.update()
+        for agent in world.agents:
+            if agent.is_dead: continue
+            expected = {o.id for o in world.agents
+                        if o is not agent and not o.is_dead
+                        and (o.x - agent.x)**2 + (o.y - agent.y)**2 <= 16}
+            found = {o.id for o in agent._get_nearby_agents(world)}
+            self.assertEqual(found, expected)
+
+    def test_radius_pairs_match_bruteforce(self):
+        world = WorldEngine(width=40, height=40, num_agents=60)
+        speakers, listeners = world.agents[:15], world.agents
+        qi, pi = radius_pairs([a.x for a in speakers], [a.y for a in speakers],
+                              [a.x for a in listeners], [a.y for a in listeners], 5)
+        expected = [(i, j) for i, s in enumerate(speakers) for j, o in enumerate(listeners)
+                    if (o.x - s.x)**2 + (o.y - s.y)**2 <= 25]
+        self.assertEqual(list(zip(qi.tolist(), pi.tolist())), expected)
+
+    def test_memes_spread_at_end_of_tick(self):
+        world = WorldEngine(width=20, height=20, num_agents=0)
+        speaker = Agent(5, 5, "S", JOB_GUARD)
+        near, far = Agent(8, 9, "N", JOB_GUARD), Agent(15, 15, "F", JOB_GUARD)
+        monster = Agent(6, 5, "M", "monster")
+        world.agents = [speaker, near, far, monster]
+        for a in (near, far): a.memetics.openness = 1.0 # Certain infection
+        speaker.say("hostile", world.tick_count, world)
+        meme = world._utterances[0][1]
+        near.memetics.release() # Whatever the seed taught it, make the meme news
+        self.assertEqual(near.memory["episodes"].query(event_type="learning"), [])
+        world._propagate_memes()
+        learned = near.memory["episodes"].query(event_type="learning")
+        self.assertEqual([e.related_agent_id for e in learned], [speaker.id])
+        self.assertEqual(far.memory["episodes"].query(event_type="learning"), [])
+        self.assertEqual(monster.memory["episodes"].query(event_type="learning"), [])
+        self.assertEqual(world._utterances, [])
+
+    def test_spatial_index_drops_dead_agents(self):
+        world = WorldEngine(width=10, height=10, num_agents=0)
+        a = Agent(5, 5, "A")
+        b = Agent(5, 6, "B")
+        world.agents = [a, b]
+        self.assertEqual(a._get_nearby_agents(world), [b])
+        b.die(world, a)
+        self.assertEqual(a._get_nearby_agents(world), [])
+
+    def test_occupancy_tracks_moves_and_deaths(self):
+        world = WorldEngine(width=30, height=30, num_agents=40)
+        for _ in range(10): world.update()
+        expected = {}
+        for a in world.agents:
+            if a.is_dead: continue
+            cell = a.y * world.width + a.x
+            expected[cell] = expected.get(cell, 0) + 1
+        self.assertEqual(world.occupancy, expected)
+        living = next(a for a in world.agents if not a.is_dead)
+        self.assertTrue(world.is_blocked(living.x, living.y))
+        living.die(world, None)
+        self.assertFalse(world.is_blocked(living.x, living.y))
+
+    def test_same_seed_replays_identically(self):
+        def run(seed):
+            world = WorldEngine(width=30, height=30, num_agents=25, seed=seed)
+            for _ in range(50): world.update()
+            return world.get_state()
+        self.assertEqual(run(7), run(7))
+        self.assertNotEqual(run(7), run(8))
+
+    def test_lone_sleeper_dozes_until_woken(self):
+        world = WorldEngine(width=20, height=20, num_agents=0)
+        world.time_of_day = 12
+        sleeper = Agent(5, 5, "Zed", JOB_GUARD)
+        sleeper.psyche.neuroticism = 0.0
+        sleeper.energy = 30
+        world.agents = [sleeper]
+        world.update()
+        # Sleep (100 - energy) beats moving (20) until energy reaches 80, ten ticks on
+        self.assertIn(sleeper, world.dormant_index)
+        self.assertEqual(sleeper._wake_tick, 11)
+        for _ in range(5): world.update()
+        self.assertEqual(sleeper.energy, 35) # Applied lazily
+        sleeper.take_damage(10, sleeper, world)
+        self.assertEqual((sleeper.energy, sleeper._wake_tick), (50, 7))
+        self.assertNotIn(sleeper, world.dormant_index)
+        world.update() # Wakes, sleeps once more and dozes off again
+        self.assertEqual((sleeper.energy, sleeper._wake_tick), (55, 13))
+        self.assertIn(sleeper, world.dormant_index)
+
+        other = Agent(15, 15, "Ann")
+        world.add_agent(other)
+        world.update()
+        world.move_agent(other, 8, 5) # Within earshot
+        self.assertNotIn(sleeper, world.dormant_index)
+        self.assertEqual((sleeper.energy, sleeper._wake_tick), (60, 9))
+
+    def test_dormancy_matches_ticking_everyone(self):
+        for columnar in (False, True):
+            worlds = [WorldEngine(width=40, height=40, num_agents=12, seed=9, columnar=columnar) for _ in range(2)]
+            worlds[1]._doze = lambda agents: None
+            dozed = 0
+            for _ in range(720): # Two days
+                for w in worlds: w.update()
+                dozed += len(worlds[0].dormant_index)
+            self.assertGreater(dozed, 0)
+            for a in worlds[0].agents: worlds[0].rouse(a) # Settle skipped sleep
+            self.assertEqual(worlds[0].get_state(), worlds[1].get_state())
+
     def test_grid_biomes(self):
         world = WorldEngine(width=20, height=20, num_agents=0)
-        terrains = set()
-        for row in world.grid:
-            for cell in row:
-                terrains.add(cell)
+        terrains = {world.get_terrain(x, y) for y in range(20) for x in range(20)}
         self.assertIn(TERRAIN_GRASS, terrains)
+        self.assertEqual(len(world.grid), 20 * 20)
+
+    def test_biomes_are_seeded_and_scale_with_area(self):
+        big = WorldEngine(width=256, height=256, num_agents=0, seed=3)
+        self.assertEqual(big.grid, WorldEngine(width=256, height=256, num_agents=0, seed=3).grid)
+        self.assertNotEqual(big.grid, WorldEngine(width=256, height=256, num_agents=0, seed=4).grid)
+        cells = len(big.grid)
+        self.assertAlmostEqual(big.grid.count(WATER) / cells, WATER_FRACTION, delta=0.01)
+        self.assertAlmostEqual(big.grid.count(FOREST) / cells, FOREST_FRACTION, delta=0.02)
+        self.assertGreater(big.grid.count(WALL), 16 * 5) # 16x the walls of a 64x64 map, minus overlaps
 
     def test_get_map(self):
         world = WorldEngine(width=10, height=10, num_agents=0)
@@ -73,6 +193,141 @@ class TestWorld(unittest.TestCase):
         self.assertEqual(data["width"], 10)
         self.assertEqual(data["height"], 10)
         self.assertEqual(len(data["grid"]), 10)
+        self.assertEqual(data["grid"][3][4], world.get_terrain(4, 3))
+
+    def test_binary_map_roundtrip(self):
+        world = WorldEngine(width=12, height=7, num_agents=0)
+        width, height, legend, cells = decode_map(world.get_map_bytes())
+        self.assertEqual((width, height), (12, 7))
+        self.assertEqual(cells, world.grid)
+        self.assertEqual(legend[cells[7 * 12 - 1]], world.get_terrain(11, 6))
+
+class TestColumnarStore(unittest.TestCase):
+    def test_batched_upkeep_matches_per_agent(self):
+        for action in UPKEEP:
+            results = []
+            for columnar in (False, True):
+                world = WorldEngine(width=10, height=10, num_agents=0, columnar=columnar)
+                world.tick_count = 10 # Hunger ticks for every period
+                agent = Agent(5, 5, "A", JOB_GUARD)
+                agent.hunger, agent.energy = 50, 50
+                world.agents = [agent]
+                agent.perform_action(action, world)
+                if columnar: world._apply_upkeep_columnar()
+                results.append((agent.hunger, agent.energy))
+            self.assertEqual(results[0], results[1], action)
+
+    def test_rows_follow_agents(self):
+        world = WorldEngine(width=20, height=20, num_agents=5, columnar=True)
+        agent = world.agents[1]
+        self.assertIs(world.store.agents[agent._row], agent)
+        world.move_agent(agent, agent.x, agent.y) # No-op, but positions stay mirrored
+        self.assertEqual((world.store.x[agent._row], world.store.y[agent._row]), (agent.x, agent.y))
+        agent.energy = 42
+        self.assertEqual(world.store.energy[agent._row], 42)
+        agent.die(world, None)
+        self.assertIsNone(agent._store)
+        self.assertEqual(agent.energy, 42) # Copied back for the corpse / late readers
+        self.assertEqual(len(world.store), 5)
+
+    def _decisions(self, world, batched):
+        # Snapshot of what each agent would do and at whom, from an identical RNG state
+        for a in world.agents: a.speech_cooldown = 1000 # No speech side effects
+        living = [a for a in world.agents if not a.is_dead]
+        if batched:
+            actions = world.decide_actions(living)
+        else:
+            actions = [a.decide_action(world) for a in living]
+        result = []
+        for a, action in zip(living, actions):
+            target = None
+            if action in (ACTION_ATTACK, "steal") or a.job == "monster": target = a._current_target
+            elif action == "trade": target = a._trade_target
+            elif action == "craft": target = a._craft_target
+            result.append((a.id, action, getattr(target, "id", target), a._goal, a._sleep_rival))
+        return result
+
+    def test_batched_decisions_match_reference(self):
+        for hour in (12, 23): # Day and night branches
+            world = WorldEngine(width=24, height=24, num_agents=120, seed=5, columnar=True)
+            for _ in range(20): world.update()
+            world.time_of_day = hour
+            for i, a in enumerate(world.agents):
+                if i % 4 == 0: a.memory["hostile_agents"].add(world.agents[(i * 7) % len(world.agents)].id)
+                if i % 5 == 0: a.psyche.disorders.append("paranoia")
+                if i % 3 == 0: a.psyche.neuroticism = 0.8
+                for _ in range(i % 7): a.inventory.add(Item("Wood" if i % 2 else "Ore", "resource"))
+                if i % 6 == 0: a.inventory.equipped["hand"] = Item("Spear", "weapon", 15)
+                a.hunger, a.energy = (i * 13) % 100, (i * 29) % 100
+            for _ in range(3): world._spawn_monster()
+            state = world.rng.agents.getstate()
+            reference = self._decisions(world, batched=False)
+            world.rng.agents.setstate(state)
+            self.assertEqual(self._decisions(world, batched=True), reference)
+            self.assertGreater(len({action for _, action, _, _, _ in reference}), 4)
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "world.snapshot")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_restored_world_continues_identically(self):
+        for columnar in (False, True):
+            world = WorldEngine(width=30, height=30, num_agents=40, seed=11, columnar=columnar)
+            world.time_of_day = 21 # Cross into the night: monsters, fights, corpses
+            for _ in range(120): world.update()
+            world.save(self.path)
+            restored = WorldEngine.load(self.path)
+            self.assertEqual(restored.get_state(), world.get_state())
+            self.assertEqual(restored.memes.carriers, world.memes.carriers)
+            self.assertEqual(len(restored.spatial), len(world.spatial))
+            for _ in range(60):
+                world.update()
+                restored.update()
+            self.assertEqual(restored.get_state(), world.get_state())
+            self.assertEqual([a.memory["episodes"].to_record() for a in restored.agents],
+                             [a.memory["episodes"].to_record() for a in world.agents])
+
+    def test_flipped_bytes_are_caught(self):
+        world = WorldEngine(width=12, height=12, num_agents=3, seed=1)
+        for _ in range(10): world.update()
+        world.save(self.path)
+        with open(self.path, "rb") as f: data = f.read()
+        state = world.get_state()
+        loaded = 0
+        for i in range(0, len(data), 7):
+            damaged = bytearray(data)
+            damaged[i] ^= 0xFF
+            with open(self.path, "wb") as f: f.write(damaged)
+            try: restored = WorldEngine.load(self.path)
+            except SnapshotError: continue
+            self.assertEqual(restored.get_state(), state) # Only harmless bytes (gzip header fields) may pass
+            loaded += 1
+        self.assertLess(loaded, 10)
+
+    def test_dormant_agents_survive_a_restore(self):
+        world = WorldEngine(width=40, height=40, num_agents=12, seed=9, columnar=True)
+        while not world.dormant_index: world.update()
+        world.save(self.path)
+        restored = WorldEngine.load(self.path)
+        self.assertEqual(sorted(a.id for a in restored.agents if a._wake_tick is not None),
+                         sorted(a.id for a in world.agents if a._wake_tick is not None))
+        for _ in range(200):
+            world.update()
+            restored.update()
+        self.assertEqual(restored.get_state(), world.get_state())
+
+    def test_bad_snapshots_are_rejected(self):
+        WorldEngine(width=10, height=10, num_agents=3).save(self.path)
+        with open(self.path, "rb") as f: data = f.read()
+        with open(self.path, "wb") as f: f.write(data[:len(data) // 2])
+        with self.assertRaises(SnapshotError): WorldEngine.load(self.path)
+        with open(self.path, "wb") as f: f.write(b"nope")
+        with self.assertRaises(SnapshotError): WorldEngine.load(self.path)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from simulation import Agent, WorldEngine, ACTION_CRAFT, ACTION_GATHER, TERRAIN_FOREST
-from systems.inventory import Item, CraftingSystem
+from systems.inventory import Item, CraftingSystem, RecipeGraph, Inventory, _plan
+from systems.psychology import EpisodicStore, EpisodicMemory
+from systems.memetics import MemeRegistry, MemeticHost, HISTORY_SIZE
+from systems.navigation import distance_field, STEPS
+from systems.terrain import GRASS, WALL, FOREST
 
 class TestInventory(unittest.TestCase):
     def test_add_remove(self):
@@ -33,6 +37,73 @@ class TestInventory(unittest.TestCase):
         self.assertEqual(agent.inventory.equipped["hand"], spear)
         self.assertNotIn(spear, agent.inventory.items)
 
+    def test_counted_inventory(self):
+        inv = Agent(0, 0).inventory
+        for _ in range(2): inv.add(Item("Wood", "resource"))
+        inv.add(Item("Club", "weapon", 10))
+        self.assertEqual((len(inv), inv.count("Wood"), inv.resources), (3, 2, {"Wood": 2}))
+        self.assertEqual(inv.craftable, {"Club"})
+        inv.add(Item("Wood", "resource"))
+        self.assertEqual(inv.craftable, {"Club", "Spear"}) # Cache dropped on add
+        self.assertFalse(inv.remove("Wood", 4))
+        self.assertTrue(inv.remove("Wood", 2))
+        self.assertEqual(inv.craftable, frozenset())
+        self.assertEqual(inv.pop_item().name, "Club")
+        self.assertEqual(inv.pop_item().name, "Wood")
+        self.assertIsNone(inv.pop_item())
+        self.assertEqual((len(inv), inv.counts), (0, {}))
+        for _ in range(inv.capacity): inv.add(Item("Ore", "resource"))
+        self.assertFalse(inv.add(Item("Ore", "resource")))
+        self.assertEqual(len(inv.items), inv.capacity)
+
+    def test_resources_keep_their_own_value(self):
+        inv = Inventory()
+        for value in (1, 100, 1): inv.add(Item("Gold", "resource", 0, value))
+        self.assertEqual(sorted(i.value for i in inv.items), [1, 1, 100])
+        self.assertEqual(inv.count("Gold"), 3)
+        restored = Inventory.from_record(inv.to_record())
+        self.assertEqual([i.to_record() for i in restored.items], [i.to_record() for i in inv.items])
+        a, b = inv.pop_item(), inv.pop_item()
+        self.assertIsNot(a, b)
+        self.assertEqual(sorted((a.value, b.value)), [1, 100])
+        inv.remove("Gold")
+        self.assertEqual(len(inv), 0)
+        inv.add(Item("Gold", "resource", 0, 50)) # Emptied stacks are forgotten
+        self.assertEqual(inv.pop_item().value, 50)
+
+class TestCraftPlanner(unittest.TestCase):
+    def _inventory(self, **counts):
+        inv = Inventory()
+        for name, n in counts.items():
+            for _ in range(n): inv.add(Item(name, "resource"))
+        return inv
+
+    def test_recipe_tiers(self):
+        graph = CraftingSystem.graph
+        self.assertEqual((graph.tiers["Spear"], graph.tiers["Ingot"], graph.tiers["Sword"]), (1, 1, 2))
+        self.assertIn("Sword", graph.consumers["Ingot"])
+        self.assertNotIn("Ingot", graph.products)
+        with self.assertRaises(ValueError):
+            RecipeGraph({"A": {"cost": {"B": 1}, "result": Item("A", "weapon")},
+                         "B": {"cost": {"A": 1}, "result": Item("B", "resource")}})
+
+    def test_plan_expands_intermediates(self):
+        plan = CraftingSystem.plan(self._inventory(Ore=4, Wood=1), "Sword")
+        self.assertEqual((plan.steps, plan.missing, plan.next_step), (("Ingot", "Ingot", "Sword"), (), "Ingot"))
+        plan = CraftingSystem.plan(self._inventory(Ingot=1), "Sword")
+        self.assertEqual((plan.missing, plan.next_step), ((("Ore", 2), ("Wood", 1)), None))
+
+        inv = self._inventory(Ore=2)
+        self.assertEqual(CraftingSystem.plan(inv, "Sword").next_step, "Ingot")
+        self.assertTrue(CraftingSystem.craft(inv, "Ingot"))
+        self.assertEqual(dict(CraftingSystem.plan(inv, "Sword").missing), {"Ore": 2, "Wood": 1})
+
+    def test_cheapest_target_is_memoized(self):
+        self.assertEqual(CraftingSystem.plan(self._inventory(Wood=2)).target, "Club")
+        hits = _plan.cache_info().hits
+        self.assertEqual(CraftingSystem.plan(self._inventory(Wood=2)).target, "Club")
+        self.assertEqual(_plan.cache_info().hits, hits + 1)
+
 class TestPsychology(unittest.TestCase):
     def test_sanity_loss(self):
         agent = Agent(0, 0)
@@ -40,5 +111,128 @@ class TestPsychology(unittest.TestCase):
         agent.log_event("Test Trauma", -10)
         self.assertLess(agent.psyche.sanity, initial_sanity)
 
+    def test_episodic_memory_is_bounded(self):
+        agent = Agent(0, 0)
+        for tick in range(5000):
+            agent.log_event("Gathered Wood.", 1, "work", tick)
+            if tick % 100 == 0: agent.log_event("Hurt!", -5, "pain", tick, related_agent_id=7)
+        episodes = agent.memory["episodes"]
+        self.assertEqual(len(agent.memory["logs"]), 10)
+        self.assertLessEqual(len(episodes), episodes.capacity + episodes.salient_capacity)
+        self.assertEqual(len(episodes.salient), episodes.salient_capacity) # Trauma outlives routine work
+        work = episodes.summaries["work"]
+        self.assertEqual(work.count + len(episodes.query(event_type="work")), 5000)
+
+    def test_episodic_queries(self):
+        store = EpisodicStore(capacity=4, salient_capacity=2)
+        for tick, (kind, weight, other) in enumerate([("combat", -5, 1), ("work", 1, None), ("combat", 8, 2),
+                                                      ("work", 1, None), ("trade", 2, 1), ("work", 0, None)]):
+            store.append(EpisodicMemory(tick, kind, kind, weight, other))
+        self.assertEqual([e.tick for e in store.recent()], [2, 3, 4, 5])
+        self.assertEqual([e.tick for e in store.salient], [0]) # Tick 1 was routine
+        self.assertEqual(store.summaries["work"].count, 1)
+        self.assertEqual([e.tick for e in store.query(related_agent_id=1)], [0, 4])
+        self.assertEqual([e.tick for e in store.query(event_type="combat", since=1)], [2])
+        self.assertEqual([e.tick for e in store.query(until=3)], [0, 2, 3])
+
+class TestMemetics(unittest.TestCase):
+    def test_registry_interns_and_counts_carriers(self):
+        pool = MemeRegistry()
+        a, b = MemeticHost(1.0, registry=pool), MemeticHost(1.0, registry=pool)
+        self.assertEqual(len(pool), 12) # Seeds are shared, not copied per host
+        hi = pool.intern("Hi.", "friendly")
+        self.assertEqual(pool.prevalence(hi.id), 2)
+
+        class Rolls: # Mutate, then skip vowel shift and truncation: emphasis
+            rolls = iter([0.05, 0.5, 0.5, 0.1])
+            def random(self): return next(self.rolls)
+            def choice(self, seq): return seq[0]
+        a.rng = Rolls()
+        child = a.express("friendly")
+        self.assertEqual((child.text, child.parent_id), ("Hi.!", hi.id))
+        self.assertIs(pool.intern("Hi.!", "friendly", hi.id), child)
+        self.assertEqual(pool.lineage(child.id), [child, hi])
+        self.assertTrue(b.expose(child, 0))
+        self.assertFalse(b.expose(child, 0)) # Already caught
+        self.assertEqual(pool.prevalence(child.id), 2)
+
+        a.release()
+        b.release()
+        self.assertEqual(len(pool), 0)
+
+    def test_host_memory_is_bounded(self):
+        pool = MemeRegistry()
+        host = MemeticHost(1.0, registry=pool)
+        for i in range(500):
+            host.learn(pool.intern(f"meme {i}", "neutral"))
+        self.assertLessEqual(len(host.infection_history), HISTORY_SIZE)
+        self.assertEqual(len(host.vocabulary["neutral"]), 6)
+        self.assertEqual(len(pool), 9 + 6) # Other seeds + current vocab; forgotten memes left the pool
+
+class TestNavigation(unittest.TestCase):
+    MAP = ("..........",
+           ".####.....",
+           ".#..#..T..",
+           ".#..#.....",
+           ".##.#.....",
+           "..........")
+
+    def make_world(self):
+        codes = {".": GRASS, "#": WALL, "T": FOREST}
+        grid = bytes(codes[c] for row in self.MAP for c in row)
+        world = WorldEngine(width=10, height=6, num_agents=0, seed=1, grid=grid)
+        world.agents = [] # No trader in the way
+        return world
+
+    def test_fields_match_bfs(self):
+        world = self.make_world()
+        w, h = world.width, world.height
+        dist, _ = distance_field(world.navigation.passable, w, h, [2 * w + 7])
+        # Plain BFS over the same 8-connected grid
+        expected = {(7, 2): 0}
+        frontier = [(7, 2)]
+        while frontier:
+            nxt = []
+            for x, y in frontier:
+                for dx, dy in STEPS:
+                    cell = (x + dx, y + dy)
+                    if 0 <= cell[0] < w and 0 <= cell[1] < h and cell not in expected and self.MAP[cell[1]][cell[0]] != "#":
+                        expected[cell] = expected[x, y] + 1
+                        nxt.append(cell)
+            frontier = nxt
+        self.assertEqual({(i % w, i // w): int(d) for i, d in enumerate(dist) if d >= 0}, expected)
+        self.assertEqual(expected[2, 2], 6) # Walled pocket: out through the gap at the bottom
+
+        nav = world.navigation
+        for (x, y), d in expected.items():
+            step = nav.step("forest", x, y)
+            if d == 0: self.assertIsNone(step)
+            else: self.assertEqual(expected[step], d - 1)
+
+        nav.set_goals("near", [2 * w + 7], limit=2)
+        self.assertEqual(nav.distance("near", 5, 2), 2)
+        self.assertEqual(nav.distance("near", 2, 2), -1)
+        self.assertIsNone(nav.step("near", 0, 0))
+
+    def test_agents_walk_to_work(self):
+        world = self.make_world()
+        smith = world._new_agent("Smith", "blacksmith")
+        world.move_agent(smith, 9, 5)
+        world.add_agent(smith)
+        smith._goal = "ore"
+        for _ in range(4): smith._move(world)
+        self.assertTrue(world.ore_face[smith.y * world.width + smith.x])
+        for _ in range(20): smith.perform_action(ACTION_GATHER, world)
+        self.assertGreater(smith.inventory.count("Ore"), 0) # Mined from the wall next to it
+
+        jack = world._new_agent("Jack", "lumberjack")
+        world.move_agent(jack, 2, 2)
+        world.add_agent(jack)
+        world.time_of_day = 12
+        self.assertEqual(jack.decide_action(world), "move")
+        self.assertEqual(jack._goal, "forest")
+        for _ in range(6): jack._move(world)
+        self.assertEqual(world.get_terrain(jack.x, jack.y), TERRAIN_FOREST)
+
 if __name__ == '__main__':
     unittest.main()